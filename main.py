@@ -1,8 +1,18 @@
 # main.py
+from src.scripts.backtest_scores import run_score_backtest
+from src.scripts.batch_valuation import run_batch_valuation
 from src.scripts.company_analysis import analyze_company
-from src.scripts.convert_ibkr_to_yahoo_finance_trade_report import convert_ibkr_to_yahoo_finance
+from src.scripts.convert_ibkr_to_yahoo_finance_trade_report import run_ibkr_conversion
 from src.scripts.lynch_company_category import classify_company
+from src.scripts.portfolio_valuation import run_portfolio_valuation
+from src.scripts.price_history_report import run_price_history_report
+from src.scripts.realized_pnl import run_realized_pnl
+from src.scripts.universe_valuation import run_universe_valuation
+from src.scripts.valuation_service import serve
 from src.scripts.valuation_tool_main import run_valuation
+from src.scripts.watchlist_prefetch import run_watchlist_prefetch
+from src.valuation.profiling import profiling_enabled, profile_action
+from src.valuation.ticker_handle import get_handle
 from src.valuation.yfinance_api import dcf_intrinsic_value
 
 
@@ -25,35 +35,88 @@ def show_menu():
     print("3. Peter Lynch company category")
     print("4. Convert IBKR csv report into Yahoo finance csv report")
     print("5. Intrinsic Value per Share")
+    print("6. Portfolio valuation from IBKR csv report")
+    print("7. Universe valuation (multi-core)")
+    print("8. Start valuation HTTP service (Ctrl+C to stop)")
+    print("9. Backtest company score over stored snapshots")
+    print("10. Watchlist prefetch (keep tickers warm in the background)")
+    print("11. Batch universe valuation over a shared job queue (multi-machine)")
+    print("12. Price history: returns, volatility, drawdown and beta")
+    print("13. Realized P&L and cost basis (FIFO) from IBKR csv report")
     print("0. Exit")
 
+# Profile file name of each menu action
+ACTION_NAMES = {
+    "1": "run_valuation",
+    "2": "analyze_company",
+    "3": "classify_company",
+    "4": "ibkr_conversion",
+    "5": "dcf_intrinsic_value",
+    "6": "portfolio_valuation",
+    "7": "universe_valuation",
+    "8": "valuation_service",
+    "9": "score_backtest",
+    "10": "watchlist_prefetch",
+    "11": "batch_valuation",
+    "12": "price_history",
+    "13": "realized_pnl",
+}
+
+
+def run_choice(choice):
+    if choice == "1":
+        run_valuation()
+    elif choice == "2":
+        symbol = input("Enter stock symbol (e.g., AAPL): ").upper()
+        analyze_company(get_handle(symbol))
+    elif choice == "3":
+        symbol = input("Enter stock symbol (e.g., AAPL): ").upper()
+        classification = classify_company(get_handle(symbol), use_price_history=True)
+        print(f"\n Company classified as {classification}")
+    elif choice == "4":
+        run_ibkr_conversion()
+    elif choice == "5":
+        symbol = input("Enter stock symbol (e.g., AAPL): ").upper()
+        intrinsic_value, equity_value, enterprise_value = dcf_intrinsic_value(get_handle(symbol))
+        print(f"Intrinsic Value per Share for {symbol}: ${intrinsic_value:.2f}")
+        print(f"Equity Value: ${equity_value / 1e9:.2f} B")
+        print(f"Enterprise Value: ${enterprise_value / 1e9:.2f} B")
+    elif choice == "6":
+        run_portfolio_valuation()
+    elif choice == "7":
+        run_universe_valuation()
+    elif choice == "8":
+        serve()
+    elif choice == "9":
+        run_score_backtest()
+    elif choice == "10":
+        run_watchlist_prefetch()
+    elif choice == "11":
+        run_batch_valuation()
+    elif choice == "12":
+        run_price_history_report()
+    elif choice == "13":
+        run_realized_pnl()
+
+
 def main():
+    profile = profiling_enabled()
+    if profile:
+        print("⏱️ Profiling is on: every action writes a report to the profiles directory.")
     while True:
         show_menu()
-        choice = input("Choose an option (0-5): ").strip()
-
-        if choice == "1":
-            run_valuation()
-        elif choice == "2":
-            symbol = input("Enter stock symbol (e.g., AAPL): ").upper()
-            analyze_company(symbol)
-        elif choice == "3":
-            symbol = input("Enter stock symbol (e.g., AAPL): ").upper()
-            classification = classify_company(symbol)
-            print(f"\n Company classified as {classification}")
-        elif choice == "4":
-            convert_ibkr_to_yahoo_finance()
-        elif choice == "5":
-            symbol = input("Enter stock symbol (e.g., AAPL): ").upper()
-            intrinsic_value, equity_value, enterprise_value = dcf_intrinsic_value(symbol)
-            print(f"Intrinsic Value per Share for {symbol}: ${intrinsic_value:.2f}")
-            print(f"Equity Value: ${equity_value / 1e9:.2f} B")
-            print(f"Enterprise Value: ${enterprise_value / 1e9:.2f} B")
-        elif choice == "0":
+        choice = input("Choose an option (0-13): ").strip()
+
+        if choice == "0":
             print("Exiting. Goodbye!")
             break
-        else:
+        elif choice not in ACTION_NAMES:
             print("Invalid choice. Please try again.")
+        elif profile:
+            with profile_action(ACTION_NAMES[choice]):
+                run_choice(choice)
+        else:
+            run_choice(choice)
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,18 @@
+from src.scripts.universe_valuation import snapshot_store
+from src.valuation.backtest import run_backtest
+
+
+def run_score_backtest():
+    directory = input(f"Snapshot store directory [{snapshot_store}]: ").strip() or snapshot_store
+    raw_horizon = input("Forward return horizon in days [365]: ").strip()
+    horizon = int(raw_horizon) if raw_horizon.isdigit() else 365
+
+    result = run_backtest(directory, horizon_days=horizon)
+    if result["by_category"].empty:
+        print("⚠️ Not enough dated snapshots for this horizon.")
+        return
+
+    print(f"\n📊 Forward {horizon}-day returns by company score bucket (%):")
+    print(result["by_score_bucket"].to_markdown(numalign="left", stralign="left", floatfmt=".3f"))
+    print(f"\n📊 Forward {horizon}-day returns by Peter Lynch category:")
+    print(result["by_category"].to_markdown(numalign="left", stralign="left", floatfmt=".3f"))
@@ -0,0 +1,91 @@
+"""
+Universe valuation spread over worker processes on any number of machines.
+
+The coordinator splits the universe into jobs on a SQLite queue; workers lease jobs, run them and
+write the results back. Put the queue (and the snapshot file) on a directory every node can reach:
+
+    python -m src.scripts.batch_valuation run --queue /shared/jobs.db --local-workers 4
+    python -m src.scripts.batch_valuation worker --queue /shared/jobs.db        # on every other node
+"""
+import argparse
+import datetime
+import os
+import time
+
+from src.scripts.universe_valuation import index_symbols, output_file
+from src.valuation.batch_valuation import distributed_fetch, distributed_valuation, run_worker
+from src.valuation.job_queue import DEFAULT_LEASE, JobQueue
+from src.valuation.snapshot_file import write_snapshot, write_dated_snapshot
+
+queue_file = 'valuation_jobs.db'
+batch_snapshot_file = 'batch_snapshot.bin'
+snapshot_store = 'snapshots'
+DEFAULT_INDEXES = ['S&P 500', 'DAX', 'FTSE 100']
+
+
+def batch_valuation(queue_path: str = queue_file,
+                    snapshot: str = "",
+                    indexes=DEFAULT_INDEXES,
+                    local_workers: int = 0,
+                    shards: int = 0,
+                    output: str = output_file,
+                    lease: float = DEFAULT_LEASE) -> None:
+    """Fetch (unless `snapshot` is given) and value the universe through the job queue."""
+    queue = JobQueue(queue_path, lease=lease)
+    start = time.perf_counter()
+    try:
+        if not snapshot:
+            symbols = index_symbols(indexes)
+            print(f"Queueing the download of {len(symbols)} symbols …")
+            infos = distributed_fetch(queue, symbols, local_workers)
+            snapshot = os.path.join(os.path.dirname(os.path.abspath(queue_path)), batch_snapshot_file)
+            write_snapshot(snapshot, infos)
+            write_dated_snapshot(snapshot_store, datetime.date.today(), infos)
+            print(f"💾 Snapshot of {len(infos)} tickers written to {snapshot}")
+
+        print(f"Queueing the valuation of {snapshot} …")
+        table = distributed_valuation(queue, snapshot, shards or max(1, local_workers) * 4, local_workers)
+    finally:
+        queue.close()
+    print(f"Valued {len(table)} tickers in {time.perf_counter() - start:.2f}s")
+    table.to_csv(output)
+    print(f"📄 Results written to {output}")
+
+
+def run_batch_valuation():
+    queue_path = input(f"Job queue file (on a shared directory for several machines) [{queue_file}]: ").strip()
+    snapshot = input("Snapshot file to value (press ↵ to fetch the indexes through the queue): ").strip()
+    raw_workers = input(f"Local worker processes [{os.cpu_count()}]: ").strip()
+    workers = int(raw_workers) if raw_workers.isdigit() else os.cpu_count() or 1
+    print("Workers on other machines: python -m src.scripts.batch_valuation worker --queue <queue file>")
+    batch_valuation(queue_path or queue_file, snapshot, local_workers=workers)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Universe valuation over a shared job queue.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    run = sub.add_parser("run", help="queue a valuation and wait for it")
+    run.add_argument("--queue", default=queue_file)
+    run.add_argument("--snapshot", default="", help="snapshot file to value instead of fetching the indexes")
+    run.add_argument("--indexes", default=",".join(DEFAULT_INDEXES))
+    run.add_argument("--local-workers", type=int, default=0)
+    run.add_argument("--shards", type=int, default=0, help="valuation jobs (default: 4 per local worker)")
+    run.add_argument("--output", default=output_file)
+    run.add_argument("--lease", type=float, default=DEFAULT_LEASE)
+    worker = sub.add_parser("worker", help="serve the queue until Ctrl+C")
+    worker.add_argument("--queue", default=queue_file)
+    worker.add_argument("--lease", type=float, default=DEFAULT_LEASE)
+    worker.add_argument("--exit-when-drained", action="store_true")
+    args = parser.parse_args()
+
+    if args.command == "worker":
+        done = run_worker(args.queue, lease=args.lease, exit_when_drained=args.exit_when_drained)
+        print(f"Worker stopped after {done} jobs")
+    else:
+        indexes = [i.strip() for i in args.indexes.split(",") if i.strip()]
+        batch_valuation(args.queue, args.snapshot, indexes, args.local_workers, args.shards, args.output,
+                        args.lease)
+
+
+if __name__ == "__main__":
+    main()
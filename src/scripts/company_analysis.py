@@ -1,3 +1,4 @@
+from src.valuation.result_cache import memoize
 from src.valuation.yfinance_api import ticket_info
 
 
@@ -210,6 +211,32 @@ def dividend_yield_score(yield_percent):
         return 10, "High yield"
 
 
+# `info` fields read by `score_company`
+SCORE_FIELDS = ["trailingPE", "enterpriseToEbitda", "earningsQuarterlyGrowth", "profitMargins", "returnOnEquity",
+                "dividendYield"]
+
+
+@memoize(SCORE_FIELDS)
+def score_company(info):
+    """
+    Return the final score of `analyze_company` without printing (memoized on SCORE_FIELDS).
+    Result keys: total, count (number of scored metrics) and percent (None when nothing could be scored).
+    """
+    metrics = [
+        pe_score(info.get("trailingPE"))[0],
+        ev_to_ebitda_score(info.get("enterpriseToEbitda"))[0],
+        earnings_growth_score(info.get("earningsQuarterlyGrowth"))[0],
+        profit_margin_score(info.get("profitMargins"))[0],
+        roe_score(info.get("returnOnEquity"))[0],
+        dividend_yield_score(info.get("dividendYield"))[0]
+    ]
+
+    total_score = sum(score for score in metrics if score is not None)
+    count = sum(1 for score in metrics if score is not None)
+    percent = (total_score / (count * 10)) * 100 if count else None
+    return {"total": total_score, "count": count, "percent": percent}
+
+
 def analyze_company(ticker_symbol):
     # Fetch data
     info = ticket_info(ticker_symbol)
@@ -297,20 +324,12 @@ def analyze_company(ticker_symbol):
         print(f"   - Score: {score}/10 ({description})" if score else f"   - {description}")
 
         # Total Score
-        metrics = [
-            pe_score(pe_ratio)[0],
-            ev_to_ebitda_score(ev_ebitda)[0],
-            earnings_growth_score(growth_5y)[0],
-            profit_margin_score(profit_margin)[0],
-            roe_score(roe)[0],
-            dividend_yield_score(dividend_yield)[0]
-        ]
-
-        total_score = sum(score for score in metrics if score is not None)
-        count = sum(1 for score in metrics if score is not None)
+        final = score_company(info)
+        total_score = final["total"]
+        count = final["count"]
 
         if count:
-            print(f"\n📊 Final Score: {total_score}/{count * 10} ({(total_score / (count * 10)) * 100:.1f}%)")
+            print(f"\n📊 Final Score: {total_score}/{count * 10} ({final['percent']:.1f}%)")
         else:
             print("\n📊 Final Score: Not enough data")
 
@@ -1,9 +1,23 @@
 import csv
+import hashlib
+import os
+import sqlite3
+import time
 from datetime import datetime
+from typing import Dict, List, Optional, Tuple
 
 # Input and output file paths
 input_file = 'Yahoo_finance_export 2.csv'
 output_file = 'converted_trades.csv'
+# Keys of the trades already converted (incremental mode)
+index_file = 'converted_trades.index'
+# Directory watched for new IBKR exports
+input_directory = 'ibkr_exports'
+
+# Columns identifying one trade across overlapping exports
+TRADE_KEY = ["Symbol", "Date/Time", "Quantity", "Price", "Buy/Sell"]
+# IBKR execution ids, used instead of TRADE_KEY when the export has them
+TRADE_ID_COLUMNS = ["IBExecID", "TradeID"]
 
 # Mapping to output format
 output_headers = [
@@ -57,3 +71,209 @@ def convert_ibkr_to_yahoo_finance():
             writer.writerow(converted)
 
     print(f"Conversion completed. Output written to {output_file}")
+
+
+# --------------------------- Incremental conversion -----------------------------
+
+_INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS trades (key TEXT PRIMARY KEY);
+CREATE TABLE IF NOT EXISTS files (
+    path   TEXT PRIMARY KEY,
+    header TEXT NOT NULL,
+    offset INTEGER NOT NULL,
+    digest TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE IF NOT EXISTS occurrences (
+    path  TEXT NOT NULL,
+    key   TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    PRIMARY KEY (path, key)
+);
+"""
+
+
+def trade_key(row: Dict[str, str]) -> str:
+    for column in TRADE_ID_COLUMNS:
+        trade_id = (row.get(column) or "").strip()
+        if trade_id:
+            return f"{column}={trade_id}"
+    return "|".join((row.get(column) or "").strip() for column in TRADE_KEY)
+
+
+class ConversionIndex:
+    """
+    Persistent record of what was already converted: the key of every trade written to the output
+    and, per input file, how many bytes of it were read (with a hash of those bytes) and how often
+    each trade key appeared in them.
+    """
+
+    def __init__(self, path: str):
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_INDEX_SCHEMA)
+        # Indexes written before the digest column: an empty digest makes every file read again once
+        if "digest" not in [column[1] for column in self._db.execute("PRAGMA table_info(files)")]:
+            self._db.execute("ALTER TABLE files ADD COLUMN digest TEXT NOT NULL DEFAULT ''")
+
+    def close(self) -> None:
+        self._db.close()
+
+    def __len__(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM trades").fetchone()[0]
+
+    def position(self, path: str) -> Tuple[Optional[str], int, str]:
+        """Header, bytes read and the SHA-256 of those bytes, as of the last conversion of `path`."""
+        row = self._db.execute("SELECT header, offset, digest FROM files WHERE path = ?",
+                               (os.path.abspath(path),)).fetchone()
+        return (row[0], row[1], row[2]) if row else (None, 0, "")
+
+    def occurrences(self, path: str, key: str) -> int:
+        """How many rows with `key` the read part of `path` holds."""
+        row = self._db.execute("SELECT count FROM occurrences WHERE path = ? AND key = ?",
+                               (os.path.abspath(path), key)).fetchone()
+        return row[0] if row else 0
+
+    def set_occurrences(self, path: str, counts: Dict[str, int]) -> None:
+        self._db.executemany("INSERT OR REPLACE INTO occurrences VALUES (?, ?, ?)",
+                             [(os.path.abspath(path), key, count) for key, count in counts.items()])
+
+    def forget(self, path: str) -> None:
+        """Drop the occurrence counts of `path` (it is read again from the start)."""
+        self._db.execute("DELETE FROM occurrences WHERE path = ?", (os.path.abspath(path),))
+
+    def add(self, key: str) -> bool:
+        """Remember `key`; False if it was already known."""
+        return self._db.execute("INSERT OR IGNORE INTO trades VALUES (?)", (key,)).rowcount == 1
+
+    def commit(self, path: str, header: str, offset: int, digest: str) -> None:
+        self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                         (os.path.abspath(path), header, offset, digest))
+        self._db.commit()
+
+    def rollback(self) -> None:
+        self._db.rollback()
+
+
+def _new_lines(path: str, index: ConversionIndex) -> Tuple[str, List[str], int, bool, str]:
+    """
+    Header, complete lines not read yet, the offset after them, whether they start at the top of
+    the file and the hash of the file up to that offset. A file whose already read part changed
+    (a re-export overwriting the same name) is read again from the top.
+    """
+    with open(path, "rb") as f:
+        header = f.readline()
+        known_header, offset, digest = index.position(path)
+        size = os.fstat(f.fileno()).st_size
+        prefix = hashlib.sha256(header)
+        if known_header == header.decode("utf-8-sig") and len(header) < offset <= size:
+            prefix.update(f.read(offset - len(header)))
+            if prefix.hexdigest() != digest:
+                offset = len(header)
+                prefix = hashlib.sha256(header)
+        else:
+            offset = len(header)
+        f.seek(offset)
+        data = f.read()
+    complete = data[:data.rfind(b"\n") + 1]
+    prefix.update(complete)
+    return (header.decode("utf-8-sig"), complete.decode("utf-8").splitlines(), offset + len(complete),
+            offset == len(header), prefix.hexdigest())
+
+
+def convert_incremental(path: str = input_file,
+                        output_path: str = output_file,
+                        index_path: str = index_file) -> int:
+    """
+    Append the trades of `path` that are not converted yet to `output_path`; returns how many.
+    Only the part of `path` added since the previous run is read (all of it when the part read
+    before was rewritten), and trades already present
+    in the index (e.g. from an overlapping earlier export) are skipped, so re-running is harmless.
+    Identical rows within one file (partial fills at the same time and price) are told apart by
+    how many times their key appeared before in that file, so each of them is converted once.
+    """
+    index = ConversionIndex(index_path)
+    try:
+        header, lines, offset, from_start, digest = _new_lines(path, index)
+        if from_start:
+            index.forget(path)
+        fieldnames = next(csv.reader([header]))
+        new_rows, counts = [], {}
+        for row in csv.DictReader(lines, fieldnames=fieldnames):
+            key = trade_key(row)
+            seen = counts[key] if key in counts else index.occurrences(path, key)
+            counts[key] = seen + 1
+            # the first occurrence keeps the plain key, as in indexes written before occurrences were counted
+            if index.add(f"{key}#{seen}" if seen else key):
+                new_rows.append(convert_row(row))
+        index.set_occurrences(path, counts)
+
+        write_header = not os.path.exists(output_path) or os.path.getsize(output_path) == 0
+        try:
+            with open(output_path, "a", newline="") as outfile:
+                writer = csv.DictWriter(outfile, fieldnames=output_headers)
+                if write_header:
+                    writer.writeheader()
+                writer.writerows(new_rows)
+                outfile.flush()
+                os.fsync(outfile.fileno())
+        except OSError:
+            index.rollback()
+            raise
+        index.commit(path, header, offset, digest)
+        return len(new_rows)
+    finally:
+        index.close()
+
+
+def pending_files(directory: str, index_path: str = index_file) -> List[str]:
+    """CSV files of `directory` with content the index has not seen, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    paths = [os.path.join(directory, name) for name in os.listdir(directory) if name.lower().endswith(".csv")]
+    index = ConversionIndex(index_path)
+    try:
+        pending = [p for p in paths if index.position(p)[1] != os.path.getsize(p)]
+    finally:
+        index.close()
+    return sorted(pending, key=os.path.getmtime)
+
+
+def watch_directory(directory: str = input_directory,
+                    output_path: str = output_file,
+                    index_path: str = index_file,
+                    interval: float = 5.0,
+                    once: bool = False) -> int:
+    """
+    Convert new and grown CSV files of `directory` as they appear (polling every `interval`
+    seconds until Ctrl+C, or a single pass with `once`). Returns the number of trades appended.
+    """
+    appended = 0
+    try:
+        while True:
+            for path in pending_files(directory, index_path):
+                added = convert_incremental(path, output_path, index_path)
+                appended += added
+                if added:
+                    print(f"📄 {os.path.basename(path)}: {added} new trades appended to {output_path}")
+            if once:
+                break
+            time.sleep(interval)
+    except KeyboardInterrupt:
+        print("Stopped watching.")
+    return appended
+
+
+def run_ibkr_conversion():
+    print("1. Full conversion (rewrite the output)")
+    print("2. Incremental conversion of one file (append new trades only)")
+    print("3. Watch a directory for new IBKR exports")
+    mode = input("Choose a mode [1]: ").strip() or "1"
+    if mode == "2":
+        path = input(f"IBKR csv file [{input_file}]: ").strip() or input_file
+        added = convert_incremental(path)
+        print(f"Incremental conversion completed. {added} new trades appended to {output_file}")
+    elif mode == "3":
+        directory = input(f"Directory to watch [{input_directory}]: ").strip() or input_directory
+        print(f"👀 Watching {directory} (Ctrl+C to stop) …")
+        watch_directory(directory)
+    else:
+        convert_ibkr_to_yahoo_finance()
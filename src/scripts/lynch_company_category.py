@@ -1,3 +1,6 @@
+from src.valuation.metrics import METRIC_CODE, metric_values
+from src.valuation.price_history import measured_beta
+from src.valuation.result_cache import memoize
 from src.valuation.yfinance_api import ticket_info
 
 
@@ -38,43 +41,72 @@ def classify_stalwart(market_cap, growth, earnings_growth, pe_ratio, beta):
     else:
         return False
 
-def classify_company(ticker_symbol):
+# `info` fields read by `classify_info`
+CLASSIFY_FIELDS = ["revenueGrowth", "trailingPE", "dividendYield", "payoutRatio", "marketCap",
+                   "fiveYearAvgDividendYield", "earningsGrowth", "freeCashflow", "debtToEquity", "beta", "sector"]
+
+
+@memoize(CLASSIFY_FIELDS, depends=METRIC_CODE)
+def classify_info(info):
+    """Peter Lynch category of one `info` dict (memoized on CLASSIFY_FIELDS)."""
+    growth = info.get("revenueGrowth", 0)
+    pe_ratio = info.get("trailingPE", None)
+    dividend_yield = info.get("dividendYield", 0) or 0
+    payout_ratio = info.get("payoutRatio", 0) or 0
+    market_cap = info.get("marketCap", 0)
+    five_year_dividend_growth = info.get("fiveYearAvgDividendYield", 0)  # Yahoo reports this as average yield, not exact growth
+    earnings_growth = info.get("earningsGrowth", None)
+    peg_ratio = metric_values(info, ["peg"])["peg"]
+    free_cash_flow = info.get("freeCashflow", 0)
+    debt_to_equity = info.get("debtToEquity", 0)
+    beta = info.get("beta", 1)
+
+    if classify_fast_grower(growth, peg_ratio, free_cash_flow, debt_to_equity):
+        return "Fast Grower"
+    if classify_slow_grower(growth, dividend_yield, payout_ratio, market_cap, pe_ratio, five_year_dividend_growth):
+        return "Slow Grower"
+    if classify_stalwart(market_cap, growth, earnings_growth, pe_ratio, beta):
+        return "Stalwart"
+
+    sector = info.get("sector", "").lower()
+    return (f"company from sector: {sector}. "
+            f"Can be one of the: Cyclical, Turnaround, Asset Play. "
+            f"Which is hard to define bt script.")
+
+
+def classify_company(ticker_symbol, use_price_history: bool = False):
+    """
+    Lynch category of one ticker, printing the inputs. Like the vectorized `category` metric it uses
+    Yahoo's beta; with `use_price_history` (the interactive menu) the local price history is brought
+    up to date and the beta measured from it is used instead.
+    """
     try:
         info = ticket_info(ticker_symbol)
+        beta = None
+        if use_price_history:
+            try:
+                beta = measured_beta(str(ticker_symbol), update=True)
+            except Exception as e:
+                print(f"⚠️ No price history for {ticker_symbol}, using Yahoo's beta: {e}")
+        if beta is not None:
+            # Yahoo's beta is often stale or missing; the one measured from daily returns wins
+            print(f"📐 beta measured from price history {beta:.2f} (Yahoo: {info.get('beta')})")
+            info = {**info, "beta": beta}
 
-        growth = info.get("revenueGrowth", 0)
-        print(f"revenueGrowth={growth}")
-        pe_ratio = info.get("trailingPE", None)
-        print(f"trailingPE={pe_ratio}")
-        dividend_yield = info.get("dividendYield", 0) or 0
-        print(f"dividendYield={dividend_yield}")
-        payout_ratio = info.get("payoutRatio", 0) or 0
-        print(f"payoutRatio={payout_ratio}")
-        market_cap = info.get("marketCap", 0)
-        print(f"marketCap={market_cap}")
-        five_year_dividend_growth = info.get("fiveYearAvgDividendYield", 0)  # Yahoo reports this as average yield, not exact growth
-        print(f"fiveYearAvgDividendYield={five_year_dividend_growth}")
-        earnings_growth = info.get("earningsGrowth", None)
-        peg_ratio = pe_ratio / (earnings_growth * 100) if pe_ratio and earnings_growth else None
-        print(f"trailingPE/earningsGrowth*100 = PEG: {pe_ratio}/{(earnings_growth * 100)}={peg_ratio}")
-        free_cash_flow = info.get("freeCashflow", 0)
-        print(f"freeCashflow={free_cash_flow}")
-        debt_to_equity = info.get("debtToEquity", 0)
-        print(f"debtToEquity={debt_to_equity}")
-        beta = info.get("beta", 1)
-        print(f"beta {beta}")
-
-        if classify_fast_grower(growth, peg_ratio, free_cash_flow, debt_to_equity):
-            return "Fast Grower"
-        if classify_slow_grower(growth, dividend_yield, payout_ratio, market_cap, pe_ratio, five_year_dividend_growth):
-            return "Slow Grower"
-        if classify_stalwart(market_cap, growth, earnings_growth, pe_ratio, beta):
-            return "Stalwart"
+        print(f"revenueGrowth={info.get('revenueGrowth', 0)}")
+        print(f"trailingPE={info.get('trailingPE', None)}")
+        print(f"dividendYield={info.get('dividendYield', 0) or 0}")
+        print(f"payoutRatio={info.get('payoutRatio', 0) or 0}")
+        print(f"marketCap={info.get('marketCap', 0)}")
+        print(f"fiveYearAvgDividendYield={info.get('fiveYearAvgDividendYield', 0)}")
+        peg_ratio = metric_values(info, ["peg"])["peg"]
+        print(f"trailingPE/(earningsGrowth*100) = PEG: {info.get('trailingPE', None)}/"
+              f"({info.get('earningsGrowth', None)}*100)={peg_ratio}")
+        print(f"freeCashflow={info.get('freeCashflow', 0)}")
+        print(f"debtToEquity={info.get('debtToEquity', 0)}")
+        print(f"beta {info.get('beta', 1)}")
 
-        sector = info.get("sector", "").lower()
-        return (f"company from sector: {sector}. "
-                f"Can be one of the: Cyclical, Turnaround, Asset Play. "
-                f"Which is hard to define bt script.")
+        return classify_info(info)
 
     except Exception as e:
-        return f"Error processing {ticker_symbol}: {str(e)}"
\ No newline at end of file
+        return f"Error processing {ticker_symbol}: {str(e)}"
@@ -0,0 +1,113 @@
+import numpy as np
+import pandas as pd
+
+from typing import Dict, Optional, Tuple
+
+from src.scripts.company_analysis import score_company
+from src.scripts.convert_ibkr_to_yahoo_finance_trade_report import input_file
+from src.valuation.dcf_vectorized import dcf_per_share
+from src.valuation.fx import FxRates, convert_infos, currency_unit, get_fx_rates, trading_currency
+from src.valuation.portfolio import load_ibkr_trades, aggregate_positions, fetch_infos, fetch_last_prices, \
+    info_frame
+from src.valuation.utility_helpers import fmt_money
+
+output_file = 'portfolio_valuation.csv'
+
+INFO_FIELDS = ["currentPrice", "freeCashflow", "sharesOutstanding", "earningsGrowth"]
+
+
+def value_portfolio(positions: pd.DataFrame,
+                    infos: Dict[str, Dict],
+                    prices: Dict[str, float],
+                    growth_rate: float = 0.0,
+                    years: int = 5,
+                    discount_rate: float = 0.10,
+                    terminal_growth: float = 0.03,
+                    base_currency: Optional[str] = None,
+                    rates: Optional[FxRates] = None) -> Tuple[pd.DataFrame, Dict[str, float]]:
+    """
+    Value every holding in one pass: price, DCF intrinsic value and company score.
+    Prices and DCF values are in each holding's trading currency (pence become pounds); with
+    `base_currency` the money columns and totals are converted to it with one rate per currency.
+    Returns the position-level table and the portfolio totals.
+    """
+    scales = pd.Series({s: currency_unit(info.get("currency"))[1] for s, info in infos.items()}, dtype=float)
+    infos = convert_infos(infos, rates=rates) if infos else infos
+    data = info_frame(infos, INFO_FIELDS).reindex(positions.index)
+    table = positions.copy()
+
+    # Prefer the quote from `info`, fall back to the batched last close (quoted in the minor unit, if any)
+    last_close = pd.Series(prices, dtype=float) / scales.reindex(list(prices)).fillna(1.0)
+    table["price"] = data["currentPrice"].fillna(last_close)
+
+    # Same inputs as calculate_dcf_v2: zero FCF/shares count as missing, growth falls back to earningsGrowth
+    fcf = data["freeCashflow"].replace(0, np.nan)
+    shares_out = data["sharesOutstanding"].replace(0, np.nan)
+    growth = growth_rate if growth_rate != 0.0 else data["earningsGrowth"].fillna(0.05)
+    dcf = dcf_per_share(fcf.to_numpy(), shares_out.to_numpy(), growth, years, discount_rate, terminal_growth)
+    table["intrinsic_per_share"] = dcf["intrinsic_per_share"]
+
+    scores = [score_company(infos.get(symbol, {})) for symbol in table.index]
+    table["score_pct"] = [s["percent"] if s["percent"] is not None else np.nan for s in scores]
+
+    table["market_value"] = table["net_quantity"] * table["price"]
+    table["intrinsic_value"] = table["net_quantity"] * table["intrinsic_per_share"]
+    table["unrealized_pnl"] = table["market_value"] - table["cost_basis"]
+    table["upside_pct"] = (table["intrinsic_per_share"] / table["price"] - 1) * 100
+
+    if base_currency:
+        if "currency" in table:
+            currencies = table["currency"].astype(object)
+        else:
+            currencies = pd.Series(index=table.index, dtype=object)
+        currencies = currencies.fillna(pd.Series({s: trading_currency(infos.get(s, {})) for s in table.index}))
+        table["fx_rate"] = (rates or get_fx_rates()).factors(list(currencies), base_currency)
+        for column in ("net_cost", "cost_basis", "commission", "market_value", "intrinsic_value", "unrealized_pnl"):
+            table[column] = table[column] * table["fx_rate"]
+
+    total_market_value = table["market_value"].sum()
+    table["weight_pct"] = table["market_value"] / total_market_value * 100 if total_market_value else np.nan
+
+    scored = table["score_pct"].notna() & table["market_value"].notna()
+    scored_value = table.loc[scored, "market_value"].sum()
+    totals = {
+        "positions": int(len(table)),
+        "cost": float(table["cost_basis"].sum()),
+        "commission": float(table["commission"].sum()),
+        "market_value": float(total_market_value),
+        "intrinsic_value": float(table["intrinsic_value"].sum()),
+        "unrealized_pnl": float(table["unrealized_pnl"].sum()),
+        "weighted_score_pct": float((table.loc[scored, "score_pct"] * table.loc[scored, "market_value"]).sum()
+                                    / scored_value) if scored_value else None,
+    }
+    return table, totals
+
+
+def run_portfolio_valuation():
+    path = input(f"IBKR trade export [{input_file}]: ").strip() or input_file
+    positions = aggregate_positions(load_ibkr_trades(path))
+    if positions.empty:
+        print("⚠️ No open positions found.")
+        return
+
+    symbols = list(positions.index)
+    print(f"Fetching data for {len(symbols)} symbols …")
+    infos = fetch_infos(symbols)
+    prices = fetch_last_prices(symbols)
+
+    base_currency = input("Report totals in currency [USD]: ").strip().upper() or "USD"
+    table, totals = value_portfolio(positions, infos, prices, base_currency=base_currency)
+    columns = ["net_quantity", "avg_cost", "price", "market_value", "intrinsic_per_share", "upside_pct",
+               "score_pct", "weight_pct"]
+    print(table[columns].round(2).to_markdown(numalign="left", stralign="left"))
+
+    print(f"\n💼 Positions: {totals['positions']} (totals in {base_currency})")
+    print(f"💰 Cost basis: {fmt_money(totals['cost'])}")
+    print(f"💵 Market value: {fmt_money(totals['market_value'])}")
+    print(f"📌 Intrinsic value (DCF): {fmt_money(totals['intrinsic_value'])}")
+    print(f"📈 Unrealized P&L: {fmt_money(totals['unrealized_pnl'])}")
+    if totals["weighted_score_pct"] is not None:
+        print(f"📊 Value-weighted score: {totals['weighted_score_pct']:.1f}%")
+
+    table.to_csv(output_file)
+    print(f"\n📄 Position table written to {output_file}")
@@ -0,0 +1,52 @@
+"""
+Local daily price history and the analytics computed from it, for any list of tickers:
+
+    python -m src.scripts.price_history_report AAPL MSFT SAP.DE
+"""
+import argparse
+
+from typing import List, Optional
+
+from src.valuation.price_history import benchmark_for, get_price_history, PriceHistory, universe_metrics
+
+output_file = 'price_history_metrics.csv'
+
+
+def price_history_report(symbols: List[str], directory: Optional[str] = None, output: str = output_file) -> None:
+    """Update the stored history of `symbols` (and their indexes) and print return, volatility, drawdown, beta."""
+    store = PriceHistory(directory) if directory else get_price_history()
+    symbols = [s.upper() for s in symbols]
+    added = store.update(symbols + sorted({benchmark_for(s) for s in symbols}))
+    print(f"💾 {sum(added.values())} new daily records stored in {store.directory}")
+
+    table = universe_metrics(symbols, store)
+    table.insert(0, "index", [benchmark_for(s) for s in symbols])
+    print("\n📊 Last year of daily prices:")
+    print(f"{'Symbol':<10}{'Index':<8}{'Return':>9}{'Vol':>8}{'Vol 1M':>8}{'Max DD':>9}{'Beta':>7}")
+    for symbol, row in table.iterrows():
+        print(f"{symbol:<10}{row['index']:<8}{row['return']:>9.1%}{row['volatility']:>8.1%}"
+              f"{row['recent_volatility']:>8.1%}{row['max_drawdown']:>9.1%}{row['beta']:>7.2f}")
+    table.to_csv(output)
+    print(f"📄 Results written to {output}")
+
+
+def run_price_history_report():
+    raw = input("Enter stock symbols separated by commas (e.g., AAPL,MSFT,SAP.DE): ")
+    symbols = [s.strip() for s in raw.split(",") if s.strip()]
+    if not symbols:
+        print("❌ No symbols given.")
+        return
+    price_history_report(symbols)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Update local price history and print its analytics.")
+    parser.add_argument("symbols", nargs="+")
+    parser.add_argument("--dir", help="directory of the per-ticker history files (default: in the data directory)")
+    parser.add_argument("--output", default=output_file)
+    args = parser.parse_args()
+    price_history_report(args.symbols, args.dir, args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""
+FIFO cost basis and realized P&L of an IBKR trade export:
+
+    python -m src.scripts.realized_pnl "Yahoo_finance_export 2.csv" --workers 4
+"""
+import argparse
+import os
+import time
+
+from src.scripts.convert_ibkr_to_yahoo_finance_trade_report import input_file
+from src.valuation.cost_basis import realized_pnl
+
+closed_lots_file = 'realized_lots.csv'
+open_lots_file = 'open_lots.csv'
+summary_file = 'pnl_summary.csv'
+
+
+def realized_pnl_report(path: str = input_file, workers: int = 1) -> None:
+    """Write the closed lots, open lots and per-symbol summary of `path` and print the summary."""
+    start = time.perf_counter()
+    summary, lots = realized_pnl(path, closed_lots_file, workers)
+    print(f"Matched {int(summary['trades'].sum())} trades in {time.perf_counter() - start:.2f}s")
+
+    print("\n💰 Realized P&L (FIFO, commissions included):")
+    print(f"{'Symbol':<10}{'Trades':>8}{'Closed':>8}{'Realized':>14}{'Open qty':>12}{'Cost basis':>14}")
+    for symbol, row in summary.iterrows():
+        print(f"{symbol:<10}{int(row['trades']):>8}{int(row['closed_lots']):>8}{row['realized_pnl']:>14,.2f}"
+              f"{row['open_quantity']:>12,.2f}{row['open_cost_basis']:>14,.2f}")
+    for currency, total in summary.groupby("currency")["realized_pnl"].sum().items():
+        print(f"Total realized {currency or '(no currency)'}: {total:,.2f}")
+
+    summary.to_csv(summary_file)
+    lots.to_csv(open_lots_file, index=False)
+    print(f"📄 Closed lots written to {closed_lots_file}, open lots to {open_lots_file}, summary to {summary_file}")
+
+
+def run_realized_pnl():
+    path = input(f"IBKR csv file [{input_file}]: ").strip() or input_file
+    raw_workers = input("Worker processes (symbols are split between them) [1]: ").strip()
+    realized_pnl_report(path, int(raw_workers) if raw_workers.isdigit() else 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FIFO cost basis and realized P&L of an IBKR trade export.")
+    parser.add_argument("path", nargs="?", default=input_file)
+    parser.add_argument("--workers", type=int, default=1, help=f"processes, 0 for all {os.cpu_count()} cores")
+    args = parser.parse_args()
+    realized_pnl_report(args.path, args.workers or None)
+
+
+if __name__ == "__main__":
+    main()
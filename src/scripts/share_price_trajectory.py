@@ -1,5 +1,9 @@
+import argparse
+import numpy as np
 import pandas as pd
 
+from src.valuation.scenario_sweep import DEFAULT_CHUNK_SIZE, grid_scenarios, grid_size, stream_projections, \
+    write_projections
 from src.valuation.yfinance_api import ticket_info
 
 
@@ -127,19 +131,69 @@ SCENARIOS = {
     }
 }
 
-# Run the projection
-info = ticket_info("BME.L")
-print(info)
 
-
-final_results_df = project_company_price(
-    current_share_price=CURRENT_SHARE_PRICE,
-    current_shares_outstanding=CURRENT_SHARES_OUTSTANDING,
-    base_market_cap_for_upside=BASE_MARKET_CAP_FOR_UPSIDE,
-    initial_projected_revenue_year1=INITIAL_PROJECTED_REVENUE_2025,
-    projection_years=PROJECTION_YEARS,
-    scenarios=SCENARIOS
-)
-
-print("\n--- Summary of Results ---")
-print(final_results_df.to_markdown(numalign="left", stralign="left"))
+def sweep_company_price(output_path: str,
+                        growth_rates,
+                        margins,
+                        pe_multiples,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """
+    Streaming counterpart of `project_company_price` for large sweeps: every combination of the
+    growth, margin and P/E ranges is projected chunk by chunk and written straight to
+    `output_path` (.csv or .parquet), in constant memory. Returns the number of scenarios.
+    """
+    model = dict(current_shares_outstanding=CURRENT_SHARES_OUTSTANDING,
+                 base_market_cap_for_upside=BASE_MARKET_CAP_FOR_UPSIDE,
+                 initial_projected_revenue_year1=INITIAL_PROJECTED_REVENUE_2025,
+                 projection_years=PROJECTION_YEARS)
+    scenarios = grid_scenarios(growth_rates, margins, pe_multiples, chunk_size)
+    return write_projections(stream_projections(scenarios, **model), output_path,
+                             total=grid_size(growth_rates, margins, pe_multiples))
+
+
+def parse_range(text: str) -> np.ndarray:
+    """"start:stop:step" (stop included) or a single value, e.g. "0.02:0.10:0.005"."""
+    parts = [float(p) for p in text.split(":")]
+    if len(parts) == 1:
+        return np.array(parts)
+    if len(parts) != 3 or parts[2] <= 0:
+        raise argparse.ArgumentTypeError(f"expected start:stop:step with a positive step, got {text!r}")
+    start, stop, step = parts
+    return np.arange(start, stop + step / 2, step)
+
+
+def run_share_price_trajectory():
+    info = ticket_info("BME.L")
+    print(info)
+
+    final_results_df = project_company_price(
+        current_share_price=CURRENT_SHARE_PRICE,
+        current_shares_outstanding=CURRENT_SHARES_OUTSTANDING,
+        base_market_cap_for_upside=BASE_MARKET_CAP_FOR_UPSIDE,
+        initial_projected_revenue_year1=INITIAL_PROJECTED_REVENUE_2025,
+        projection_years=PROJECTION_YEARS,
+        scenarios=SCENARIOS
+    )
+
+    print("\n--- Summary of Results ---")
+    print(final_results_df.to_markdown(numalign="left", stralign="left"))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Project the share price under revenue growth, margin and P/E "
+                                                 "scenarios; with --sweep, over every combination of the ranges.")
+    parser.add_argument("--sweep", metavar="OUTPUT", help="write the full grid to this .csv or .parquet file")
+    parser.add_argument("--growth", type=parse_range, default="0.0:0.10:0.01", help="revenue growth start:stop:step")
+    parser.add_argument("--margin", type=parse_range, default="0.02:0.10:0.01", help="profit margin start:stop:step")
+    parser.add_argument("--pe", type=parse_range, default="10:20:1", help="P/E multiple start:stop:step")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args()
+    if not args.sweep:
+        run_share_price_trajectory()
+        return
+    count = sweep_company_price(args.sweep, args.growth, args.margin, args.pe, args.chunk_size)
+    print(f"📄 {count} scenarios written to {args.sweep}")
+
+
+if __name__ == "__main__":
+    main()
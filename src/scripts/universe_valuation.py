@@ -0,0 +1,59 @@
+import datetime
+import os
+import time
+
+from typing import List
+
+from src.valuation.parallel import value_snapshot_file
+from src.valuation.portfolio import fetch_infos
+from src.valuation.result_cache import get_result_cache
+from src.valuation.snapshot_file import write_snapshot, write_dated_snapshot
+from src.valuation.snapshot_history import SnapshotHistory
+from src.valuation.symbols import index_listings
+
+output_file = 'universe_valuation.csv'
+snapshot_file = 'universe_snapshot.bin'
+# Every fresh fetch is also kept here as <YYYY-MM-DD>.bin for backtests
+snapshot_store = 'snapshots'
+# Raw info payloads of every fetch, stored as compressed daily deltas
+history_db = 'snapshot_history.db'
+DEFAULT_INDEXES = ('S&P 500', 'DAX', 'FTSE 100')
+
+
+def index_symbols(indexes: List[str] = DEFAULT_INDEXES) -> List[str]:
+    """Distinct Yahoo symbols of the given indexes, in listing order (see symbols.resolve_symbol)."""
+    return list(dict.fromkeys(yahoo for _, yahoo, _ in index_listings(tuple(indexes))))
+
+
+def run_universe_valuation():
+    path = input(f"Snapshot file to value (press ↵ to fetch a fresh one into {snapshot_file}): ").strip()
+    if not path:
+        raw = input("Indexes (comma-separated) [S&P 500, DAX, FTSE 100]: ").strip()
+        indexes = [i.strip() for i in raw.split(",") if i.strip()] or list(DEFAULT_INDEXES)
+        symbols = index_symbols(indexes)
+        print(f"Fetching data for {len(symbols)} symbols …")
+        infos = fetch_infos(symbols)
+        write_snapshot(snapshot_file, infos)
+        write_dated_snapshot(snapshot_store, datetime.date.today(), infos)
+        history = SnapshotHistory(history_db)
+        # Only the default universe is the complete set the history tracks: a run over fewer
+        # indexes must not tombstone the tickers of the others
+        stats = history.record(datetime.date.today(), infos, full=sorted(indexes) == sorted(DEFAULT_INDEXES))
+        history.close()
+        print(f"🗂️ History: {stats['full']} full, {stats['delta']} changed, {stats['unchanged']} unchanged, "
+              f"{stats['removed']} removed, {stats['skipped']} skipped")
+        print(f"💾 Snapshot written to {snapshot_file} and {snapshot_store}/")
+        path = snapshot_file
+
+    raw_workers = input(f"Worker processes [{os.cpu_count()}]: ").strip()
+    workers = int(raw_workers) if raw_workers.isdigit() else None
+
+    start = time.perf_counter()
+    cache = get_result_cache()
+    table = value_snapshot_file(path, workers=workers, cache=cache)
+    print(f"Valued {len(table)} tickers in {time.perf_counter() - start:.2f}s")
+    if cache is not None:
+        print(f"♻️ {cache.stats['value_columns hits']} unchanged tickers served from {cache.path}")
+
+    table.to_csv(output_file)
+    print(f"📄 Results written to {output_file}")
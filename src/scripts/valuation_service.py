@@ -0,0 +1,361 @@
+# valuation_service.py
+"""
+A long-running local HTTP/JSON service exposing the valuation operations.
+
+Endpoints (GET, parameters in the query string)
+---------
+* /health
+* /pegy?symbol=AAPL
+* /dcf?symbol=AAPL&growth=0&years=5&discount=0.10&terminal=0.03
+* /comps?symbol=AAPL&multiples=P/E,P/S,EV/EBITDA&peers=MSFT,GOOGL   (peers default to suggested peers)
+* /score?symbol=AAPL
+* /lynch?symbol=AAPL
+* /intrinsic?symbol=AAPL&discount=0.08&terminal=0.03&growth=0.10&years=5
+
+`info` payloads (in the shared ticker handles), intrinsic values and the peer index stay in memory
+between requests, so repeated lookups skip both the interpreter start-up and the network. Requests are served concurrently by an
+asyncio server; blocking Yahoo calls run on a thread pool.
+
+Run
+---
+$ python -m src.scripts.valuation_service --port 8765 --warm AAPL,MSFT
+$ python -m src.scripts.valuation_service --bench "http://127.0.0.1:8765/score?symbol=AAPL" --requests 500
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import math
+import threading
+import time
+import numpy as np
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from src.scripts.company_analysis import score_company
+from src.scripts.lynch_company_category import classify_info
+from src.valuation import columnar
+from src.valuation.cache import TTLCache
+from src.valuation.columnar import snapshot_matrix, as_columns
+from src.valuation.fetch_scheduler import FetchError, Priority
+from src.valuation.fx import convert_infos
+from src.valuation.ticker_handle import drop_handle, handle_count
+from src.valuation.utility_helpers import safe_get
+from src.valuation.yfinance_api import ticket_info, calculate_dcf_v2, apply_comps, peer_multiples_from_infos, \
+    suggest_multiple_peers, load_peer_index, dcf_intrinsic_value, interpret_pegy_ratio
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+MULTIPLES = ["P/E", "P/S", "EV/EBITDA"]
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 422: "Unprocessable Entity",
+           500: "Internal Server Error", 502: "Bad Gateway"}
+
+
+class RequestError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def _json_ready(value):
+    """Make numpy scalars and NaN/inf JSON friendly."""
+    if isinstance(value, dict):
+        return {k: _json_ready(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_json_ready(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and not math.isfinite(value):
+        return None
+    return value
+
+
+# --------------------------- Valuation operations -------------------------------
+
+class ValuationService:
+    """Valuation operations backed by in-memory caches that stay warm across requests."""
+
+    def __init__(self, info_ttl: float = 900.0, max_workers: int = 16):
+        self.result_cache = TTLCache(info_ttl)
+        # Requests run on `executor`; the peer fetches they fan out to get their own pool, so a
+        # request never waits for a worker of the pool it occupies
+        self.executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.peer_executor = ThreadPoolExecutor(max_workers=max_workers)
+        self.routes: Dict[str, Callable[[Dict[str, str]], Dict]] = {
+            "/health": self.health,
+            "/pegy": self.pegy,
+            "/dcf": self.dcf,
+            "/comps": self.comps,
+            "/score": self.score,
+            "/lynch": self.lynch,
+            "/intrinsic": self.intrinsic,
+        }
+
+    # -- data ---------------------------------------------------------------------
+
+    def info(self, symbol: str, priority: Priority = Priority.TARGET) -> Dict:
+        """`info` from the shared ticker handle; an empty answer is not kept, the next request asks again."""
+        info = ticket_info(symbol, priority)
+        if not info:
+            drop_handle(symbol)
+        return info
+
+    def infos(self, symbols: List[str]) -> Tuple[List[Dict], Dict[str, str]]:
+        """Peer infos fetched concurrently; returns the infos and the failure reason of each missing peer."""
+        def load(symbol):
+            try:
+                return self.info(symbol, Priority.PEER), None
+            except FetchError as e:
+                return None, e.reason
+        infos, failures = [], {}
+        for symbol, (info, reason) in zip(symbols, self.peer_executor.map(load, symbols)):
+            if info:
+                infos.append(info)
+            elif reason:
+                failures[symbol] = reason
+        return infos, failures
+
+    def warm(self, symbols: List[str]) -> None:
+        load_peer_index(('S&P 500', 'DAX', 'FTSE 100'))
+        self.infos(symbols)
+
+    # -- handlers -----------------------------------------------------------------
+
+    @staticmethod
+    def _symbol(params: Dict[str, str]) -> str:
+        symbol = params.get("symbol", "").strip().upper()
+        if not symbol:
+            raise RequestError(400, "Missing 'symbol' parameter.")
+        return symbol
+
+    @staticmethod
+    def _float(params: Dict[str, str], name: str, default: float) -> float:
+        try:
+            return float(params[name]) if name in params else default
+        except ValueError:
+            raise RequestError(400, f"Parameter '{name}' must be a number.")
+
+    def health(self, params: Dict[str, str]) -> Dict:
+        return {"status": "ok", "cached_handles": handle_count()}
+
+    def pegy(self, params: Dict[str, str]) -> Dict:
+        symbol = self._symbol(params)
+        _, matrix = snapshot_matrix({symbol: self.info(symbol)})
+        result = columnar.pegy(as_columns(matrix))
+        value = float(result["value"][0])
+        if math.isnan(value):
+            raise RequestError(422, "PEGY/PEG ratio not available (missing data).")
+        return {"symbol": symbol, "type": "PEGY" if result["is_pegy"][0] else "PEG", "value": value,
+                "interpretation": interpret_pegy_ratio(value)}
+
+    def dcf(self, params: Dict[str, str]) -> Dict:
+        symbol = self._symbol(params)
+        # Same units as /comps and the CLI valuation: pence-quoted tickers are valued in pounds
+        info = convert_infos({symbol: self.info(symbol)})[symbol]
+        result = calculate_dcf_v2(info,
+                                  self._float(params, "growth", 0.0),
+                                  int(self._float(params, "years", 5)),
+                                  self._float(params, "discount", 0.10),
+                                  self._float(params, "terminal", 0.03))
+        if not result:
+            raise RequestError(422, "DCF valuation unavailable (missing data).")
+        return {"symbol": symbol, "currency": info.get("currency"), **result}
+
+    def comps(self, params: Dict[str, str]) -> Dict:
+        symbol = self._symbol(params)
+        info = self.info(symbol)
+        multiples = [m.strip().upper() for m in params.get("multiples", ",".join(MULTIPLES)).split(",")]
+        multiples = [m for m in multiples if m in MULTIPLES]
+        if not multiples:
+            raise RequestError(400, f"Choose multiples from {', '.join(MULTIPLES)}.")
+        if params.get("peers"):
+            peers = [p.strip().upper() for p in params["peers"].split(",") if p.strip()]
+        else:
+            industry = safe_get(info, "industry")
+            peers = suggest_multiple_peers(industry) if industry else []
+        peers = [p for p in dict.fromkeys(peers) if p != symbol]
+        if not peers:
+            raise RequestError(422, "No peers specified or suggested.")
+
+        peer_infos, failures = self.infos(peers)
+        peer_infos = list(convert_infos(dict(enumerate(peer_infos))).values())
+        info = convert_infos({symbol: info})[symbol]
+        peer_lists = peer_multiples_from_infos(peer_infos, multiples)
+        avg_multiples = {m: float(np.mean(vals)) for m, vals in peer_lists.items() if vals}
+        return {"symbol": symbol, "currency": info.get("currency"), "peers": peers, "failed_peers": failures,
+                "avg_multiples": avg_multiples, "implied_prices": apply_comps(info, avg_multiples)}
+
+    def score(self, params: Dict[str, str]) -> Dict:
+        symbol = self._symbol(params)
+        return {"symbol": symbol, **score_company(self.info(symbol))}
+
+    def lynch(self, params: Dict[str, str]) -> Dict:
+        symbol = self._symbol(params)
+        info = self.info(symbol)
+        # The menu's classifier, so the endpoint and classify_company agree (sector text included)
+        try:
+            category = classify_info(info)
+        except TypeError:
+            raise RequestError(422, "Lynch category unavailable (missing data).")
+        return {"symbol": symbol, "category": category, "sector": info.get("sector")}
+
+    def intrinsic(self, params: Dict[str, str]) -> Dict:
+        symbol = self._symbol(params)
+        args = (self._float(params, "discount", 0.08), self._float(params, "terminal", 0.03),
+                self._float(params, "growth", 0.10), int(self._float(params, "years", 5)))
+        try:
+            value, equity, enterprise = self.result_cache.get_or_load(
+                ("intrinsic", symbol) + args, lambda: dcf_intrinsic_value(symbol, *args))
+        except ValueError as e:
+            raise RequestError(422, str(e))
+        return {"symbol": symbol, "intrinsic_per_share": value, "equity_value": equity,
+                "enterprise_value": enterprise}
+
+    def handle(self, path: str, params: Dict[str, str]) -> Tuple[int, Dict]:
+        handler = self.routes.get(path.rstrip("/") or "/health")
+        if handler is None:
+            return 404, {"error": f"Unknown endpoint {path}", "endpoints": sorted(self.routes)}
+        try:
+            return 200, handler(params)
+        except RequestError as e:
+            return e.status, {"error": str(e)}
+        except FetchError as e:
+            return 502, {"error": str(e), "throttled": e.throttled}
+        except Exception as e:
+            return 500, {"error": f"{type(e).__name__}: {e}"}
+
+
+# --------------------------- HTTP server ----------------------------------------
+
+async def _handle_connection(service: ValuationService, reader: asyncio.StreamReader,
+                             writer: asyncio.StreamWriter) -> None:
+    loop = asyncio.get_running_loop()
+    try:
+        while True:
+            request_line = await reader.readline()
+            if not request_line.strip():
+                break
+            method, target, version = request_line.decode("latin-1").split()
+            headers = {}
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b"\n", b""):
+                    break
+                name, _, value = line.decode("latin-1").partition(":")
+                headers[name.strip().lower()] = value.strip()
+            length = int(headers.get("content-length") or 0)
+            if length:
+                await reader.readexactly(length)
+
+            if method != "GET":
+                status, payload = 405, {"error": "Only GET is supported."}
+            else:
+                url = urlsplit(target)
+                params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+                status, payload = await loop.run_in_executor(service.executor, service.handle, url.path, params)
+
+            body = json.dumps(_json_ready(payload)).encode("utf-8")
+            keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+            writer.write((f"HTTP/1.1 {status} {REASONS[status]}\r\n"
+                          f"Content-Type: application/json\r\n"
+                          f"Content-Length: {len(body)}\r\n"
+                          f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n").encode("latin-1") + body)
+            await writer.drain()
+            if not keep_alive:
+                break
+    except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+        pass
+    finally:
+        writer.close()
+
+
+async def serve_async(service: ValuationService, host: str = DEFAULT_HOST, port: int = DEFAULT_PORT,
+                      ready: Optional[threading.Event] = None) -> None:
+    server = await asyncio.start_server(lambda r, w: _handle_connection(service, r, w), host, port)
+    print(f"🌐 Valuation service listening on http://{host}:{port}")
+    if ready:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, warm: Optional[List[str]] = None) -> None:
+    service = ValuationService()
+    if warm:
+        print(f"Warming caches for {', '.join(warm)} …")
+        service.warm(warm)
+    try:
+        asyncio.run(serve_async(service, host, port))
+    except KeyboardInterrupt:
+        print("Service stopped.")
+
+
+# --------------------------- Load test client -----------------------------------
+
+def load_test(url: str, requests: int = 200, concurrency: int = 10) -> Dict[str, float]:
+    """Fire `requests` GETs at `url` from `concurrency` keep-alive connections and report latencies (ms)."""
+    parts = urlsplit(url)
+    target = parts.path + (f"?{parts.query}" if parts.query else "")
+    latencies: List[float] = []
+    errors = [0]
+    lock = threading.Lock()
+    counter = iter(range(requests))
+
+    def worker():
+        connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+        while True:
+            with lock:
+                if next(counter, None) is None:
+                    break
+            start = time.perf_counter()
+            try:
+                connection.request("GET", target)
+                response = connection.getresponse()
+                response.read()
+                failed = response.status >= 500
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                connection = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+                failed = True
+            elapsed = (time.perf_counter() - start) * 1000
+            with lock:
+                latencies.append(elapsed)
+                errors[0] += failed
+        connection.close()
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    wall = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    percentile = lambda p: ordered[min(len(ordered) - 1, int(p * len(ordered)))] if ordered else float("nan")
+    return {"requests": len(ordered), "errors": errors[0], "throughput_rps": len(ordered) / wall,
+            "p50_ms": percentile(0.50), "p95_ms": percentile(0.95), "p99_ms": percentile(0.99)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local valuation HTTP/JSON service.")
+    parser.add_argument("--host", default=DEFAULT_HOST)
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    parser.add_argument("--warm", default="", help="comma-separated tickers to prefetch on start")
+    parser.add_argument("--bench", metavar="URL", help="run the load test client against URL instead of serving")
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=10)
+    args = parser.parse_args()
+
+    if args.bench:
+        for name, value in load_test(args.bench, args.requests, args.concurrency).items():
+            print(f"{name}: {value:.2f}" if isinstance(value, float) else f"{name}: {value}")
+    else:
+        serve(args.host, args.port, [s.strip().upper() for s in args.warm.split(",") if s.strip()])
+
+
+if __name__ == "__main__":
+    main()
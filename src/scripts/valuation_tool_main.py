@@ -28,16 +28,36 @@ The script will interactively ask for:
 * Optional DCF parameters (defaults can be accepted by pressing ↵)
 """
 
-import numpy as np
-
-from src.valuation.reporting import export_report
+from typing import Dict, Optional
+
+from src.valuation.fx import convert_infos
+from src.valuation.growth import default_growth, statement_history
+from src.valuation.metrics import metric_values
+from src.valuation.reporting import comps_progress_line, export_report, sensitivity_lines
+from src.valuation.symbols import resolve_symbol
+from src.valuation.ticker_handle import get_handle
 from src.valuation.utility_helpers import safe_get, fmt_price
-from src.valuation.yfinance_api import ticket_info, calculate_pegy, calculate_dcf_v2, collect_peer_multiples, \
-    apply_comps, rule_of_40, suggest_multiple_peers, interpret_pegy_ratio
+from src.valuation.yfinance_api import ticket_info, calculate_pegy, calculate_dcf_v2, progressive_comps, \
+    rule_of_40, suggest_multiple_peers, interpret_pegy_ratio, dcf_sensitivity, calculate_multi_stage_dcf, \
+    COMPS_DEADLINE
 
 
 # --------------------------- Main interactive flow ------------------------------
 
+def history_growth(stock) -> Optional[Dict]:
+    """Growth of FCF (or revenue when FCF does not fit a trend) over the statement history, as the DCF default."""
+    try:
+        history = statement_history(stock, ["fcf", "revenue"])
+    except Exception as e:
+        print(f"⚠️ Statement history unavailable: {e}")
+        return None
+    for series in ("fcf", "revenue"):
+        trend = default_growth(history, series)
+        if trend:
+            return {**trend, "series": "free cash flow" if series == "fcf" else "revenue"}
+    return None
+
+
 def prompt_float(prompt: str, default: float) -> float:
     raw = input(f"{prompt} [{default}]: ").strip()
     try:
@@ -57,16 +77,19 @@ def run_valuation():
         if not symbol:
             continue
 
-        info = ticket_info(symbol)
+        stock = get_handle(symbol.upper())
+        # Price and statements in the trading currency (e.g. pence -> pounds), as the peers are compared
+        info = convert_infos({symbol: ticket_info(stock)})[symbol]
+        currency = info.get("currency", "")
 
         price = safe_get(info, "currentPrice")
         if price:
-            print(f"\n💵Current market price for {symbol.upper()}: {fmt_price(price)}")
+            print(f"\n💵Current market price for {symbol.upper()}: {fmt_price(price)} {currency}")
         else:
             print("\n⚠️ Current price unavailable.")
 
         # ---------------- PEGY ----------------
-        pegy_val = calculate_pegy(symbol, info)
+        pegy_val = calculate_pegy(info)
         if pegy_val:
             print(f"📊 {pegy_val['type']} ratio: {pegy_val['value']:.2f}")
             if pegy_val['type'] == "PEG":
@@ -77,21 +100,41 @@ def run_valuation():
             print("PEGY/PEG ratio not available (missing data).")
 
         # ---------------- DCF -----------------
+        trend = history_growth(stock)
         print("\nEnter DCF assumptions (press ↵ to accept default):")
-        g_rate = prompt_float("FCF growth rate (will be fetch from company info, if not specified)", 0.0)
+        if trend:
+            g_rate = prompt_float(f"FCF growth rate (trend of {trend['series']}: R² {trend['r2']:.2f} over "
+                                  f"{trend['points']} years)", round(trend["growth"], 4))
+        else:
+            g_rate = prompt_float("FCF growth rate (will be fetch from company info, if not specified)", 0.0)
         d_rate = prompt_float("Discount rate (as decimal)", 0.10)
         t_growth = prompt_float("Terminal growth rate (as decimal)", 0.03)
-        years = int(prompt_float("Projection years", 5))
-
-        dcf_res = calculate_dcf_v2(info, g_rate, years, d_rate, t_growth)
+        model = input("DCF model – 1: constant growth, 2: multi-stage (high growth, fade, terminal) [1]: ").strip()
+        if model == "2":
+            years = int(prompt_float("High-growth years", 5))
+            fade_years = int(prompt_float("Years fading linearly to terminal growth", 5))
+            dcf_res = calculate_multi_stage_dcf(info, g_rate, years, fade_years, d_rate, t_growth)
+        else:
+            years, fade_years = int(prompt_float("Projection years", 5)), 0
+            dcf_res = calculate_dcf_v2(info, g_rate, years, d_rate, t_growth)
         if dcf_res:
             print("Result: ")
-            print(f"💰 Discounted Cash Flow (5y): {fmt_price(dcf_res['pv_fcfs'])}")
+            if "pv_high_growth" in dcf_res:
+                print(f"💰 High-growth stage ({years}y at {dcf_res['high_growth']:.2%}): "
+                      f"{fmt_price(dcf_res['pv_high_growth'])}")
+                print(f"💰 Fade stage ({fade_years}y): {fmt_price(dcf_res['pv_fade'])}")
+            print(f"💰 Discounted Cash Flow ({years + fade_years}y): {fmt_price(dcf_res['pv_fcfs'])}")
             print(f"💰 Terminal value (Gordon growth model): {fmt_price(dcf_res['pv_terminal'])}")
             print(f"💰 Total equity: {fmt_price(dcf_res['total_equity'])}")
             print(f"📌 Intrinsic value per share (DCF): {fmt_price(dcf_res['intrinsic_per_share'])}")
         else:
             print("⚠️ DCF valuation unavailable (missing data).")
+        # The analytic sensitivities are for the constant-growth model
+        sensitivity = dcf_sensitivity(info, g_rate, years, d_rate, t_growth) if dcf_res and model != "2" else None
+        if sensitivity:
+            print("\n📐 DCF sensitivity (first-order change of intrinsic value per share):")
+            for line in sensitivity_lines(sensitivity):
+                print(line)
 
         # -------------- Peer suggestion ---------------
         industry = safe_get(info, "industry")
@@ -102,8 +145,9 @@ def run_valuation():
             if suggested:
                 print(f"\n🤝 Suggested peers in same industry ({industry}): {', '.join(suggested)}")
         manual_peers = input("Enter additional/comma‑separated peer tickers (or press ↵ to use suggested only): ")
-        extra = [p.strip().upper() for p in manual_peers.split(',') if p.strip()]
+        extra = [resolve_symbol(p) for p in manual_peers.split(',') if p.strip()]
         peer_list = list({*suggested, *extra})  # unique set
+        comps_peers = None
         if not peer_list:
             print("⚠️ No peers specified – skipping Comparable valuation.")
             comps_prices = {}
@@ -119,18 +163,32 @@ def run_valuation():
                 comps_prices = {}
                 avg_mults = {}
             else:
-                print("Fetching peer multiples … this may take a moment.")
-                peer_mult_lists = collect_peer_multiples(peer_list, chosen_multiples)
-                avg_mults = {m: np.mean(vals) for m, vals in peer_mult_lists.items() if vals}
+                deadline = prompt_float("Seconds to wait for peers", COMPS_DEADLINE)
+                print("Fetching peer multiples (implied prices update as peers answer) …")
+                failed_peers = {}
+                for progress in progressive_comps(info, peer_list, chosen_multiples, deadline, failed_peers):
+                    print(comps_progress_line(progress))
+                late = set(progress.late)
+                failed = [p for p in failed_peers if p not in late]
+                if failed:
+                    print(f"⚠️ {len(failed)} of {len(peer_list)} peers could not be fetched "
+                          f"and are excluded: {', '.join(failed)}")
+                if late:
+                    print(f"⏱️ {len(late)} peers did not answer within {deadline:.0f}s and are excluded: "
+                          f"{', '.join(progress.late)}")
+                avg_mults = progress.averages
+                comps_peers = progress._asdict()
                 if not avg_mults:
                     print("Insufficient peer data – skipping Comparable valuation.")
                     comps_prices = {}
                 else:
-                    comps_prices = apply_comps(info, avg_mults)
+                    comps_prices = progress.implied
                     if comps_prices:
-                        print("\nComparable valuation (implied prices):")
+                        print(f"\nComparable valuation (implied prices, {progress.peers} of {progress.total} "
+                              f"peers answered):")
                         for m, p in comps_prices.items():
-                            print(f"{m}: {fmt_price(p)} (avg multiple {avg_mults[m]:.2f})")
+                            print(f"{m}: {fmt_price(p)} (avg multiple {avg_mults[m]:.2f}, "
+                                  f"{progress.counts[m]} peers)")
                     else:
                         print("Comparable valuation could not be calculated (missing target data).")
         print("")
@@ -138,9 +196,10 @@ def run_valuation():
         # -------------- Rule of 40 ---------------
 
         print("")
-        revenue_growth = info.get("revenueGrowth", 0) * 100
+        inputs = metric_values(info, ["revenue_growth_pct", "operating_margin_pct"])
+        revenue_growth = inputs["revenue_growth_pct"]
         print(f"Revenue growth: {revenue_growth}%")
-        profitability = info.get("operatingMargins", 0) * 100
+        profitability = inputs["operating_margin_pct"]
         print(f"Operating margins: {profitability}%")
         rule40 = rule_of_40(revenue_growth, profitability)
         print("📐 Rule of 40:", rule40["message"])
@@ -148,5 +207,6 @@ def run_valuation():
 
         # -------------- Export report ---------------
         report_name = f"{symbol.upper()}_valuation_report.txt"
-        export_report(report_name, symbol, price, pegy_val, dcf_res, comps_prices, avg_mults, rule40)
+        export_report(report_name, symbol, price, pegy_val, dcf_res, comps_prices, avg_mults, rule40, sensitivity,
+                      comps_peers)
         print(f"\n📄 Report saved to {report_name}\n")
@@ -0,0 +1,28 @@
+from typing import Optional
+
+from src.valuation.prefetch import Prefetcher
+
+_prefetcher: Optional[Prefetcher] = None
+
+
+def run_watchlist_prefetch():
+    global _prefetcher
+    if _prefetcher is not None and _prefetcher.running:
+        print(f"🔄 Prefetching {len(_prefetcher.watchlist)} tickers "
+              f"({_prefetcher.stats['refreshed']} refreshes, {len(_prefetcher.failures)} failing).")
+        if input("Stop it? (y/N): ").strip().lower() == "y":
+            _prefetcher.stop()
+            print("Prefetching stopped.")
+        return
+
+    raw = input("Watchlist tickers (comma-separated, e.g. AAPL,MSFT): ")
+    symbols = [s.strip().upper() for s in raw.split(",") if s.strip()]
+    if not symbols:
+        print("⚠️ No tickers given.")
+        return
+    include_peers = input("Also watch suggested peers? (Y/n): ").strip().lower() != "n"
+    raw_budget = input("Request budget per minute [60]: ").strip()
+    budget = float(raw_budget) if raw_budget.replace(".", "", 1).isdigit() else 60.0
+
+    _prefetcher = Prefetcher(symbols, include_peers=include_peers, budget=budget).start()
+    print(f"🔄 Keeping {', '.join(symbols)}{' and their peers' if include_peers else ''} warm in the background.")
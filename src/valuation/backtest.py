@@ -0,0 +1,108 @@
+import datetime
+import numpy as np
+import pandas as pd
+
+from typing import List, Dict, Optional, Sequence, Tuple
+
+from src.valuation import columnar
+from src.valuation.snapshot_file import SnapshotFile, list_snapshots
+
+DEFAULT_BUCKETS = (0, 40, 50, 60, 70, 100)
+
+# Fields read by the company scores, the Lynch categories and the forward returns
+BACKTEST_FIELDS = [
+    "currentPrice", "trailingPE", "enterpriseToEbitda", "earningsQuarterlyGrowth", "profitMargins",
+    "returnOnEquity", "dividendYield", "revenueGrowth", "payoutRatio", "marketCap", "fiveYearAvgDividendYield",
+    "earningsGrowth", "freeCashflow", "debtToEquity", "beta",
+]
+
+
+# --------------------------- Panel loading --------------------------------------
+
+def load_panel(directory: str,
+               fields: List[str] = BACKTEST_FIELDS,
+               start: Optional[datetime.date] = None,
+               end: Optional[datetime.date] = None) -> Tuple[List[datetime.date], List[str], Dict[str, np.ndarray]]:
+    """
+    Load every dated snapshot of `directory` into one (dates x tickers) array per field.
+    Tickers are the union over all dates; a ticker missing on a date is NaN there.
+    """
+    snapshots = [(d, p) for d, p in list_snapshots(directory)
+                 if (start is None or d >= start) and (end is None or d <= end)]
+    files = [SnapshotFile(path) for _, path in snapshots]
+    symbols = sorted(set().union(*(f.symbols for f in files))) if files else []
+    position = {symbol: j for j, symbol in enumerate(symbols)}
+
+    panel = {field: np.full((len(files), len(symbols)), np.nan) for field in fields}
+    for d, snapshot in enumerate(files):
+        columns = np.fromiter((position[s] for s in snapshot.symbols), dtype=int, count=len(snapshot))
+        for field in fields:
+            if field in snapshot.fields:
+                panel[field][d, columns] = snapshot.matrix[snapshot.fields.index(field)]
+    return [d for d, _ in snapshots], symbols, panel
+
+
+def forward_returns(dates: Sequence[datetime.date], prices: np.ndarray, horizon_days: int) -> np.ndarray:
+    """
+    Return from each snapshot date to the first snapshot at least `horizon_days` later,
+    for all dates and tickers at once (NaN when there is no later snapshot or price).
+    """
+    ordinals = np.array([d.toordinal() for d in dates])
+    later = np.searchsorted(ordinals, ordinals + horizon_days, side="left")
+    has_later = later < len(dates)
+    future = np.full(prices.shape, np.nan)
+    future[has_later] = prices[later[has_later]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(prices > 0, future / prices - 1, np.nan)
+
+
+# --------------------------- Backtest -------------------------------------------
+
+def _summary(frame: pd.DataFrame, by: str) -> pd.DataFrame:
+    grouped = frame.assign(positive=frame["forward_return"] > 0).groupby(by, observed=True)
+    return pd.DataFrame({
+        "observations": grouped["forward_return"].size(),
+        "mean_return": grouped["forward_return"].mean(),
+        "median_return": grouped["forward_return"].median(),
+        "hit_rate": grouped["positive"].mean(),
+    })
+
+
+def backtest_scores(dates: Sequence[datetime.date],
+                    symbols: List[str],
+                    panel: Dict[str, np.ndarray],
+                    horizon_days: int = 365,
+                    buckets: Sequence[float] = DEFAULT_BUCKETS) -> Dict[str, pd.DataFrame]:
+    """
+    Replay the `analyze_company` score and the Lynch categories over a panel of snapshots.
+
+    All dates x tickers are flattened into one set of columns and scored in a single
+    vectorized pass; forward returns are then summarised per score bucket and per category.
+    """
+    shape = panel["currentPrice"].shape
+    cols = {field: values.ravel() for field, values in panel.items()}
+    scores = columnar.company_scores(cols)["percent"]
+    categories = columnar.classify(cols)
+    returns = forward_returns(dates, panel["currentPrice"], horizon_days).ravel()
+
+    frame = pd.DataFrame({
+        "date": np.repeat(np.array(dates, dtype="datetime64[D]"), shape[1]),
+        "symbol": pd.Categorical.from_codes(np.tile(np.arange(shape[1]), shape[0]), symbols),
+        "score_pct": scores,
+        "category": pd.Categorical.from_codes(categories, columnar.CATEGORIES),
+        "forward_return": returns,
+    })
+    frame["score_bucket"] = pd.cut(frame["score_pct"], bins=list(buckets), include_lowest=True)
+    scored = frame.dropna(subset=["forward_return"])
+
+    return {
+        "observations": frame,
+        "by_score_bucket": _summary(scored.dropna(subset=["score_pct"]), "score_bucket"),
+        "by_category": _summary(scored, "category"),
+    }
+
+
+def run_backtest(directory: str, horizon_days: int = 365, **kwargs) -> Dict[str, pd.DataFrame]:
+    """Load the snapshot store in `directory` and backtest it."""
+    dates, symbols, panel = load_panel(directory, **kwargs)
+    return backtest_scores(dates, symbols, panel, horizon_days)
@@ -0,0 +1,262 @@
+import io
+import json
+import multiprocessing
+import os
+import threading
+import time
+import uuid
+import zlib
+import numpy as np
+import pandas as pd
+
+from typing import Callable, Dict, Iterable, List, Optional
+
+from src.valuation.job_queue import DEFAULT_LEASE, DONE, FAILED, Job, JobQueue, worker_name
+from src.valuation.parallel import industry_multiples, result_table, shard_bounds, value_file_shard
+from src.valuation.portfolio import fetch_infos
+from src.valuation.snapshot_file import SnapshotFile
+
+# Job kinds: download `info` for a list of symbols / value a slice of a snapshot file
+FETCH = "fetch"
+VALUE = "value"
+POLL_INTERVAL = 1.0
+# Symbols per fetch job; small enough that a retried job repeats little work
+FETCH_SHARD_SIZE = 50
+
+
+# --------------------------- Payloads -------------------------------------------
+
+def _encode(value) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"), 6)
+
+
+def _decode(blob: bytes):
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _array_bytes(array: np.ndarray) -> bytes:
+    buffer = io.BytesIO()
+    np.save(buffer, array, allow_pickle=False)
+    return buffer.getvalue()
+
+
+def _array(blob: bytes) -> np.ndarray:
+    return np.load(io.BytesIO(blob), allow_pickle=False)
+
+
+def run_fetch_job(payload: Dict) -> bytes:
+    return _encode(fetch_infos(payload["symbols"]))
+
+
+def run_value_job(payload: Dict) -> bytes:
+    averages = np.asarray(payload["averages"], dtype=float).reshape(-1, payload["stop"] - payload["start"])
+    return _array_bytes(value_file_shard(payload["path"], payload["start"], payload["stop"], averages,
+                                         **payload["params"]))
+
+
+HANDLERS: Dict[str, Callable[[Dict], bytes]] = {
+    FETCH: run_fetch_job,
+    VALUE: run_value_job,
+}
+
+
+# --------------------------- Worker ---------------------------------------------
+
+def _keep_leased(queue_path: str, job: Job, lease: float, done: threading.Event) -> None:
+    # Own connection: SQLite connections are not shared between threads
+    queue = JobQueue(queue_path, lease=lease)
+    try:
+        while not done.wait(lease / 3):
+            if not queue.extend(job):
+                break
+    finally:
+        queue.close()
+
+
+def run_worker(queue_path: str,
+               worker: Optional[str] = None,
+               lease: float = DEFAULT_LEASE,
+               poll: float = POLL_INTERVAL,
+               exit_when_drained: bool = False,
+               max_jobs: Optional[int] = None) -> int:
+    """
+    Claim and run jobs from the queue at `queue_path` until stopped (Ctrl+C), returning how many
+    were completed. The lease is renewed in the background while a job runs. With
+    `exit_when_drained` the worker stops once no job is pending or leased anywhere in the queue.
+    """
+    worker = worker or worker_name()
+    queue = JobQueue(queue_path, lease=lease)
+    completed = 0
+    try:
+        while max_jobs is None or completed < max_jobs:
+            job = queue.claim(worker, HANDLERS)
+            if job is None:
+                if exit_when_drained and queue.unfinished() == 0:
+                    break
+                time.sleep(poll)
+                continue
+
+            done = threading.Event()
+            heartbeat = threading.Thread(target=_keep_leased, args=(queue_path, job, lease, done), daemon=True)
+            heartbeat.start()
+            try:
+                result = HANDLERS[job.kind](json.loads(job.payload))
+            except Exception as e:
+                done.set()
+                heartbeat.join()
+                print(f"⚠️ {worker}: job {job.id} ({job.kind}) failed on attempt {job.attempt}: {e}")
+                queue.fail(job, f"{type(e).__name__}: {e}")
+                continue
+            done.set()
+            heartbeat.join()
+            if queue.complete(job, result):
+                completed += 1
+            else:
+                print(f"⚠️ {worker}: lost the lease of job {job.id}, result dropped")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        queue.close()
+    return completed
+
+
+def start_local_workers(queue_path: str, count: int, **kwargs) -> List[multiprocessing.Process]:
+    """Start `count` worker processes on this machine (they exit once the queue is drained)."""
+    kwargs.setdefault("exit_when_drained", True)
+    processes = []
+    for i in range(count):
+        process = multiprocessing.Process(target=run_worker, args=(queue_path,),
+                                          kwargs={"worker": f"{worker_name()}/{i}", **kwargs},
+                                          name=f"valuation-worker-{i}", daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
+
+
+# --------------------------- Coordinator ----------------------------------------
+
+def new_batch(kind: str) -> str:
+    return f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def print_batch_progress(counts: Dict[str, int], elapsed: float) -> None:
+    total = sum(counts.values())
+    print(f"📊 {counts[DONE]}/{total} jobs done, {counts[FAILED]} failed ({elapsed:.0f}s)")
+
+
+def wait_for_batch(queue: JobQueue,
+                   batch: str,
+                   poll: float = POLL_INTERVAL,
+                   timeout: Optional[float] = None,
+                   progress: Optional[Callable[[Dict[str, int], float], None]] = print_batch_progress) -> Dict[str, int]:
+    """Block until every job of `batch` is done or failed (or `timeout` passes); returns the final counts."""
+    started = time.monotonic()
+    last = None
+    while True:
+        counts = queue.counts(batch)
+        if progress and counts != last:
+            progress(counts, time.monotonic() - started)
+            last = counts
+        if counts["pending"] + counts["leased"] == 0:
+            return counts
+        if timeout is not None and time.monotonic() - started > timeout:
+            raise TimeoutError(f"Batch {batch} still has unfinished jobs after {timeout:.0f}s.")
+        time.sleep(poll)
+
+
+def _check_failures(queue: JobQueue, batch: str) -> None:
+    failures = queue.failures(batch)
+    if failures:
+        details = "; ".join(f"job {job_id}: {error}" for job_id, error in list(failures.items())[:5])
+        raise RuntimeError(f"{len(failures)} job(s) of batch {batch} failed: {details}")
+
+
+def submit_fetch(queue: JobQueue, symbols: Iterable[str], shard_size: int = FETCH_SHARD_SIZE) -> str:
+    """Queue the download of `info` for every symbol, `shard_size` symbols per job; returns the batch id."""
+    unique = sorted(set(symbols))
+    batch = new_batch(FETCH)
+    queue.submit(batch, FETCH, [json.dumps({"symbols": unique[i:i + shard_size]}).encode("utf-8")
+                                for i in range(0, len(unique), shard_size)])
+    return batch
+
+
+def collect_infos(queue: JobQueue, batch: str) -> Dict[str, Dict]:
+    """`info` dicts downloaded by a finished fetch batch."""
+    infos = {}
+    for _, result in queue.results(batch):
+        infos.update(_decode(result))
+    return dict(sorted(infos.items()))
+
+
+def submit_valuation(queue: JobQueue,
+                     snapshot_path: str,
+                     shards: int,
+                     growth_rate: float = 0.0,
+                     years: int = 5,
+                     discount_rate: float = 0.10,
+                     terminal_growth: float = 0.03) -> str:
+    """
+    Split a snapshot file into `shards` slices and queue one valuation job per slice.
+    Industry averages need the whole universe, so they are computed here and shipped with each slice;
+    `snapshot_path` must be readable by every worker (e.g. on the shared directory of the queue).
+    """
+    path = os.path.abspath(snapshot_path)
+    snapshot = SnapshotFile(path)
+    averages = industry_multiples(snapshot.labels("industry"), snapshot.columns())
+    params = {"growth_rate": growth_rate, "years": years, "discount_rate": discount_rate,
+              "terminal_growth": terminal_growth}
+    batch = new_batch(VALUE)
+    queue.submit(batch, VALUE, [
+        json.dumps({"path": path, "start": start, "stop": stop, "params": params,
+                    "averages": averages[:, start:stop].tolist()}).encode("utf-8")
+        for start, stop in shard_bounds(len(snapshot), shards)])
+    return batch
+
+
+def collect_valuation(queue: JobQueue, batch: str, snapshot_path: str) -> pd.DataFrame:
+    """Result table of a finished valuation batch, in snapshot order (same as `value_snapshot_file`)."""
+    _check_failures(queue, batch)
+    symbols = SnapshotFile(snapshot_path).symbols
+    blocks = [_array(result) for _, result in queue.results(batch)]
+    results = np.hstack(blocks) if blocks else np.empty((0, 0))
+    if results.shape[-1] != len(symbols):
+        raise RuntimeError(f"Batch {batch} covers {results.shape[-1]} of {len(symbols)} tickers.")
+    return result_table(results, symbols)
+
+
+def run_batch(queue: JobQueue,
+              batch: str,
+              local_workers: int = 0,
+              timeout: Optional[float] = None,
+              progress: Optional[Callable[[Dict[str, int], float], None]] = print_batch_progress) -> Dict[str, int]:
+    """Wait for `batch`, helped by `local_workers` worker processes on this machine."""
+    processes = start_local_workers(queue.path, local_workers, lease=queue.lease)
+    try:
+        return wait_for_batch(queue, batch, timeout=timeout, progress=progress)
+    finally:
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+
+def distributed_fetch(queue: JobQueue, symbols: Iterable[str], local_workers: int = 0,
+                      shard_size: int = FETCH_SHARD_SIZE, timeout: Optional[float] = None) -> Dict[str, Dict]:
+    """Download `info` for every symbol through the queue; failed jobs leave their symbols out."""
+    batch = submit_fetch(queue, symbols, shard_size)
+    run_batch(queue, batch, local_workers, timeout)
+    for job_id, error in queue.failures(batch).items():
+        print(f"⚠️ Fetch job {job_id} failed: {error}")
+    infos = collect_infos(queue, batch)
+    queue.purge(batch)
+    return infos
+
+
+def distributed_valuation(queue: JobQueue, snapshot_path: str, shards: int, local_workers: int = 0,
+                          timeout: Optional[float] = None, **params) -> pd.DataFrame:
+    """`value_snapshot_file` with the slices valued by whichever workers serve the queue."""
+    batch = submit_valuation(queue, snapshot_path, shards, **params)
+    run_batch(queue, batch, local_workers, timeout)
+    table = collect_valuation(queue, batch, snapshot_path)
+    queue.purge(batch)
+    return table
@@ -0,0 +1,72 @@
+import threading
+import time
+
+from typing import Any, Callable, Dict, Hashable, Optional, Tuple
+
+
+# ------------------------------- TTL cache --------------------------------------
+
+class TTLCache:
+    """
+    Thread-safe in-memory cache whose entries expire `ttl` seconds after they were stored.
+
+    `get_or_load` runs the loader at most once per key at a time: concurrent callers asking
+    for the same missing key wait for the first load instead of fetching again. A key's lock
+    only lives while someone is loading or waiting for it.
+    """
+
+    def __init__(self, ttl: float = 900.0):
+        self.ttl = ttl
+        self._entries: Dict[Hashable, Tuple[float, Any]] = {}
+        self._lock = threading.Lock()
+        # key -> [lock, callers holding or waiting for it]
+        self._key_locks: Dict[Hashable, list] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            return default
+        return entry[1]
+
+    def set(self, key: Hashable, value, ttl: Optional[float] = None) -> None:
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._entries[key] = (expires, value)
+
+    def expires_in(self, key: Hashable) -> Optional[float]:
+        """Seconds until `key` expires (negative once expired), None if never stored."""
+        entry = self._entries.get(key)
+        return None if entry is None else entry[0] - time.monotonic()
+
+    def invalidate(self, key: Hashable) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], ttl: Optional[float] = None):
+        value = self.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        with self._lock:
+            slot = self._key_locks.setdefault(key, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                value = self.get(key, _MISSING)
+                if value is _MISSING:
+                    value = loader()
+                    self.set(key, value, ttl)
+        finally:
+            with self._lock:
+                slot[1] -= 1
+                if not slot[1]:
+                    del self._key_locks[key]
+        return value
+
+_MISSING = object()
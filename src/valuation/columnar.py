@@ -0,0 +1,272 @@
+import numpy as np
+
+from typing import List, Dict, Tuple, Mapping
+
+from src.valuation.dcf_vectorized import dcf_per_share, dcf_sensitivities, multi_stage_dcf
+
+# Numeric `info` fields read by the valuation modules (yfinance_api, company_analysis, lynch_company_category)
+SNAPSHOT_FIELDS = [
+    "currentPrice",
+    "marketCap",
+    "sharesOutstanding",
+    "freeCashflow",
+    "totalRevenue",
+    "ebitda",
+    "totalDebt",
+    "totalCash",
+    "cash",
+    "trailingEps",
+    "trailingPE",
+    "priceToSalesTrailing12Months",
+    "priceToBook",
+    "enterpriseToEbitda",
+    "earningsGrowth",
+    "earningsQuarterlyGrowth",
+    "revenueGrowth",
+    "profitMargins",
+    "operatingMargins",
+    "returnOnEquity",
+    "dividendYield",
+    "payoutRatio",
+    "fiveYearAvgDividendYield",
+    "debtToEquity",
+    "beta",
+]
+
+# Lynch categories as small integer codes (index into this list)
+CATEGORIES = ["Other", "Fast Grower", "Slow Grower", "Stalwart"]
+
+Columns = Mapping[str, np.ndarray]
+
+
+# --------------------------- Snapshot columns -----------------------------------
+
+def _to_float(value) -> float:
+    if isinstance(value, bool):
+        return float(value)
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return np.nan
+
+
+def snapshot_matrix(infos: Dict[str, Dict], fields: List[str] = SNAPSHOT_FIELDS) -> Tuple[List[str], np.ndarray]:
+    """
+    Pack `info` dicts into one float64 array of shape (len(fields), len(tickers)).
+    Each row is one field stored contiguously; missing or non-numeric values are NaN.
+    """
+    symbols = list(infos)
+    matrix = np.full((len(fields), len(symbols)), np.nan)
+    for j, symbol in enumerate(symbols):
+        info = infos[symbol]
+        for i, field in enumerate(fields):
+            value = info.get(field)
+            if value is not None:
+                matrix[i, j] = _to_float(value)
+    return symbols, matrix
+
+
+def as_columns(matrix: np.ndarray, fields: List[str] = SNAPSHOT_FIELDS) -> Dict[str, np.ndarray]:
+    """Name the rows of a snapshot matrix (no copy)."""
+    return {field: matrix[i] for i, field in enumerate(fields)}
+
+
+def _present(values: np.ndarray) -> np.ndarray:
+    """Vectorized counterpart of `safe_get`: value is neither missing nor zero."""
+    return ~np.isnan(values) & (values != 0)
+
+
+def _ladder(values: np.ndarray, conditions: List[np.ndarray], scores: List[int], default: int) -> np.ndarray:
+    """First matching condition wins, like the if/elif chains in company_analysis; NaN stays NaN."""
+    with np.errstate(invalid="ignore"):
+        result = np.select(conditions, scores, default=default).astype(float)
+    result[np.isnan(values)] = np.nan
+    return result
+
+
+# --------------------------- Valuation metrics ----------------------------------
+
+def pegy(cols: Columns) -> Dict[str, np.ndarray]:
+    """Vectorized `calculate_pegy(info)`; `is_pegy` is False where PEG was used (no dividend yield)."""
+    pe = cols["trailingPE"]
+    growth_pct = cols["earningsQuarterlyGrowth"] * 100
+    dividend_pct = np.where(_present(cols["dividendYield"]), cols["dividendYield"] * 100, 0.0)
+    is_pegy = _present(cols["dividendYield"])
+    denominator = growth_pct + dividend_pct
+    valid = _present(pe) & _present(cols["earningsQuarterlyGrowth"]) & (denominator != 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        value = np.where(valid, pe / denominator, np.nan)
+    return {"value": value, "is_pegy": is_pegy}
+
+
+def dcf(cols: Columns,
+        growth_rate: float = 0.0,
+        years: int = 5,
+        discount_rate: float = 0.10,
+        terminal_growth: float = 0.03) -> Dict[str, np.ndarray]:
+    """Vectorized `calculate_dcf_v2`; a zero `growth_rate` falls back to earningsGrowth (or 5%)."""
+    return dcf_per_share(*_dcf_inputs(cols, growth_rate), years, discount_rate, terminal_growth)
+
+
+def dcf_greeks(cols: Columns,
+               growth_rate: float = 0.0,
+               years: int = 5,
+               discount_rate: float = 0.10,
+               terminal_growth: float = 0.03) -> Dict[str, np.ndarray]:
+    """Derivatives of the `dcf` value per share with respect to its inputs (see `dcf_sensitivities`)."""
+    return dcf_sensitivities(*_dcf_inputs(cols, growth_rate), years, discount_rate, terminal_growth)
+
+
+def multi_stage(cols: Columns,
+                growth_rate: float = 0.0,
+                high_years: int = 5,
+                fade_years: int = 5,
+                discount_rate: float = 0.10,
+                terminal_growth: float = 0.03) -> Dict[str, np.ndarray]:
+    """Vectorized `calculate_multi_stage_dcf`, with the same inputs and growth fallback as `dcf`."""
+    return multi_stage_dcf(*_dcf_inputs(cols, growth_rate), high_years, fade_years, discount_rate, terminal_growth)
+
+
+def _dcf_inputs(cols: Columns, growth_rate: float):
+    fcf = np.where(_present(cols["freeCashflow"]), cols["freeCashflow"], np.nan)
+    shares_out = np.where(_present(cols["sharesOutstanding"]), cols["sharesOutstanding"], np.nan)
+    if growth_rate == 0.0:
+        growth = np.where(np.isnan(cols["earningsGrowth"]), 0.05, cols["earningsGrowth"])
+    else:
+        growth = growth_rate
+    return fcf, shares_out, growth
+
+
+def comps(cols: Columns, avg_multiples: Mapping[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """
+    Vectorized `apply_comps`. `avg_multiples` maps "P/E", "P/S", "EV/EBITDA" to a scalar
+    or to one average multiple per ticker (e.g. the average of its industry).
+    """
+    shares_ok = _present(cols["sharesOutstanding"])
+    shares_out = cols["sharesOutstanding"]
+    implied: Dict[str, np.ndarray] = {}
+    with np.errstate(divide="ignore", invalid="ignore"):
+        if "P/E" in avg_multiples:
+            eps = cols["trailingEps"]
+            implied["P/E"] = np.where(shares_ok & _present(eps), avg_multiples["P/E"] * eps, np.nan)
+        if "P/S" in avg_multiples:
+            revenue = cols["totalRevenue"]
+            implied["P/S"] = np.where(shares_ok & _present(revenue),
+                                      avg_multiples["P/S"] * revenue / shares_out, np.nan)
+        if "EV/EBITDA" in avg_multiples:
+            ebitda = cols["ebitda"]
+            debt = np.where(_present(cols["totalDebt"]), cols["totalDebt"], 0.0)
+            cash = np.where(_present(cols["cash"]), cols["cash"], 0.0)
+            implied_ev = avg_multiples["EV/EBITDA"] * ebitda
+            implied["EV/EBITDA"] = np.where(shares_ok & _present(ebitda),
+                                            (implied_ev - debt + cash) / shares_out, np.nan)
+    return implied
+
+
+def rule_of_40(cols: Columns) -> Dict[str, np.ndarray]:
+    """Vectorized Rule of 40 as computed in `run_valuation` (missing inputs count as 0%)."""
+    revenue_growth = np.nan_to_num(cols["revenueGrowth"]) * 100
+    profitability = np.nan_to_num(cols["operatingMargins"]) * 100
+    score = revenue_growth + profitability
+    return {"score": score, "meets_rule": score >= 40}
+
+
+# --------------------------- Company analysis scores ----------------------------
+
+def pe_score(pe: np.ndarray) -> np.ndarray:
+    return _ladder(pe, [pe >= 64, pe >= 53, pe >= 43, pe >= 33, pe > 23, pe == 23, pe > 22.98, pe >= 17.99,
+                        pe >= 12.99], [1, 2, 3, 4, 5, 6, 7, 8, 9], 10)
+
+
+def ev_to_ebitda_score(ev: np.ndarray) -> np.ndarray:
+    return _ladder(ev, [ev <= 6, ev <= 8, ev <= 10, ev <= 12, ev <= 15, ev <= 18], [10, 9, 8, 7, 5, 3], 1)
+
+
+def pb_score(pb: np.ndarray) -> np.ndarray:
+    return _ladder(pb, [pb <= 1, pb < 2, pb < 3, pb < 4, pb < 6, pb < 8, pb < 10], [10, 9, 8, 7, 6, 5, 3], 1)
+
+
+def ps_score(ps: np.ndarray) -> np.ndarray:
+    return _ladder(ps, [ps <= 0.5, ps <= 1, ps <= 1.5, ps <= 2, ps <= 3, ps <= 5, ps <= 8],
+                   [10, 9, 8, 7, 6, 4, 2], 1)
+
+
+def _growth_ladder(ratio: np.ndarray) -> np.ndarray:
+    # earnings_growth_score and profit_margin_score share the same thresholds
+    p = ratio * 100
+    return _ladder(ratio, [p <= -10.01, p <= -5, p < 0, p < 5, p < 10, p == 10, p < 20, p < 30, p < 40],
+                   [1, 2, 3, 4, 5, 6, 7, 8, 9], 10)
+
+
+def earnings_growth_score(growth: np.ndarray) -> np.ndarray:
+    return _growth_ladder(growth)
+
+
+def profit_margin_score(margin: np.ndarray) -> np.ndarray:
+    return _growth_ladder(margin)
+
+
+def roe_score(roe: np.ndarray) -> np.ndarray:
+    p = roe * 100
+    return _ladder(roe, [p <= -5.01, p < 0, p < 5, p < 10, p < 15, p == 15, p < 25, p < 35, p < 45],
+                   [1, 2, 3, 4, 5, 6, 7, 8, 9], 10)
+
+
+def dividend_yield_score(y: np.ndarray) -> np.ndarray:
+    return _ladder(y, [y == 0, y <= 0.24, y <= 0.49, y <= 0.99, y <= 1.24, y == 1.25, y <= 1.5, y <= 2, y <= 2.5],
+                   [1, 2, 3, 4, 5, 6, 7, 8, 9], 10)
+
+
+def company_scores(cols: Columns) -> Dict[str, np.ndarray]:
+    """Vectorized `score_company`: total, count and percent (NaN when nothing could be scored)."""
+    metrics = np.vstack([
+        pe_score(cols["trailingPE"]),
+        ev_to_ebitda_score(cols["enterpriseToEbitda"]),
+        earnings_growth_score(cols["earningsQuarterlyGrowth"]),
+        profit_margin_score(cols["profitMargins"]),
+        roe_score(cols["returnOnEquity"]),
+        dividend_yield_score(cols["dividendYield"]),
+    ])
+    total = np.nansum(metrics, axis=0)
+    count = np.sum(~np.isnan(metrics), axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        percent = np.where(count > 0, total / (count * 10) * 100, np.nan)
+    return {"total": total, "count": count, "percent": percent}
+
+
+# --------------------------- Lynch categories -----------------------------------
+
+def classify(cols: Columns) -> np.ndarray:
+    """
+    Vectorized `classify_company`; returns codes into CATEGORIES.
+    Missing fields take the same defaults as `classify_company` (beta 1, everything else 0).
+    """
+    def field(name: str, default: float = 0.0) -> np.ndarray:
+        return np.where(np.isnan(cols[name]), default, cols[name])
+
+    growth = field("revenueGrowth")
+    pe = cols["trailingPE"]
+    dividend_yield = field("dividendYield")
+    payout_ratio = field("payoutRatio")
+    market_cap = field("marketCap")
+    five_year_dividend = field("fiveYearAvgDividendYield")
+    earnings_growth = cols["earningsGrowth"]
+    free_cash_flow = field("freeCashflow")
+    debt_to_equity = field("debtToEquity")
+    beta = field("beta", 1.0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        peg = np.where(_present(pe) & _present(earnings_growth), pe / (earnings_growth * 100), np.nan)
+
+        fast = (growth >= 0.25) & (peg >= 0.5) & (peg <= 3) & (free_cash_flow > 0) & (debt_to_equity < 100)
+        slow = ((growth >= 0.01) & (growth <= 0.25)
+                & (dividend_yield >= 0.01) & (payout_ratio > 0) & (payout_ratio <= 0.85)
+                & (market_cap > 10e9)
+                & (dividend_yield > five_year_dividend)
+                & _present(pe) & (pe <= 20))
+        stalwart = ((market_cap > 10e9) & (growth >= 0.06) & (growth <= 0.10)
+                    & (earnings_growth > 0)
+                    & (pe >= 12) & (pe <= 25)
+                    & (beta <= 1.2))
+
+    return np.select([fast, slow, stalwart], [1, 2, 3], default=0).astype(np.int8)
@@ -0,0 +1,264 @@
+import csv
+import heapq
+import os
+import shutil
+import tempfile
+import zlib
+import pandas as pd
+
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# Quantities closer than this to zero count as flat (fractional shares come with rounding noise)
+QUANTITY_EPSILON = 1e-9
+
+CLOSED_LOT_HEADERS = ["symbol", "opened", "closed", "quantity", "open_price", "close_price", "open_value",
+                      "close_value", "commission", "realized_pnl", "currency"]
+
+
+class Trade(NamedTuple):
+    symbol: str
+    time: str
+    quantity: float      # signed: positive buys, negative sells
+    price: float
+    commission: float    # cost, always >= 0
+    currency: str = ""
+
+
+class ClosedLot(NamedTuple):
+    """
+    One lot (or the part of it) closed by a later trade. `quantity` is signed like the lot
+    (negative for a short), values are quantity x price, and `commission` holds the share of
+    the opening and closing commissions, so realized_pnl = close_value - open_value - commission.
+    """
+    symbol: str
+    opened: str
+    closed: str
+    quantity: float
+    open_price: float
+    close_price: float
+    open_value: float
+    close_value: float
+    commission: float
+    realized_pnl: float
+    currency: str
+
+
+class OpenLot(NamedTuple):
+    symbol: str
+    opened: str
+    quantity: float
+    price: float
+    commission: float
+    cost_basis: float    # quantity x price + commission
+    currency: str
+
+
+class _Lot:
+    __slots__ = ("opened", "quantity", "price", "commission")
+
+    def __init__(self, opened: str, quantity: float, price: float, commission: float):
+        self.opened = opened
+        self.quantity = quantity
+        self.price = price
+        self.commission = commission
+
+
+# --------------------------- IBKR rows -> trades --------------------------------
+
+def time_key(value: str) -> str:
+    """
+    Sortable form of an IBKR `Date/Time` ("2024-01-02,093000", "2024-01-02, 09:30:00", "20240102;093000"):
+    its digits, padded to YYYYMMDDHHMMSS.
+    """
+    digits = "".join(c for c in value if c.isdigit())
+    return digits[:14].ljust(14, "0")
+
+
+def parse_trade(row: Dict[str, str]) -> Trade:
+    """
+    One IBKR export row as a Trade. Like aggregate_positions, the side comes from `Buy/Sell`
+    (sells are exported with either sign) and commissions are taken as absolute costs.
+    """
+    quantity = abs(float(row.get("Quantity") or 0))
+    if (row.get("Buy/Sell") or "").strip().upper() == "SELL":
+        quantity = -quantity
+    return Trade(symbol=(row.get("Symbol") or "").strip(),
+                 time=time_key(row.get("Date/Time") or row.get("TradeDate") or ""),
+                 quantity=quantity,
+                 price=float(row.get("Price") or 0),
+                 commission=abs(float(row.get("Commission") or 0)),
+                 currency=(row.get("CurrencyPrimary") or "").strip())
+
+
+def iter_ibkr_trades(path: str) -> Iterator[Trade]:
+    """Trades of an IBKR export, read one row at a time (rows without a symbol or quantity are skipped)."""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        for row in csv.DictReader(f):
+            trade = parse_trade(row)
+            if trade.symbol and trade.quantity:
+                yield trade
+
+
+def merge_trades(*streams: Iterable[Trade]) -> Iterator[Trade]:
+    """Merge several time-ordered trade streams (e.g. yearly exports) into one, lazily."""
+    return heapq.merge(*streams, key=lambda trade: trade.time)
+
+
+# --------------------------- FIFO ledger ----------------------------------------
+
+class FifoLedger:
+    """
+    FIFO lot matching over a stream of trades. Each symbol has a queue of open lots; a trade
+    against the position closes the oldest lots first and whatever is left opens a new lot, so
+    longs and shorts are handled alike. Commissions are split pro rata over the quantity they
+    cover. Closed lots are returned as they happen and never kept: memory grows with the number
+    of open lots (and symbols), not with the number of trades.
+
+    Trades of one symbol must arrive in time order; a ValueError is raised otherwise.
+    """
+
+    def __init__(self):
+        self._lots: Dict[str, Deque[_Lot]] = {}
+        self._last_time: Dict[str, str] = {}
+        self._currency: Dict[str, str] = {}
+        self.summaries: Dict[str, Dict[str, float]] = {}
+
+    def add(self, trade: Trade) -> List[ClosedLot]:
+        """Apply one trade; returns the lots it closed."""
+        symbol = trade.symbol
+        if trade.time < self._last_time.get(symbol, ""):
+            raise ValueError(f"{symbol}: trade at {trade.time} after one at {self._last_time[symbol]}; "
+                             f"trades must be in time order (see merge_trades)")
+        self._last_time[symbol] = trade.time
+        if trade.currency:
+            self._currency[symbol] = trade.currency
+        currency = self._currency.get(symbol, "")
+        lots = self._lots.setdefault(symbol, deque())
+        summary = self.summaries.setdefault(symbol, {"trades": 0, "bought": 0.0, "sold": 0.0, "commission": 0.0,
+                                                     "closed_lots": 0, "realized_pnl": 0.0})
+        summary["trades"] += 1
+        summary["bought" if trade.quantity > 0 else "sold"] += abs(trade.quantity)
+        summary["commission"] += trade.commission
+
+        remaining = trade.quantity
+        commission = trade.commission
+        closed = []
+        # Lots of the opposite sign are closed first, oldest first
+        while lots and abs(remaining) > QUANTITY_EPSILON and (lots[0].quantity > 0) != (remaining > 0):
+            lot = lots[0]
+            quantity = lot.quantity if abs(lot.quantity) <= abs(remaining) + QUANTITY_EPSILON else -remaining
+            open_commission = lot.commission * quantity / lot.quantity
+            close_commission = commission * abs(quantity) / abs(remaining)
+            open_value, close_value = quantity * lot.price, quantity * trade.price
+            pnl = close_value - open_value - open_commission - close_commission
+            closed.append(ClosedLot(symbol, lot.opened, trade.time, quantity, lot.price, trade.price, open_value,
+                                    close_value, open_commission + close_commission, pnl, currency))
+            summary["closed_lots"] += 1
+            summary["realized_pnl"] += pnl
+
+            remaining += quantity
+            commission -= close_commission
+            lot.quantity -= quantity
+            lot.commission -= open_commission
+            if abs(lot.quantity) <= QUANTITY_EPSILON:
+                lots.popleft()
+        if abs(remaining) > QUANTITY_EPSILON:
+            lots.append(_Lot(trade.time, remaining, trade.price, commission))
+        elif not lots:
+            # Flat again: nothing to remember for this symbol but its summary
+            del self._lots[symbol]
+        return closed
+
+    def process(self, trades: Iterable[Trade]) -> Iterator[ClosedLot]:
+        """Apply every trade, yielding closed lots as they happen."""
+        for trade in trades:
+            yield from self.add(trade)
+
+    def open_lots(self) -> List[OpenLot]:
+        return [OpenLot(symbol, lot.opened, lot.quantity, lot.price, lot.commission,
+                        lot.quantity * lot.price + lot.commission, self._currency.get(symbol, ""))
+                for symbol in sorted(self._lots) for lot in self._lots[symbol]]
+
+    def summary(self) -> pd.DataFrame:
+        """
+        Per-symbol totals: trades, bought, sold, commission, closed_lots, realized_pnl, plus the
+        open_quantity and open_cost_basis (commission included) of the lots still open.
+        """
+        table = pd.DataFrame.from_dict(self.summaries, orient="index",
+                                       columns=["trades", "bought", "sold", "commission", "closed_lots",
+                                                "realized_pnl"])
+        table.index.name = "Symbol"
+        table["open_quantity"] = [sum(lot.quantity for lot in self._lots.get(s, ())) for s in table.index]
+        table["open_cost_basis"] = [sum(lot.quantity * lot.price + lot.commission for lot in self._lots.get(s, ()))
+                                    for s in table.index]
+        table["currency"] = [self._currency.get(s, "") for s in table.index]
+        return table.sort_index()
+
+
+# --------------------------- Files ----------------------------------------------
+
+def _write_ledger(trades: Iterable[Trade], closed_path: str) -> Tuple[pd.DataFrame, List[OpenLot]]:
+    ledger = FifoLedger()
+    with open(closed_path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(CLOSED_LOT_HEADERS)
+        writer.writerows(ledger.process(trades))
+    return ledger.summary(), ledger.open_lots()
+
+
+def _ledger_part(path: str, closed_path: str) -> Tuple[pd.DataFrame, List[OpenLot]]:
+    # Worker side of the parallel mode: one partition file, all trades of its symbols
+    return _write_ledger(iter_ibkr_trades(path), closed_path)
+
+
+def partition_trades(path: str, directory: str, parts: int) -> List[str]:
+    """
+    Split an IBKR export into `parts` CSV files by a hash of the symbol, streaming: every symbol
+    lands in exactly one file and keeps its row order. Returns the file paths.
+    """
+    paths = [os.path.join(directory, f"part-{i}.csv") for i in range(parts)]
+    files = [open(p, "w", newline="") for p in paths]
+    try:
+        with open(path, newline="", encoding="utf-8-sig") as f:
+            reader = csv.DictReader(f)
+            writers = [csv.DictWriter(out, fieldnames=reader.fieldnames) for out in files]
+            for writer in writers:
+                writer.writeheader()
+            for row in reader:
+                symbol = (row.get("Symbol") or "").strip()
+                writers[zlib.crc32(symbol.encode("utf-8")) % parts].writerow(row)
+    finally:
+        for out in files:
+            out.close()
+    return paths
+
+
+def realized_pnl(path: str, closed_path: str, workers: Optional[int] = 1) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Match the trades of an IBKR export FIFO, writing every closed lot to `closed_path` (CSV) as it
+    is produced. Returns (per-symbol summary, open lots).
+
+    With `workers` > 1 (None: every core) the export is partitioned by symbol and each partition is
+    matched in its own process; closed lots are then grouped by partition instead of in file order.
+    """
+    workers = workers or os.cpu_count() or 1
+    if workers == 1:
+        summary, lots = _write_ledger(iter_ibkr_trades(path), closed_path)
+        return summary, pd.DataFrame(lots, columns=OpenLot._fields)
+
+    with tempfile.TemporaryDirectory(prefix="fifo-") as directory:
+        parts = partition_trades(path, directory, workers)
+        outputs = [os.path.join(directory, f"closed-{i}.csv") for i in range(workers)]
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_ledger_part, parts, outputs))
+        with open(closed_path, "w", newline="") as out:
+            for i, output in enumerate(outputs):
+                with open(output, newline="") as f:
+                    if i:
+                        f.readline()
+                    shutil.copyfileobj(f, out)
+    summary = pd.concat([s for s, _ in results]).sort_index()
+    lots = sorted((lot for _, part in results for lot in part), key=lambda lot: (lot.symbol, lot.opened))
+    return summary, pd.DataFrame(lots, columns=OpenLot._fields)
@@ -0,0 +1,17 @@
+import os
+
+# VALUATION_DATA_DIR=<dir> moves every local cache (FX rates, results, missing symbols, price history)
+DATA_DIR_ENV = "VALUATION_DATA_DIR"
+DEFAULT_DATA_DIR = "."
+
+
+def data_dir() -> str:
+    """Directory of the local caches (the working directory unless VALUATION_DATA_DIR is set), created on demand."""
+    directory = os.environ.get(DATA_DIR_ENV) or DEFAULT_DATA_DIR
+    os.makedirs(directory, exist_ok=True)
+    return directory
+
+
+def data_path(name: str) -> str:
+    """Path of a cache file or directory inside the data directory."""
+    return os.path.join(data_dir(), name)
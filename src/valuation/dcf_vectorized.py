@@ -0,0 +1,164 @@
+import numpy as np
+
+from typing import Dict, Tuple
+
+
+# ------------------------------- Vectorized DCF ---------------------------------
+
+def present_value_factors(q: np.ndarray, years: int, terminal_multiple: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Present value of one unit of current FCF and its derivative with respect to q.
+
+    With q = (1 + g) / (1 + r) and k = (1 + terminal_growth) / (r - terminal_growth):
+        S(q)  = q + q^2 + ... + q^n + q^n * k
+        S'(q) = 1 + 2q + ... + n q^(n-1) + n q^(n-1) * k
+    Both sums are geometric, so they are taken in closed form (with the q == 1 limits).
+    """
+    n = years
+    q_n = q ** n
+    near_one = np.isclose(q, 1.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(near_one, float(n), q * (1 - q_n) / (1 - q))
+        d_annuity = np.where(near_one, n * (n + 1) / 2.0,
+                             (1 - (n + 1) * q_n + n * q_n * q) / (1 - q) ** 2)
+    factor = annuity + q_n * terminal_multiple
+    d_factor = d_annuity + n * q ** (n - 1) * terminal_multiple
+    return factor, d_factor
+
+
+def dcf_per_share(fcf,
+                  shares_out,
+                  growth_rate,
+                  years: int = 5,
+                  discount_rate=0.10,
+                  terminal_growth=0.03) -> Dict[str, np.ndarray]:
+    """
+    Same model as `calculate_dcf_v2`, evaluated for whole arrays of tickers at once.
+
+    Every argument except `years` may be a scalar or an array; they are broadcast together.
+    The projected FCFs form a geometric series, so the sum is taken in closed form
+    instead of looping over the projection years.
+    Tickers with missing (NaN) inputs get NaN results.
+    """
+    fcf = np.asarray(fcf, dtype=float)
+    shares_out = np.asarray(shares_out, dtype=float)
+    g = np.asarray(growth_rate, dtype=float)
+    r = np.asarray(discount_rate, dtype=float)
+    tg = np.asarray(terminal_growth, dtype=float)
+
+    # Ratio of one year's discounted FCF to the previous one
+    q = (1 + g) / (1 + r)
+    q_n = q ** years
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(np.isclose(q, 1.0), float(years), q * (1 - q_n) / (1 - q))
+        pv_fcfs = fcf * annuity
+
+        # Terminal value (Gordon growth model) of the last projected FCF
+        pv_terminal = fcf * q_n * (1 + tg) / (r - tg)
+
+        total_equity = pv_fcfs + pv_terminal
+        intrinsic_per_share = np.where(shares_out > 0, total_equity / shares_out, np.nan)
+
+    return {
+        "pv_fcfs": pv_fcfs,
+        "pv_terminal": pv_terminal,
+        "total_equity": total_equity,
+        "intrinsic_per_share": intrinsic_per_share,
+    }
+
+
+# ------------------------------- Multi-stage DCF --------------------------------
+
+def multi_stage_dcf(fcf,
+                    shares_out,
+                    high_growth,
+                    high_years: int = 5,
+                    fade_years: int = 5,
+                    discount_rate=0.10,
+                    terminal_growth=0.03) -> Dict[str, np.ndarray]:
+    """
+    Three-stage DCF for whole arrays of tickers and/or parameter sets (arguments broadcast together,
+    except the stage lengths):
+      1. `high_years` years growing at `high_growth` (geometric series, closed form);
+      2. `fade_years` years whose growth falls linearly from `high_growth` to `terminal_growth`
+         (reaching it in the last fade year), summed with one cumulative product over the fade axis;
+      3. Gordon terminal value of the last fade-year FCF.
+    With `fade_years=0` this is `dcf_per_share` over `high_years` years.
+    """
+    fcf, shares_out, g, r, tg = np.broadcast_arrays(*(np.asarray(x, dtype=float) for x in
+                                                       (fcf, shares_out, high_growth, discount_rate, terminal_growth)))
+
+    # Stage 1: ratio of one year's discounted FCF to the previous one is constant
+    q = (1 + g) / (1 + r)
+    q_high = q ** high_years
+    with np.errstate(divide="ignore", invalid="ignore"):
+        annuity = np.where(np.isclose(q, 1.0), float(high_years), q * (1 - q_high) / (1 - q))
+    pv_high_growth = fcf * annuity
+
+    # Stage 2: one row per fade year, growth interpolated between the two rates
+    weights = (np.arange(1, fade_years + 1) / fade_years).reshape((fade_years,) + (1,) * g.ndim) \
+        if fade_years else np.empty((0,) + (1,) * g.ndim)
+    fade_ratios = (1 + g + (tg - g) * weights) / (1 + r)
+    discounted = np.cumprod(fade_ratios, axis=0)
+    pv_fade = fcf * q_high * discounted.sum(axis=0)
+
+    # Stage 3: terminal value at the end of the fade
+    q_end = q_high * np.prod(fade_ratios, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pv_terminal = fcf * q_end * (1 + tg) / (r - tg)
+        total_equity = pv_high_growth + pv_fade + pv_terminal
+        intrinsic_per_share = np.where(shares_out > 0, total_equity / shares_out, np.nan)
+
+    return {
+        "pv_high_growth": pv_high_growth,
+        "pv_fade": pv_fade,
+        "pv_fcfs": pv_high_growth + pv_fade,
+        "pv_terminal": pv_terminal,
+        "total_equity": total_equity,
+        "intrinsic_per_share": intrinsic_per_share,
+    }
+
+
+# ------------------------------- Sensitivities ----------------------------------
+
+# Keys of `dcf_sensitivities`: derivative of intrinsic value per share with respect to each input
+GREEKS = ["d_growth", "d_discount_rate", "d_terminal_growth", "d_fcf"]
+
+
+def dcf_sensitivities(fcf,
+                      shares_out,
+                      growth_rate,
+                      years: int = 5,
+                      discount_rate=0.10,
+                      terminal_growth=0.03) -> Dict[str, np.ndarray]:
+    """
+    Intrinsic value per share of `dcf_per_share` and its exact first derivatives, for arrays of tickers.
+
+    With V = FCF * S(q) / shares, q = (1 + g) / (1 + r) and k = (1 + tg) / (r - tg):
+        dV/dFCF = S / shares
+        dV/dg   = FCF / shares * S'(q) / (1 + r)
+        dV/dr   = FCF / shares * (-S'(q) * q / (1 + r) - q^n * (1 + tg) / (r - tg)^2)
+        dV/dtg  = FCF / shares * q^n * (1 + r) / (r - tg)^2
+    One evaluation gives what a finite-difference sweep would need several DCF runs for.
+    Derivatives are per unit of each input (per 1.00 of rate, per 1 of currency of FCF).
+    """
+    fcf = np.asarray(fcf, dtype=float)
+    shares_out = np.asarray(shares_out, dtype=float)
+    g = np.asarray(growth_rate, dtype=float)
+    r = np.asarray(discount_rate, dtype=float)
+    tg = np.asarray(terminal_growth, dtype=float)
+
+    q = (1 + g) / (1 + r)
+    q_n = q ** years
+    with np.errstate(divide="ignore", invalid="ignore"):
+        k = (1 + tg) / (r - tg)
+        factor, d_factor = present_value_factors(q, years, k)
+        per_share = np.where(shares_out > 0, fcf / shares_out, np.nan)
+        spread_sq = (r - tg) ** 2
+        return {
+            "intrinsic_per_share": per_share * factor,
+            "d_growth": per_share * d_factor / (1 + r),
+            "d_discount_rate": per_share * (-d_factor * q / (1 + r) - q_n * (1 + tg) / spread_sq),
+            "d_terminal_growth": per_share * q_n * (1 + r) / spread_sq,
+            "d_fcf": np.where(shares_out > 0, factor / shares_out, np.nan),
+        }
@@ -0,0 +1,263 @@
+import collections
+import itertools
+import queue
+import random
+import re
+import threading
+import time
+import yfinance as yf
+
+from concurrent.futures import Future
+from enum import IntEnum
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+
+# --------------------------- Priorities & errors --------------------------------
+
+class Priority(IntEnum):
+    """Lower value runs first."""
+    TARGET = 0       # the ticker the user asked about
+    PEER = 1         # peers / holdings needed to finish the same answer
+    BACKGROUND = 2   # refreshes nobody is waiting for
+
+
+class FetchError(Exception):
+    """A scheduled fetch failed for good (after retries when it was throttled)."""
+
+    def __init__(self, key: str, reason: str, throttled: bool = False):
+        super().__init__(f"{key}: {reason}")
+        self.key = key
+        self.reason = reason
+        self.throttled = throttled
+
+
+# "HTTP 429", "HTTP Error 429", "status code 429", "status: 429"; a bare 429 (a price, a symbol) is not throttling
+_THROTTLED_STATUS = re.compile(r"\b(?:http|status)(?:\s+(?:error|code))?\s*:?\s*429\b")
+
+
+def http_status(error: Exception) -> Optional[int]:
+    """HTTP status carried by the exception or its response (requests, curl_cffi, urllib), if any."""
+    for source in (error, getattr(error, "response", None)):
+        for attribute in ("status_code", "status", "code"):
+            value = getattr(source, attribute, None)
+            if isinstance(value, int) and not isinstance(value, bool):
+                return value
+    return None
+
+
+def is_throttling_error(error: Exception) -> bool:
+    """Yahoo signals throttling with YFRateLimitError, an HTTP 429 status or a 'Too Many Requests' message."""
+    if type(error).__name__ == "YFRateLimitError":
+        return True
+    status = http_status(error)
+    if status is not None:
+        return status == 429
+    message = str(error).lower()
+    return "too many requests" in message or "rate limit" in message or bool(_THROTTLED_STATUS.search(message))
+
+
+# --------------------------- Token bucket ---------------------------------------
+
+class TokenBucket:
+    """Allows `rate` requests per second on average with bursts of up to `burst`."""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def try_acquire(self, tokens: int = 1) -> bool:
+        """Take `tokens` tokens if they are available right now, without waiting."""
+        with self._lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+
+# --------------------------- Circuit breaker ------------------------------------
+
+class CircuitBreaker:
+    """
+    Opens after `threshold` throttling errors within `window` seconds and keeps every worker
+    paused for `cooldown` seconds, so the pool stops hammering Yahoo while it is blocking us.
+    """
+
+    def __init__(self, threshold: int = 5, window: float = 30.0, cooldown: float = 60.0):
+        self.threshold = threshold
+        self.window = window
+        self.cooldown = cooldown
+        self.open_until = 0.0
+        self._errors: Deque[float] = collections.deque()
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def record_failure(self) -> None:
+        now = time.monotonic()
+        with self._lock:
+            self._errors.append(now)
+            while self._errors and self._errors[0] < now - self.window:
+                self._errors.popleft()
+            if len(self._errors) >= self.threshold:
+                self.open_until = now + self.cooldown
+                self._errors.clear()
+                print(f"⛔ Too many throttling errors – pausing requests for {self.cooldown:.0f}s")
+
+    def wait_until_closed(self) -> None:
+        while True:
+            remaining = self.open_until - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(remaining)
+
+
+# --------------------------- Scheduler ------------------------------------------
+
+class _Job:
+    __slots__ = ("key", "fn", "priority", "future", "attempt")
+
+    def __init__(self, key: str, fn: Callable[[], Any], priority: Priority, future: Future):
+        self.key = key
+        self.fn = fn
+        self.priority = priority
+        self.future = future
+        self.attempt = 0
+
+
+class FetchScheduler:
+    """
+    Single gateway for outbound Yahoo requests.
+
+    Jobs are run by a small pool of worker threads in priority order, each one waiting for a
+    token from the shared bucket and for the circuit breaker to be closed. Throttled jobs are
+    retried with exponential backoff (plus jitter); any other failure, or running out of retries,
+    fails the job's future with a FetchError so the caller can report it.
+    """
+
+    def __init__(self,
+                 rate: float = 4.0,
+                 burst: int = 8,
+                 workers: int = 4,
+                 max_retries: int = 4,
+                 backoff_base: float = 1.0,
+                 backoff_max: float = 30.0,
+                 breaker: Optional[CircuitBreaker] = None):
+        self.bucket = TokenBucket(rate, burst)
+        self.breaker = breaker or CircuitBreaker()
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.stats = collections.Counter()
+        self._queue: "queue.PriorityQueue[Tuple[int, int, Optional[_Job]]]" = queue.PriorityQueue()
+        self._sequence = itertools.count()
+        self._workers = [threading.Thread(target=self._run, daemon=True, name=f"fetch-{i}") for i in range(workers)]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, key: str, fn: Callable[[], Any], priority: Priority = Priority.TARGET) -> Future:
+        """Schedule `fn` (a single outbound request); `key` names it in errors and logs."""
+        future: Future = Future()
+        self._put(_Job(key, fn, priority, future))
+        return future
+
+    def call(self, key: str, fn: Callable[[], Any], priority: Priority = Priority.TARGET):
+        """Submit and wait for the result; raises FetchError on failure."""
+        return self.submit(key, fn, priority).result()
+
+    def fetch_info(self, symbol: str, priority: Priority = Priority.TARGET) -> Future:
+        return self.submit(symbol, lambda: yf.Ticker(symbol).info, priority)
+
+    def fetch_infos(self, symbols: List[str], priority: Priority = Priority.PEER) -> Tuple[Dict[str, Dict],
+                                                                                          Dict[str, str]]:
+        """Fetch many infos; returns (infos by symbol, failure reason by symbol)."""
+        futures = {symbol: self.fetch_info(symbol, priority) for symbol in dict.fromkeys(symbols)}
+        infos: Dict[str, Dict] = {}
+        failures: Dict[str, str] = {}
+        for symbol, future in futures.items():
+            try:
+                infos[symbol] = future.result() or {}
+            except FetchError as e:
+                failures[symbol] = e.reason
+        return infos, failures
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._queue.put((len(Priority), next(self._sequence), None))
+
+    # -- internals ----------------------------------------------------------------
+
+    def _put(self, job: _Job) -> None:
+        self._queue.put((int(job.priority), next(self._sequence), job))
+
+    def _backoff(self, attempt: int) -> float:
+        delay = min(self.backoff_max, self.backoff_base * 2 ** (attempt - 1))
+        return delay * random.uniform(0.5, 1.0)
+
+    def _run(self) -> None:
+        while True:
+            _, _, job = self._queue.get()
+            if job is None:
+                return
+            # A job cancelled while queued is dropped; once running it can no longer be cancelled
+            if job.attempt == 0 and not job.future.set_running_or_notify_cancel():
+                continue
+            self.breaker.wait_until_closed()
+            self.bucket.acquire()
+            job.attempt += 1
+            try:
+                result = job.fn()
+            except Exception as e:
+                self._failed(job, e)
+            else:
+                self.stats["ok"] += 1
+                job.future.set_result(result)
+
+    def _failed(self, job: _Job, error: Exception) -> None:
+        if not is_throttling_error(error):
+            self.stats["failed"] += 1
+            job.future.set_exception(FetchError(job.key, f"{type(error).__name__}: {error}"))
+            return
+
+        self.stats["throttled"] += 1
+        self.breaker.record_failure()
+        if job.attempt > self.max_retries:
+            self.stats["failed"] += 1
+            job.future.set_exception(FetchError(job.key, f"throttled after {job.attempt} attempts", throttled=True))
+            return
+        self.stats["retried"] += 1
+        timer = threading.Timer(self._backoff(job.attempt), self._put, args=(job,))
+        timer.daemon = True
+        timer.start()
+
+
+_default_scheduler: Optional[FetchScheduler] = None
+_default_lock = threading.Lock()
+
+
+def get_scheduler() -> FetchScheduler:
+    """Process-wide scheduler shared by every module that talks to Yahoo."""
+    global _default_scheduler
+    with _default_lock:
+        if _default_scheduler is None:
+            _default_scheduler = FetchScheduler()
+        return _default_scheduler
@@ -0,0 +1,250 @@
+import datetime
+import sqlite3
+import threading
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from typing import Callable, Dict, Iterable, Optional, Sequence, Set, Tuple
+
+from src.valuation.columnar import Columns, snapshot_matrix, as_columns
+from src.valuation.data_dir import data_path
+from src.valuation.fetch_scheduler import FetchError, Priority, get_scheduler
+
+fx_db = 'fx_rates.db'
+BASE = "USD"
+
+# Yahoo quotes some markets in a minor unit: (currency of the unit, units per major unit)
+MINOR_UNITS = {
+    "GBp": ("GBP", 100.0),
+    "GBX": ("GBP", 100.0),
+    "ZAc": ("ZAR", 100.0),
+    "ZAC": ("ZAR", 100.0),
+    "ILA": ("ILS", 100.0),
+}
+
+# `info` fields in the trading currency (`currency`) and in the reporting currency (`financialCurrency`).
+# EPS follows the statements: for .L tickers it is in pounds while the price is in pence.
+PRICE_FIELDS = ["currentPrice", "previousClose", "marketCap", "enterpriseValue", "targetMeanPrice"]
+STATEMENT_FIELDS = ["totalRevenue", "ebitda", "totalDebt", "totalCash", "cash", "freeCashflow", "operatingCashflow",
+                    "netIncomeToCommon", "grossProfits", "trailingEps"]
+# Multiples recomputed from converted inputs when the two currencies differ: field -> (numerator, denominator)
+RATIO_FIELDS = {
+    "trailingPE": ("currentPrice", "trailingEps"),
+    "priceToSalesTrailing12Months": ("marketCap", "totalRevenue"),
+    "enterpriseToEbitda": ("enterpriseValue", "ebitda"),
+}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS rates (
+    date     TEXT NOT NULL,
+    currency TEXT NOT NULL,
+    usd      REAL NOT NULL,
+    PRIMARY KEY (date, currency)
+);
+"""
+
+
+def currency_unit(code: Optional[str]) -> Tuple[Optional[str], float]:
+    """ISO currency of a Yahoo currency code and the divisor to get there ("GBp" -> ("GBP", 100))."""
+    if not code:
+        return None, 1.0
+    if code in MINOR_UNITS:
+        return MINOR_UNITS[code]
+    return code.upper(), 1.0
+
+
+def trading_currency(info: Dict) -> Optional[str]:
+    return currency_unit(info.get("currency"))[0]
+
+
+# --------------------------- Daily rate cache -----------------------------------
+
+def download_usd_rates(currencies: Sequence[str], date: datetime.date) -> Dict[str, float]:
+    """USD value of one unit of each currency, from the last close of Yahoo's XXXUSD=X pairs (one request)."""
+    pairs = {f"{c}USD=X": c for c in currencies}
+    history = get_scheduler().call(
+        "fx", lambda: yf.download(list(pairs), start=date - datetime.timedelta(days=7),
+                                  end=date + datetime.timedelta(days=1), progress=False, auto_adjust=False),
+        Priority.PEER)
+    if history is None or history.empty:
+        return {}
+    closes = history["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(next(iter(pairs)))
+    last = closes.ffill().iloc[-1]
+    return {pairs[pair]: float(rate) for pair, rate in last.items() if pd.notna(rate) and pair in pairs}
+
+
+class FxRates:
+    """
+    Daily FX rates kept in one local SQLite table (date, currency, USD per unit).
+    Rates missing for a day are downloaded together in a single request; any pair is crossed via USD.
+    The table is only opened once a rate is actually needed, and currencies Yahoo has no rate for
+    are not asked for again the same day.
+    """
+
+    def __init__(self, path: Optional[str] = None,
+                 fetch: Callable[[Sequence[str], datetime.date], Dict[str, float]] = download_usd_rates):
+        self.path = path
+        self.fetch = fetch
+        self._db: Optional[sqlite3.Connection] = None
+        self._unknown: Set[Tuple[str, str]] = set()
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._db is None:
+            self.path = self.path or data_path(fx_db)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.executescript(_SCHEMA)
+        return self._db
+
+    def close(self) -> None:
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def usd_rates(self, currencies: Iterable[str], date: Optional[datetime.date] = None) -> Dict[str, float]:
+        """USD per unit for each ISO currency on `date` (today by default); unknown currencies are left out."""
+        date = date or datetime.date.today()
+        day = date.isoformat()
+        wanted = sorted({c for c in currencies if c and c != BASE and (day, c) not in self._unknown})
+        rates = {BASE: 1.0}
+        if not wanted:
+            return rates
+        with self._lock:
+            db = self._connect()
+            rates.update(db.execute(
+                f"SELECT currency, usd FROM rates WHERE date = ? AND currency IN ({','.join('?' * len(wanted))})",
+                [day, *wanted]).fetchall())
+            missing = [c for c in wanted if c not in rates]
+            if missing:
+                try:
+                    fetched = self.fetch(missing, date)
+                except FetchError as e:
+                    print(f"⚠️ Could not fetch FX rates for {', '.join(missing)}: {e.reason}")
+                    fetched = None
+                if fetched is not None:
+                    # Only an answer without the currency marks it unknown; a failed request is retried
+                    self._unknown.update((day, c) for c in missing if c not in fetched)
+                    with db:
+                        db.executemany("INSERT OR REPLACE INTO rates VALUES (?, ?, ?)",
+                                       [(day, c, r) for c, r in fetched.items()])
+                    rates.update(fetched)
+        return {c: rates[c] for c in wanted + [BASE] if c in rates}
+
+    def factors(self, codes: Sequence[Optional[str]], target: str,
+                date: Optional[datetime.date] = None) -> np.ndarray:
+        """
+        Multiplier from each Yahoo currency code (minor units included) to `target`, as one array.
+        Every distinct code is resolved once; a missing code is taken to be `target` already,
+        a currency without a rate gives NaN.
+        """
+        labels, positions = np.unique(np.asarray([c or "" for c in codes], dtype=object), return_inverse=True)
+        units = [currency_unit(label or None) for label in labels]
+        foreign = [iso for iso, _ in units if iso not in (None, target)]
+        rates = self.usd_rates(foreign + [target], date) if foreign else {}
+
+        def factor(iso, scale):
+            if iso is None or iso == target:
+                return 1.0 / scale
+            if iso in rates and rates.get(target):
+                return rates[iso] / scale / rates[target]
+            return np.nan
+
+        per_label = np.array([factor(iso, scale) for iso, scale in units])
+        return per_label[positions] if len(codes) else np.empty(0)
+
+    def convert(self, values, codes: Sequence[Optional[str]], target: str,
+                date: Optional[datetime.date] = None) -> np.ndarray:
+        return np.asarray(values, dtype=float) * self.factors(codes, target, date)
+
+
+_default_rates: Optional[FxRates] = None
+_default_lock = threading.Lock()
+
+
+def get_fx_rates() -> FxRates:
+    """Process-wide rate cache (fx_rates.db in the data directory, opened on first use)."""
+    global _default_rates
+    with _default_lock:
+        if _default_rates is None:
+            _default_rates = FxRates()
+        return _default_rates
+
+
+# --------------------------- Column conversion ----------------------------------
+
+def convert_columns(cols: Columns,
+                    trading: Sequence[Optional[str]],
+                    reporting: Sequence[Optional[str]],
+                    target: str,
+                    rates: Optional[FxRates] = None,
+                    date: Optional[datetime.date] = None) -> Dict[str, np.ndarray]:
+    """
+    Express the money columns of a snapshot in `target`: PRICE_FIELDS from the trading currency,
+    STATEMENT_FIELDS from the reporting currency (a missing reporting currency is taken to be the
+    trading one). Multiples mixing the two currencies are recomputed from the converted inputs.
+    """
+    rates = rates or get_fx_rates()
+    reporting = [r or t for r, t in zip(reporting, trading)]
+    trading_factor = rates.factors(trading, target, date)
+    reporting_factor = rates.factors(reporting, target, date)
+
+    converted = dict(cols)
+    for field in PRICE_FIELDS:
+        if field in cols:
+            converted[field] = cols[field] * trading_factor
+    for field in STATEMENT_FIELDS:
+        if field in cols:
+            converted[field] = cols[field] * reporting_factor
+
+    mixed = np.array([currency_unit(t) != currency_unit(r) for t, r in zip(trading, reporting)], dtype=bool)
+    for field, (numerator, denominator) in RATIO_FIELDS.items():
+        if field in cols and numerator in converted and denominator in converted:
+            with np.errstate(divide="ignore", invalid="ignore"):
+                recomputed = converted[numerator] / converted[denominator]
+            valid = mixed & np.isfinite(recomputed) & (converted[denominator] > 0)
+            converted[field] = np.where(valid, recomputed, cols[field])
+    return converted
+
+
+def convert_infos(infos: Dict[str, Dict],
+                  target: Optional[str] = None,
+                  rates: Optional[FxRates] = None,
+                  date: Optional[datetime.date] = None) -> Dict[str, Dict]:
+    """
+    Copies of `info` dicts with their money fields in `target` (each ticker's own ISO trading
+    currency by default, i.e. pence become pounds). All tickers are converted in one columnar pass.
+    """
+    symbols = list(infos)
+    trading = [infos[s].get("currency") for s in symbols]
+    reporting = [infos[s].get("financialCurrency") for s in symbols]
+    fields = list(dict.fromkeys(PRICE_FIELDS + STATEMENT_FIELDS + list(RATIO_FIELDS)))
+    _, matrix = snapshot_matrix(infos, fields)
+    cols = as_columns(matrix, fields)
+
+    rates = rates or get_fx_rates()
+    if target is None:
+        converted = {}
+        targets = np.array([currency_unit(t)[0] or "" for t in trading], dtype=object)
+        for currency in np.unique(targets):
+            members = np.flatnonzero(targets == currency)
+            part = convert_columns({f: v[members] for f, v in cols.items()}, [trading[i] for i in members],
+                                   [reporting[i] for i in members], currency or BASE, rates, date)
+            for field, values in part.items():
+                converted.setdefault(field, np.full(len(symbols), np.nan))[members] = values
+    else:
+        converted = convert_columns(cols, trading, reporting, target, rates, date)
+
+    result = {}
+    for j, symbol in enumerate(symbols):
+        info = dict(infos[symbol])
+        currency = target or currency_unit(trading[j])[0]
+        for field in fields:
+            if infos[symbol].get(field) is not None and not np.isnan(converted[field][j]):
+                info[field] = float(converted[field][j])
+        if currency:
+            info["currency"] = info["financialCurrency"] = currency
+        result[symbol] = info
+    return result
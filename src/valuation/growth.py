@@ -0,0 +1,191 @@
+import datetime
+import warnings
+import numpy as np
+import pandas as pd
+
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.valuation.ticker_handle import TickerHandle, as_handle
+
+# Annual series a growth rate is estimated for, and the statement row each one comes from
+STATEMENT_ROWS = {
+    "fcf": ("cashflow", "Free Cash Flow"),
+    "revenue": ("financials", "Total Revenue"),
+}
+GROWTH_SERIES = ["fcf", "revenue", "dividends"]
+METHODS = ("log_linear", "theil_sen")
+
+# Fewer positive annual values than this give no estimate
+MIN_POINTS = 3
+# A fit explaining less of the log-variance than this is not used as a default
+MIN_R2 = 0.5
+# Estimates are clipped to a range a DCF can use
+GROWTH_BOUNDS = (-0.5, 1.0)
+
+
+# --------------------------- Batched fits ---------------------------------------
+# Every function takes a (tickers x years) matrix, oldest year first, NaN where there is no value.
+
+def _log_matrix(values: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # Log of the positive values; zero, negative (e.g. cash burn) and missing years are left out
+    values = np.atleast_2d(np.asarray(values, dtype=float))
+    valid = np.isfinite(values) & (values > 0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(valid, np.log(np.where(valid, values, 1.0)), 0.0), valid
+
+
+def _fit_quality(logs: np.ndarray, valid: np.ndarray, intercept: np.ndarray, slope: np.ndarray,
+                 t: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    # R² and standard error of the slope of a line through the valid log points of each row
+    n = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_y = np.where(valid, logs, 0.0).sum(axis=1) / n
+        mean_t = np.where(valid, t, 0.0).sum(axis=1) / n
+        residuals = np.where(valid, logs - intercept[:, None] - slope[:, None] * t, 0.0)
+        ss_res = (residuals ** 2).sum(axis=1)
+        ss_tot = (np.where(valid, logs - mean_y[:, None], 0.0) ** 2).sum(axis=1)
+        s_tt = (np.where(valid, t - mean_t[:, None], 0.0) ** 2).sum(axis=1)
+        r2 = np.where(ss_tot > 0, 1 - ss_res / ss_tot, 1.0)
+        stderr = np.where(n > 2, np.sqrt(ss_res / (n - 2) / s_tt), np.nan)
+    return r2, stderr
+
+
+def fit_log_linear(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Least-squares line through log(value) against the year of every row at once (closed-form sums,
+    no per-ticker loop). Returns slope and intercept of the log line, points used, R² and the
+    standard error of the slope.
+    """
+    logs, valid = _log_matrix(values)
+    t = np.broadcast_to(np.arange(logs.shape[1], dtype=float), logs.shape)
+    n = valid.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        sum_t = np.where(valid, t, 0.0).sum(axis=1)
+        sum_y = logs.sum(axis=1)
+        sum_tt = np.where(valid, t * t, 0.0).sum(axis=1)
+        sum_ty = np.where(valid, t * logs, 0.0).sum(axis=1)
+        slope = (n * sum_ty - sum_t * sum_y) / (n * sum_tt - sum_t ** 2)
+        intercept = (sum_y - slope * sum_t) / n
+    r2, stderr = _fit_quality(logs, valid, intercept, slope, t)
+    return {"slope": slope, "intercept": intercept, "points": n, "r2": r2, "stderr": stderr}
+
+
+def fit_theil_sen(values: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Robust alternative to `fit_log_linear`: the slope is the median of the slopes between every
+    pair of years, so one exceptional year (a special dividend, a one-off charge) barely moves it.
+    All tickers are fitted together over the (tickers x pairs) slope matrix.
+    """
+    logs, valid = _log_matrix(values)
+    years = logs.shape[1]
+    t = np.broadcast_to(np.arange(years, dtype=float), logs.shape)
+    first, second = np.triu_indices(years, k=1)
+    pair_valid = valid[:, first] & valid[:, second]
+    pair_slopes = np.where(pair_valid, (logs[:, second] - logs[:, first]) / (second - first), np.nan)
+    n = valid.sum(axis=1)
+    # Rows without a valid pair are all-NaN slices: their NaN median is the expected answer
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", RuntimeWarning)
+        slope = np.nanmedian(pair_slopes, axis=1) if pair_slopes.size else np.full(len(logs), np.nan)
+        intercept = np.nanmedian(np.where(valid, logs - slope[:, None] * t, np.nan), axis=1)
+    r2, stderr = _fit_quality(logs, valid, intercept, slope, t)
+    return {"slope": slope, "intercept": intercept, "points": n, "r2": r2, "stderr": stderr}
+
+
+def estimate_growth(values: np.ndarray, method: str = "log_linear", min_points: int = MIN_POINTS) -> pd.DataFrame:
+    """
+    Annual growth rate of every row of a (tickers x years) matrix in one call: exp(slope) - 1 of the
+    chosen fit, clipped to GROWTH_BOUNDS, with its fit quality. Columns: growth, r2, stderr, points,
+    reliable (enough points and r2 >= MIN_R2). Rows without `min_points` positive values get NaN.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown growth method {method!r}; use one of {', '.join(METHODS)}")
+    fit = (fit_log_linear if method == "log_linear" else fit_theil_sen)(values)
+    enough = fit["points"] >= min_points
+    with np.errstate(over="ignore", invalid="ignore"):
+        growth = np.where(enough, np.clip(np.expm1(fit["slope"]), *GROWTH_BOUNDS), np.nan)
+    table = pd.DataFrame({
+        "growth": growth,
+        "r2": np.where(enough, fit["r2"], np.nan),
+        "stderr": np.where(enough, fit["stderr"], np.nan),
+        "points": fit["points"],
+    })
+    table["reliable"] = enough & (table["r2"] >= MIN_R2)
+    return table
+
+
+# --------------------------- Statement history ----------------------------------
+
+def history_matrix(histories: Dict[str, Sequence[float]], years: int) -> Tuple[List[str], np.ndarray]:
+    """Last `years` values of each ticker's annual series (oldest first), right-aligned in one NaN-padded matrix."""
+    symbols = list(histories)
+    matrix = np.full((len(symbols), years), np.nan)
+    for i, symbol in enumerate(symbols):
+        series = np.asarray(histories[symbol], dtype=float)[-years:]
+        if len(series):
+            matrix[i, years - len(series):] = series
+    return symbols, matrix
+
+
+def yearly_dividends(dividends: Optional[pd.Series], today: Optional[datetime.date] = None) -> np.ndarray:
+    """Dividends paid per calendar year, oldest first, without the current (incomplete) year."""
+    if dividends is None or len(dividends) == 0:
+        return np.empty(0)
+    today = today or datetime.date.today()
+    yearly = dividends.groupby(pd.DatetimeIndex(dividends.index).year).sum()
+    return yearly[yearly.index < today.year].to_numpy(dtype=float)
+
+
+def statement_row(statement: Optional[pd.DataFrame], row: str) -> np.ndarray:
+    """One row of a Yahoo annual statement (columns newest first) as a series, oldest first."""
+    if statement is None or getattr(statement, "empty", True) or row not in statement.index:
+        return np.empty(0)
+    values = statement.loc[row]
+    values = values[sorted(values.index)] if len(values) else values
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype=float)
+
+
+def statement_history(ticker, series: Iterable[str] = GROWTH_SERIES) -> Dict[str, np.ndarray]:
+    """Annual FCF, revenue and dividend history of one ticker (downloaded once per handle)."""
+    handle: TickerHandle = as_handle(ticker)
+    history = {}
+    for name in series:
+        if name == "dividends":
+            history[name] = yearly_dividends(handle.dividends)
+        else:
+            attribute, row = STATEMENT_ROWS[name]
+            history[name] = statement_row(getattr(handle, attribute), row)
+    return history
+
+
+def growth_table(histories: Dict[str, Dict[str, Sequence[float]]],
+                 series: Sequence[str] = GROWTH_SERIES,
+                 method: str = "log_linear",
+                 years: int = 10) -> pd.DataFrame:
+    """
+    Growth estimates of a whole universe: `histories` maps symbol -> {series name -> annual values}.
+    One batched fit per series; columns are "<series>_growth", "<series>_r2", "<series>_points"
+    and "<series>_reliable", indexed by symbol.
+    """
+    symbols = list(histories)
+    table = pd.DataFrame(index=pd.Index(symbols, name="Symbol"))
+    for name in series:
+        _, matrix = history_matrix({s: histories[s].get(name, ()) for s in symbols}, years)
+        estimates = estimate_growth(matrix, method)
+        estimates.index = table.index
+        for column in ("growth", "r2", "points", "reliable"):
+            table[f"{name}_{column}"] = estimates[column]
+    return table
+
+
+def default_growth(history: Dict[str, Sequence[float]], series: str = "fcf",
+                   method: str = "log_linear") -> Optional[Dict[str, float]]:
+    """
+    Growth of one ticker's `series` to use as a model default, with its fit quality
+    (None when the history is too short or the fit below MIN_R2).
+    """
+    estimate = growth_table({"": history}, [series], method).iloc[0]
+    if not estimate[f"{series}_reliable"]:
+        return None
+    return {"growth": float(estimate[f"{series}_growth"]), "r2": float(estimate[f"{series}_r2"]),
+            "points": int(estimate[f"{series}_points"]), "method": method}
@@ -0,0 +1,172 @@
+import os
+import socket
+import sqlite3
+import time
+
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+# Seconds a claimed job stays reserved for its worker unless the lease is extended
+DEFAULT_LEASE = 120.0
+DEFAULT_MAX_ATTEMPTS = 3
+
+PENDING, LEASED, DONE, FAILED = "pending", "leased", "done", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch       TEXT NOT NULL,
+    kind        TEXT NOT NULL,
+    payload     BLOB NOT NULL,
+    state       TEXT NOT NULL,
+    worker      TEXT,
+    lease_until REAL,
+    attempts    INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    error       TEXT,
+    result      BLOB,
+    finished    REAL
+);
+CREATE INDEX IF NOT EXISTS jobs_state ON jobs (state, lease_until);
+CREATE INDEX IF NOT EXISTS jobs_batch ON jobs (batch, state);
+"""
+
+
+class Job(NamedTuple):
+    id: int
+    batch: str
+    kind: str
+    payload: bytes
+    worker: str
+    attempt: int
+    max_attempts: int
+
+
+def worker_name() -> str:
+    """Default worker id: host and process, unique across the machines sharing a queue."""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """
+    Work queue with leases in one SQLite file (a local path, or a shared directory for several nodes).
+
+    Workers `claim` a job, which leases it for `lease` seconds; they `extend` the lease while working
+    and then `complete` or `fail` it. A job whose lease runs out (crashed or stuck worker) is handed to
+    the next claimer; after `max_attempts` tries (fixed per job when it is submitted) it is marked
+    failed. Completion is fenced on the worker and attempt, so a worker that lost its lease cannot
+    overwrite the retry's result.
+    Lease expiry uses wall-clock time, so nodes sharing a queue need synchronised clocks.
+
+    The public methods are the whole broker interface: a queue on Redis or a real message broker
+    only has to provide the same ones.
+    """
+
+    def __init__(self, path: str, lease: float = DEFAULT_LEASE, max_attempts: int = DEFAULT_MAX_ATTEMPTS):
+        self.path = path
+        self.lease = lease
+        self.max_attempts = max_attempts
+        # Autocommit mode: write transactions are opened explicitly with BEGIN IMMEDIATE
+        self._db = sqlite3.connect(path, timeout=60, isolation_level=None)
+        self._db.executescript(_SCHEMA)
+
+    def close(self) -> None:
+        self._db.close()
+
+    def _write(self, statements):
+        self._db.execute("BEGIN IMMEDIATE")
+        try:
+            result = statements()
+        except BaseException:
+            self._db.execute("ROLLBACK")
+            raise
+        self._db.execute("COMMIT")
+        return result
+
+    # -- coordinator --------------------------------------------------------------
+
+    def submit(self, batch: str, kind: str, payloads: Iterable[bytes]) -> List[int]:
+        """Queue one job per payload; returns the job ids in payload order."""
+        def insert():
+            return [self._db.execute("INSERT INTO jobs (batch, kind, payload, state, max_attempts) "
+                                     "VALUES (?, ?, ?, ?, ?)",
+                                     (batch, kind, payload, PENDING, self.max_attempts)).lastrowid
+                    for payload in payloads]
+        return self._write(insert)
+
+    def counts(self, batch: Optional[str] = None) -> Dict[str, int]:
+        """Jobs per state (expired leases still count as leased until someone reclaims them)."""
+        query = "SELECT state, COUNT(*) FROM jobs" + (" WHERE batch = ?" if batch else "") + " GROUP BY state"
+        counts = {PENDING: 0, LEASED: 0, DONE: 0, FAILED: 0}
+        counts.update(self._db.execute(query, (batch,) if batch else ()).fetchall())
+        return counts
+
+    def unfinished(self, batch: Optional[str] = None) -> int:
+        counts = self.counts(batch)
+        return counts[PENDING] + counts[LEASED]
+
+    def results(self, batch: str) -> List[Tuple[int, bytes]]:
+        """(job id, result) of the finished jobs of `batch`, in submission order."""
+        return self._db.execute("SELECT id, result FROM jobs WHERE batch = ? AND state = ? ORDER BY id",
+                                (batch, DONE)).fetchall()
+
+    def failures(self, batch: str) -> Dict[int, str]:
+        return dict(self._db.execute("SELECT id, error FROM jobs WHERE batch = ? AND state = ? ORDER BY id",
+                                     (batch, FAILED)).fetchall())
+
+    def purge(self, batch: str) -> None:
+        """Drop every job of `batch` once its results have been collected."""
+        self._write(lambda: self._db.execute("DELETE FROM jobs WHERE batch = ?", (batch,)))
+
+    # -- worker -------------------------------------------------------------------
+
+    def claim(self, worker: Optional[str] = None, kinds: Optional[Iterable[str]] = None) -> Optional[Job]:
+        """
+        Lease the oldest pending (or lease-expired) job, optionally only of the given kinds.
+        Returns None when there is nothing to do right now.
+        """
+        worker = worker or worker_name()
+        kinds = list(kinds) if kinds else None
+
+        def take():
+            now = time.time()
+            # Jobs whose last lease expired on their final attempt are given up on
+            self._db.execute("UPDATE jobs SET state = ?, error = COALESCE(error, 'lease expired'), finished = ? "
+                             "WHERE state = ? AND lease_until < ? AND attempts >= max_attempts",
+                             (FAILED, now, LEASED, now))
+            kind_filter = f" AND kind IN ({','.join('?' * len(kinds))})" if kinds else ""
+            row = self._db.execute(
+                "SELECT id, batch, kind, payload, attempts, max_attempts FROM jobs "
+                f"WHERE (state = ? OR (state = ? AND lease_until < ?)){kind_filter} ORDER BY id LIMIT 1",
+                (PENDING, LEASED, now, *(kinds or ()))).fetchone()
+            if row is None:
+                return None
+            job_id, batch, kind, payload, attempts, max_attempts = row
+            self._db.execute("UPDATE jobs SET state = ?, worker = ?, lease_until = ?, attempts = ? WHERE id = ?",
+                             (LEASED, worker, now + self.lease, attempts + 1, job_id))
+            return Job(job_id, batch, kind, payload, worker, attempts + 1, max_attempts)
+
+        return self._write(take)
+
+    def _owned(self, job: Job) -> Tuple[str, tuple]:
+        return "id = ? AND state = ? AND worker = ? AND attempts = ?", (job.id, LEASED, job.worker, job.attempt)
+
+    def extend(self, job: Job) -> bool:
+        """Renew the lease of `job`; False if it was lost (expired and claimed by another worker)."""
+        where, args = self._owned(job)
+        return self._write(lambda: self._db.execute(
+            f"UPDATE jobs SET lease_until = ? WHERE {where}", (time.time() + self.lease, *args)).rowcount == 1)
+
+    def complete(self, job: Job, result: bytes) -> bool:
+        """Store the result of `job`; False (result dropped) if the lease was lost in the meantime."""
+        where, args = self._owned(job)
+        return self._write(lambda: self._db.execute(
+            f"UPDATE jobs SET state = ?, result = ?, error = NULL, finished = ? WHERE {where}",
+            (DONE, result, time.time(), *args)).rowcount == 1)
+
+    def fail(self, job: Job, error: str) -> bool:
+        """Give the job back for a retry, or mark it failed after `max_attempts` attempts."""
+        where, args = self._owned(job)
+        state = FAILED if job.attempt >= job.max_attempts else PENDING
+        return self._write(lambda: self._db.execute(
+            f"UPDATE jobs SET state = ?, error = ?, lease_until = NULL, finished = ? WHERE {where}",
+            (state, error, time.time() if state == FAILED else None, *args)).rowcount == 1)
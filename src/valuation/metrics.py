@@ -0,0 +1,302 @@
+import numpy as np
+import pandas as pd
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from src.valuation import columnar
+from src.valuation.columnar import Columns, snapshot_matrix, as_columns
+from src.valuation.reverse_dcf import implied_growth
+
+# Default parameters of the parametrised metrics (DCF, implied growth)
+DEFAULT_PARAMS = {
+    "growth_rate": 0.0,
+    "years": 5,
+    "discount_rate": 0.10,
+    "terminal_growth": 0.03,
+    # Multi-stage DCF: years at `growth_rate`, then years fading linearly to `terminal_growth`
+    "high_years": 5,
+    "fade_years": 5,
+}
+# Modules doing the maths behind metric values; memoized results computed from them key on their source
+METRIC_CODE = ["src.valuation.columnar", "src.valuation.metrics", "src.valuation.dcf_vectorized",
+               "src.valuation.reverse_dcf"]
+
+
+# --------------------------- Registry -------------------------------------------
+
+class Metric:
+    """A named column computed from snapshot fields and/or other metrics."""
+
+    def __init__(self, name: str, fields: Sequence[str], depends: Sequence[str],
+                 compute: Callable[["MetricFrame"], np.ndarray], description: str):
+        self.name = name
+        self.fields = tuple(fields)
+        self.depends = tuple(depends)
+        self.compute = compute
+        self.description = description
+
+
+METRICS: Dict[str, Metric] = {}
+
+
+def register(name: str, fields: Sequence[str] = (), depends: Sequence[str] = (), description: str = ""):
+    """
+    Decorator registering a vectorized metric. The function receives a MetricFrame and returns
+    one value per ticker; it may read any of `fields` and any metric listed in `depends`.
+
+        @register("earnings_yield", fields=["trailingPE"])
+        def earnings_yield(frame):
+            return 1 / frame["trailingPE"]
+    """
+    def decorator(compute):
+        if name in METRICS:
+            raise ValueError(f"Metric {name} is already registered.")
+        METRICS[name] = Metric(name, fields, depends, compute, description or (compute.__doc__ or "").strip())
+        return compute
+    return decorator
+
+
+def required_fields(names: Iterable[str]) -> List[str]:
+    """Snapshot fields needed by `names` and everything they depend on, each listed once."""
+    fields: Dict[str, None] = {}
+    seen = set()
+
+    def visit(name):
+        if name in seen:
+            return
+        if name not in METRICS:
+            raise KeyError(f"Unknown metric {name}.")
+        seen.add(name)
+        metric = METRICS[name]
+        for dependency in metric.depends:
+            visit(dependency)
+        fields.update(dict.fromkeys(metric.fields))
+
+    for name in names:
+        visit(name)
+    return list(fields)
+
+
+class MetricFrame:
+    """
+    Snapshot columns plus every metric computed from them so far.
+    Each metric (and each shared intermediate) is computed at most once per frame.
+    """
+
+    def __init__(self, cols: Columns, params: Optional[Dict[str, Any]] = None):
+        self.cols = cols
+        self.params = {**DEFAULT_PARAMS, **(params or {})}
+        self.values: Dict[str, np.ndarray] = {}
+        self._shared: Dict[str, Any] = {}
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        if name in self.values:
+            return self.values[name]
+        if name in METRICS:
+            value = np.asarray(METRICS[name].compute(self))
+            self.values[name] = value
+            return value
+        return self.cols[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in METRICS or name in self.cols
+
+    def shared(self, key: str, compute: Callable[[], Any]) -> Any:
+        """Intermediate result used by several metrics (e.g. the whole DCF dict)."""
+        if key not in self._shared:
+            self._shared[key] = compute()
+        return self._shared[key]
+
+
+def compute_metrics(cols: Columns, names: Optional[Iterable[str]] = None, **params) -> Dict[str, np.ndarray]:
+    """Every requested metric (all registered by default) in one pass over `cols`."""
+    frame = MetricFrame(cols, params)
+    return {name: frame[name] for name in (METRICS if names is None else names)}
+
+
+def metrics_frame(infos: Dict[str, Dict], names: Optional[Iterable[str]] = None, **params) -> pd.DataFrame:
+    """Requested metrics for `info` dicts as a (tickers x metrics) table; each field is read once."""
+    names = list(METRICS if names is None else names)
+    fields = required_fields(names)
+    symbols, matrix = snapshot_matrix(infos, fields)
+    return pd.DataFrame(compute_metrics(as_columns(matrix, fields), names, **params), index=symbols)
+
+
+def metric_values(info: Dict, names: Iterable[str], **params) -> Dict[str, Optional[float]]:
+    """Requested metrics of one `info` dict as plain floats (None where the metric is undefined)."""
+    names = list(names)
+    row = metrics_frame({"": info}, names, **params).iloc[0]
+    return {name: None if pd.isna(row[name]) else float(row[name]) for name in names}
+
+
+# --------------------------- Valuation metrics ----------------------------------
+
+@register("price", fields=["currentPrice"], description="Current price")
+def _price(frame):
+    return frame["currentPrice"]
+
+
+def _pegy(frame):
+    return frame.shared("pegy", lambda: columnar.pegy(frame))
+
+
+@register("pegy", fields=["trailingPE", "earningsQuarterlyGrowth", "dividendYield"],
+          description="P/E over growth plus dividend yield (PEG where there is no dividend yield)")
+def _pegy_value(frame):
+    return _pegy(frame)["value"]
+
+
+@register("is_pegy", fields=["dividendYield"], description="1 where `pegy` includes the dividend yield")
+def _is_pegy(frame):
+    return _pegy(frame)["is_pegy"]
+
+
+@register("peg", fields=["trailingPE", "earningsGrowth"], description="P/E over earnings growth (%)")
+def _peg(frame):
+    pe, growth = frame["trailingPE"], frame["earningsGrowth"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(columnar._present(pe) & columnar._present(growth), pe / (growth * 100), np.nan)
+
+
+def _dcf(frame):
+    p = frame.params
+    return frame.shared("dcf", lambda: columnar.dcf(frame, p["growth_rate"], p["years"], p["discount_rate"],
+                                                   p["terminal_growth"]))
+
+
+_DCF_FIELDS = ["freeCashflow", "sharesOutstanding", "earningsGrowth"]
+
+for _name, _key in [("dcf_pv_fcfs", "pv_fcfs"), ("dcf_pv_terminal", "pv_terminal"),
+                    ("dcf_total_equity", "total_equity"), ("dcf_intrinsic_per_share", "intrinsic_per_share")]:
+    register(_name, fields=_DCF_FIELDS, description=f"DCF {_key.replace('_', ' ')}")(
+        lambda frame, key=_key: _dcf(frame)[key])
+
+
+def _dcf_greeks(frame):
+    p = frame.params
+    return frame.shared("dcf_greeks", lambda: columnar.dcf_greeks(frame, p["growth_rate"], p["years"],
+                                                                 p["discount_rate"], p["terminal_growth"]))
+
+
+for _name, _input in [("dcf_d_growth", "growth rate"), ("dcf_d_discount_rate", "discount rate"),
+                      ("dcf_d_terminal_growth", "terminal growth"), ("dcf_d_fcf", "base FCF")]:
+    register(_name, fields=_DCF_FIELDS, description=f"Derivative of the DCF value per share with respect to {_input}")(
+        lambda frame, key=_name[len("dcf_"):]: _dcf_greeks(frame)[key])
+
+
+@register("dcf_multi_stage_per_share", fields=_DCF_FIELDS,
+          description="Multi-stage DCF value per share (high growth, linear fade, terminal)")
+def _dcf_multi_stage_per_share(frame):
+    p = frame.params
+    return columnar.multi_stage(frame, p["growth_rate"], p["high_years"], p["fade_years"], p["discount_rate"],
+                                p["terminal_growth"])["intrinsic_per_share"]
+
+
+@register("dcf_upside", depends=["dcf_intrinsic_per_share", "price"],
+          description="DCF intrinsic value over the current price, minus 1")
+def _dcf_upside(frame):
+    price = frame["price"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(columnar._present(price), frame["dcf_intrinsic_per_share"] / price - 1, np.nan)
+
+
+@register("fcf_yield", fields=["freeCashflow", "marketCap"], description="Free cash flow over market cap")
+def _fcf_yield(frame):
+    market_cap = frame["marketCap"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(columnar._present(market_cap), frame["freeCashflow"] / market_cap, np.nan)
+
+
+def _comps(frame):
+    return frame.shared("comps", lambda: columnar.comps(
+        frame, {m: frame[f"avg {m}"] for m in ["P/E", "P/S", "EV/EBITDA"]}))
+
+
+_COMPS_FIELDS = ["sharesOutstanding", "trailingEps", "totalRevenue", "ebitda", "totalDebt", "cash",
+                 "avg P/E", "avg P/S", "avg EV/EBITDA"]
+
+for _name, _multiple in [("comps_pe", "P/E"), ("comps_ps", "P/S"), ("comps_ev_ebitda", "EV/EBITDA")]:
+    register(_name, fields=_COMPS_FIELDS, description=f"Implied price at the peer average {_multiple}")(
+        lambda frame, multiple=_multiple: _comps(frame)[multiple])
+
+
+@register("revenue_growth_pct", fields=["revenueGrowth"], description="Revenue growth (%, missing counts as 0)")
+def _revenue_growth_pct(frame):
+    return np.nan_to_num(frame["revenueGrowth"]) * 100
+
+
+@register("operating_margin_pct", fields=["operatingMargins"],
+          description="Operating margin (%, missing counts as 0)")
+def _operating_margin_pct(frame):
+    return np.nan_to_num(frame["operatingMargins"]) * 100
+
+
+@register("rule_of_40", depends=["revenue_growth_pct", "operating_margin_pct"],
+          description="Revenue growth (%) plus operating margin (%)")
+def _rule_of_40(frame):
+    return frame["revenue_growth_pct"] + frame["operating_margin_pct"]
+
+
+@register("meets_rule_of_40", depends=["rule_of_40"], description="1 where the Rule of 40 score is at least 40")
+def _meets_rule_of_40(frame):
+    return frame["rule_of_40"] >= 40
+
+
+@register("implied_growth", fields=["currentPrice", "freeCashflow", "sharesOutstanding"],
+          description="FCF growth priced in by the market (reverse DCF)")
+def _implied_growth(frame):
+    p = frame.params
+    return implied_growth(frame["currentPrice"], frame["freeCashflow"], frame["sharesOutstanding"],
+                          p["years"], p["discount_rate"], p["terminal_growth"])["growth"]
+
+
+# --------------------------- Company analysis scores ----------------------------
+
+SCORES = {
+    "pe_score": (columnar.pe_score, "trailingPE"),
+    "ev_to_ebitda_score": (columnar.ev_to_ebitda_score, "enterpriseToEbitda"),
+    "pb_score": (columnar.pb_score, "priceToBook"),
+    "ps_score": (columnar.ps_score, "priceToSalesTrailing12Months"),
+    "earnings_growth_score": (columnar.earnings_growth_score, "earningsQuarterlyGrowth"),
+    "profit_margin_score": (columnar.profit_margin_score, "profitMargins"),
+    "roe_score": (columnar.roe_score, "returnOnEquity"),
+    "dividend_yield_score": (columnar.dividend_yield_score, "dividendYield"),
+}
+
+for _name, (_score, _field) in SCORES.items():
+    register(_name, fields=[_field], description=f"0-10 score of {_field} (company_analysis)")(
+        lambda frame, score=_score, field=_field: score(frame[field]))
+
+# The scores summed into the final `analyze_company` score
+SCORED = ["pe_score", "ev_to_ebitda_score", "earnings_growth_score", "profit_margin_score", "roe_score",
+          "dividend_yield_score"]
+
+
+def _scored(frame):
+    return frame.shared("scored", lambda: np.vstack([frame[name] for name in SCORED]))
+
+
+@register("score_total", depends=SCORED, description="Sum of the scored metrics")
+def _score_total(frame):
+    return np.nansum(_scored(frame), axis=0)
+
+
+@register("score_count", depends=SCORED, description="Number of metrics that could be scored")
+def _score_count(frame):
+    return np.sum(~np.isnan(_scored(frame)), axis=0)
+
+
+@register("score_pct", depends=["score_total", "score_count"], description="Final score in % of the maximum")
+def _score_pct(frame):
+    count = frame["score_count"]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.where(count > 0, frame["score_total"] / (count * 10) * 100, np.nan)
+
+
+# --------------------------- Lynch categories -----------------------------------
+
+@register("category", fields=["revenueGrowth", "trailingPE", "dividendYield", "payoutRatio", "marketCap",
+                              "fiveYearAvgDividendYield", "earningsGrowth", "freeCashflow", "debtToEquity", "beta"],
+          description="Peter Lynch category code (index into columnar.CATEGORIES)")
+def _category(frame):
+    return columnar.classify(frame)
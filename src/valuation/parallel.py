@@ -0,0 +1,216 @@
+import os
+import numpy as np
+import pandas as pd
+
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, List, Dict, Optional, Sequence, Tuple
+
+from src.valuation import columnar
+from src.valuation.columnar import SNAPSHOT_FIELDS, snapshot_matrix, as_columns
+from src.valuation.metrics import METRIC_CODE, compute_metrics, required_fields
+from src.valuation.result_cache import ResultCache, cached_columns, code_fingerprint
+from src.valuation.snapshot_file import SnapshotFile
+
+MULTIPLE_FIELDS = {
+    "P/E": "trailingPE",
+    "P/S": "priceToSalesTrailing12Months",
+    "EV/EBITDA": "enterpriseToEbitda",
+}
+
+# Extra rows appended to the snapshot matrix: industry average of each multiple per ticker
+AVG_FIELDS = [f"avg {m}" for m in MULTIPLE_FIELDS]
+SHARD_FIELDS = SNAPSHOT_FIELDS + AVG_FIELDS
+
+RESULT_FIELDS = [
+    "price",
+    "pegy",
+    "is_pegy",
+    "dcf_pv_fcfs",
+    "dcf_pv_terminal",
+    "dcf_total_equity",
+    "dcf_intrinsic_per_share",
+    "dcf_d_growth",
+    "dcf_d_discount_rate",
+    "dcf_d_terminal_growth",
+    "dcf_d_fcf",
+    "comps_pe",
+    "comps_ps",
+    "comps_ev_ebitda",
+    "rule_of_40",
+    "score_total",
+    "score_count",
+    "score_pct",
+    "category",
+    "implied_growth",
+]
+
+# Snapshot fields the RESULT_FIELDS metrics read; the result cache hashes only these
+RESULT_INPUTS = required_fields(RESULT_FIELDS)
+# Modules whose source is part of every cached result key
+_RESULT_CODE = METRIC_CODE + [__name__]
+
+
+# --------------------------- Worker side ----------------------------------------
+
+def value_columns(cols: columnar.Columns,
+                  growth_rate: float = 0.0,
+                  years: int = 5,
+                  discount_rate: float = 0.10,
+                  terminal_growth: float = 0.03) -> np.ndarray:
+    """
+    Run every valuation on one shard of the universe.
+    `cols` holds the snapshot fields plus AVG_FIELDS; the result has one row per RESULT_FIELDS
+    metric (see metrics.METRICS) and the same column order.
+    """
+    values = compute_metrics(cols, RESULT_FIELDS, growth_rate=growth_rate, years=years,
+                             discount_rate=discount_rate, terminal_growth=terminal_growth)
+    return np.vstack([values[name] for name in RESULT_FIELDS]).astype(np.float64)
+
+
+def value_shard(shard: np.ndarray, **params) -> np.ndarray:
+    """`value_columns` for a matrix with SHARD_FIELDS rows."""
+    return value_columns(as_columns(shard, SHARD_FIELDS), **params)
+
+
+def _value_shard_task(args) -> np.ndarray:
+    shard, params = args
+    return value_shard(shard, **params)
+
+
+def value_file_shard(path: str, start: int, stop: int, averages: np.ndarray, **params) -> np.ndarray:
+    """`value_columns` for tickers [start, stop) of a snapshot file; `averages` has AVG_FIELDS rows."""
+    cols = SnapshotFile(path).columns(start, stop)
+    cols.update(as_columns(averages, AVG_FIELDS))
+    return value_columns(cols, **params)
+
+
+def _value_file_shard_task(args) -> np.ndarray:
+    # Workers map the snapshot file themselves, only offsets and the small average block are pickled
+    path, start, stop, averages, params = args
+    return value_file_shard(path, start, stop, averages, **params)
+
+
+# --------------------------- Coordinator side -----------------------------------
+
+def industry_multiples(industries: Sequence[Optional[str]], cols: columnar.Columns) -> np.ndarray:
+    """
+    Average P/E, P/S and EV/EBITDA of each ticker's industry, shape (len(MULTIPLE_FIELDS), len(industries)).
+    Like `collect_peer_multiples`, missing or zero multiples are left out of the average.
+    """
+    frame = pd.DataFrame({"industry": list(industries),
+                          **{m: np.asarray(cols[f], dtype=float) for m, f in MULTIPLE_FIELDS.items()}})
+    multiples = list(MULTIPLE_FIELDS)
+    frame[multiples] = frame[multiples].replace(0, np.nan)
+    averages = frame.groupby("industry")[multiples].transform("mean")
+    return averages.to_numpy(dtype=float).T
+
+
+def shard_bounds(n: int, n_shards: int) -> List[Tuple[int, int]]:
+    """(start, stop) of at most `n_shards` contiguous, near-equal slices of `n` tickers."""
+    edges = np.linspace(0, n, min(n, n_shards) + 1).astype(int)
+    return [(int(start), int(stop)) for start, stop in zip(edges[:-1], edges[1:])]
+
+
+def result_table(results: np.ndarray, symbols: List[str]) -> pd.DataFrame:
+    table = pd.DataFrame(results.T, index=pd.Index(symbols, name="Symbol"), columns=RESULT_FIELDS)
+    table["is_pegy"] = table["is_pegy"].astype(bool)
+    table["category"] = np.array(columnar.CATEGORIES)[table["category"].to_numpy(dtype=int)]
+    return table
+
+
+def _value_matrix(matrix: np.ndarray, workers: Optional[int], shards_per_worker: int, params: Dict) -> np.ndarray:
+    # Shards of a SHARD_FIELDS matrix valued in a process pool (in-process for one worker)
+    workers = workers or os.cpu_count() or 1
+    n = matrix.shape[1]
+    if workers == 1 or n < 2:
+        return value_shard(matrix, **params)
+    bounds = shard_bounds(n, workers * shards_per_worker)
+    shards = [np.ascontiguousarray(matrix[:, start:stop]) for start, stop in bounds]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.hstack(list(pool.map(_value_shard_task, [(shard, params) for shard in shards])))
+
+
+def _value_file(path: str, averages: np.ndarray, workers: Optional[int], shards_per_worker: int,
+                params: Dict) -> np.ndarray:
+    # Shards of a snapshot file valued in a process pool; workers map the file themselves
+    n = averages.shape[1]
+    workers = workers or os.cpu_count() or 1
+    bounds = [(0, n)]
+    if workers > 1 and n >= 2:
+        bounds = shard_bounds(n, workers * shards_per_worker)
+    tasks = [(path, start, stop, np.ascontiguousarray(averages[:, start:stop]), params) for start, stop in bounds]
+    if len(tasks) == 1:
+        return _value_file_shard_task(tasks[0])
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return np.hstack(list(pool.map(_value_file_shard_task, tasks)))
+
+
+def _cached_results(cache: Optional[ResultCache], matrix: np.ndarray, params: Dict,
+                    compute: Callable[[np.ndarray], np.ndarray]) -> np.ndarray:
+    # Result cache keyed per ticker on the RESULT_INPUTS rows, the parameters and the metric code
+    if cache is None:
+        return compute(np.arange(matrix.shape[1]))
+    rows = matrix[[SHARD_FIELDS.index(f) for f in RESULT_INPUTS]]
+    code = [code_fingerprint(module) for module in _RESULT_CODE]
+    return cached_columns(cache, "value_columns", rows, compute, params, RESULT_FIELDS, code)
+
+
+def value_universe(infos: Dict[str, Dict],
+                   workers: Optional[int] = None,
+                   shards_per_worker: int = 4,
+                   growth_rate: float = 0.0,
+                   years: int = 5,
+                   discount_rate: float = 0.10,
+                   terminal_growth: float = 0.03,
+                   cache: Optional[ResultCache] = None) -> pd.DataFrame:
+    """
+    Value a whole universe of `info` snapshots, sharded across a process pool.
+
+    Snapshots are packed into one float64 matrix and sent to the workers as contiguous column
+    blocks (one buffer per shard instead of one pickled dict per ticker). Workers return numeric
+    blocks that are concatenated back in the original order.
+    `workers=1` runs in-process; `None` uses every core. With a `cache`, only tickers whose
+    inputs (or the parameters) changed since a previous run are valued again.
+    """
+    symbols, matrix = snapshot_matrix(infos)
+    industries = [infos[s].get("industry") for s in symbols]
+    matrix = np.vstack([matrix, industry_multiples(industries, as_columns(matrix))])
+    params = {"growth_rate": growth_rate, "years": years, "discount_rate": discount_rate,
+              "terminal_growth": terminal_growth}
+
+    results = _cached_results(cache, matrix, params,
+                              lambda columns: _value_matrix(matrix[:, columns], workers, shards_per_worker, params))
+    return result_table(results, symbols)
+
+
+def value_snapshot_file(path: str,
+                        workers: Optional[int] = None,
+                        shards_per_worker: int = 4,
+                        growth_rate: float = 0.0,
+                        years: int = 5,
+                        discount_rate: float = 0.10,
+                        terminal_growth: float = 0.03,
+                        cache: Optional[ResultCache] = None) -> pd.DataFrame:
+    """
+    Same as `value_universe`, reading a snapshot file written by `write_snapshot`.
+    Every worker memory-maps the file, so the data is shared through the page cache instead of copied.
+    """
+    snapshot = SnapshotFile(path)
+    symbols = snapshot.symbols
+    averages = industry_multiples(snapshot.labels("industry"), snapshot.columns())
+    params = {"growth_rate": growth_rate, "years": years, "discount_rate": discount_rate,
+              "terminal_growth": terminal_growth}
+
+    if cache is None:
+        return result_table(_value_file(path, averages, workers, shards_per_worker, params), symbols)
+
+    cols = snapshot.columns()
+    matrix = np.vstack([cols[f] for f in SNAPSHOT_FIELDS] + [averages])
+
+    def compute(columns):
+        if len(columns) == len(symbols):
+            return _value_file(path, averages, workers, shards_per_worker, params)
+        return _value_matrix(matrix[:, columns], workers, shards_per_worker, params)
+
+    results = _cached_results(cache, matrix, params, compute)
+    return result_table(results, symbols)
@@ -0,0 +1,171 @@
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from typing import List, Dict, Iterable
+
+from src.valuation.fetch_scheduler import Priority, get_scheduler
+from src.valuation.symbols import record_fetch, skip_known_missing
+
+
+# Only the IBKR columns needed for positions are parsed, which keeps large exports cheap to read
+TRADE_COLUMNS = ["Symbol", "Buy/Sell", "Quantity", "Price", "Commission", "CurrencyPrimary"]
+
+
+# --------------------------- IBKR trades -> positions ---------------------------
+
+def _affine_scan(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """
+    x[i] = a[i] * x[i - 1] + b[i] (with x[-1] = 0) for every i, by composing the steps in
+    log2(n) vectorized passes (Hillis-Steele scan) instead of one Python step per row.
+    """
+    a, b = a.astype(float), b.astype(float)
+    k = 1
+    while k < len(a) and a[k:].any():
+        b[k:] = a[k:] * b[:-k] + b[k:]
+        a[k:] = a[k:] * a[:-k]
+        k *= 2
+    return b
+
+
+def average_cost_steps(positions: np.ndarray, quantities: np.ndarray, prices: np.ndarray) -> np.ndarray:
+    """
+    Running cost basis of signed trades, average-cost method: trades adding to the position add their
+    value, trades reducing it take out their share of the cost at the current average, and a trade
+    flipping the position starts over at its price. `positions` is the position after each trade;
+    a trade from a flat position (the first of each symbol) starts over, so several symbols can be
+    scanned at once when their rows are contiguous.
+    """
+    before = positions - quantities
+    adds = (before == 0) | ((before > 0) == (quantities > 0))
+    reduces = ~adds & (np.abs(quantities) <= np.abs(before))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        a = np.where(reduces, positions / before, np.where(adds & (before != 0), 1.0, 0.0))
+    b = np.where(adds, quantities * prices, np.where(reduces, 0.0, positions * prices))
+    return _affine_scan(a, b)
+
+
+def average_cost_basis(quantities: np.ndarray, prices: np.ndarray) -> float:
+    """Cost of what is left after a symbol's signed trades (in file order), see average_cost_steps."""
+    quantities = np.asarray(quantities, dtype=float)
+    if not len(quantities):
+        return 0.0
+    return float(average_cost_steps(np.cumsum(quantities), quantities, np.asarray(prices, dtype=float))[-1])
+
+
+def load_ibkr_trades(path: str) -> pd.DataFrame:
+    """Read the IBKR trade export (same file as the Yahoo converter) with typed columns."""
+    trades = pd.read_csv(
+        path,
+        usecols=lambda column: column in TRADE_COLUMNS,
+        dtype={"Symbol": "category", "Buy/Sell": "category", "CurrencyPrimary": "category"},
+    )
+    for column in ("Quantity", "Price", "Commission"):
+        if column in trades:
+            trades[column] = pd.to_numeric(trades[column], errors="coerce").fillna(0.0)
+    return trades
+
+
+def aggregate_positions(trades: pd.DataFrame, include_closed: bool = False) -> pd.DataFrame:
+    """
+    Net positions per symbol computed with a single groupby.
+
+    IBKR reports sells either with a negative quantity or with "SELL" in `Buy/Sell`,
+    so the sign is taken from `Buy/Sell` and applied to the absolute quantity.
+    Returned columns (indexed by Symbol): net_quantity; net_cost, the net cash spent; cost_basis,
+    the cost of the shares still held (see average_cost_steps); commission; trades; avg_cost,
+    cost_basis per share held.
+    """
+    # String work happens once per distinct value on the categories, not once per row
+    side = trades["Buy/Sell"].astype("category")
+    is_sell = np.asarray(side.cat.categories.astype(str).str.upper().str.strip() == "SELL")
+    codes = side.cat.codes.to_numpy()
+    sell = np.where(codes >= 0, is_sell[codes], False)
+    signed_qty = np.where(sell, -1.0, 1.0) * trades["Quantity"].abs().to_numpy()
+
+    symbols = trades["Symbol"].astype("category")
+    symbols = symbols.cat.rename_categories(symbols.cat.categories.astype(str).str.strip())
+
+    frame = pd.DataFrame({
+        "Symbol": symbols,
+        "net_quantity": signed_qty,
+        "net_cost": signed_qty * trades["Price"].to_numpy(),
+        "commission": trades["Commission"].abs().to_numpy() if "Commission" in trades else 0.0,
+    })
+    if "CurrencyPrimary" in trades:
+        frame["currency"] = trades["CurrencyPrimary"]
+
+    # Only the cost basis depends on trade order: one scan over the rows grouped by symbol
+    order = np.argsort(symbols.cat.codes.to_numpy(), kind="stable")
+    positions_after = frame.groupby("Symbol", sort=False, observed=True)["net_quantity"].cumsum().to_numpy()
+    # Rows without a symbol are left out of the positions; each one counts as its own trade here
+    positions_after = np.where(np.isnan(positions_after), signed_qty, positions_after)
+    running_cost = np.empty(len(frame))
+    running_cost[order] = average_cost_steps(positions_after[order], signed_qty[order],
+                                             trades["Price"].to_numpy(dtype=float)[order])
+    frame["cost_basis"] = running_cost
+
+    aggregations = {
+        "net_quantity": ("net_quantity", "sum"),
+        "net_cost": ("net_cost", "sum"),
+        "commission": ("commission", "sum"),
+        "trades": ("net_quantity", "size"),
+        "cost_basis": ("cost_basis", "last"),
+    }
+    if "currency" in frame:
+        aggregations["currency"] = ("currency", "last")
+    positions = frame.groupby("Symbol", sort=True, observed=True).agg(**aggregations)
+    positions.index = positions.index.astype(str)
+
+    if not include_closed:
+        positions = positions[~np.isclose(positions["net_quantity"], 0.0)]
+    held = positions["net_quantity"].to_numpy() != 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        positions["avg_cost"] = np.where(held, positions["cost_basis"] / positions["net_quantity"], np.nan)
+    return positions
+
+
+# --------------------------- Batched data fetch ---------------------------------
+
+def fetch_infos(symbols: Iterable[str], priority: Priority = Priority.PEER) -> Dict[str, Dict]:
+    """
+    Fetch `info` once per distinct symbol through the shared scheduler. Failed lookups, and symbols
+    the negative cache knows to be missing (not fetched at all), map to an empty dict.
+    """
+    unique = sorted(set(symbols))
+    wanted, skipped = skip_known_missing(unique)
+    infos, failures = get_scheduler().fetch_infos(wanted, priority)
+    for symbol in wanted:
+        record_fetch(symbol, infos.get(symbol), failures.get(symbol))
+    for symbol, reason in failures.items():
+        print(f"⚠️ Could not fetch data for {symbol}: {reason}")
+    if skipped:
+        print(f"⏭️ Skipped {len(skipped)} symbols known to be missing on Yahoo")
+    return {symbol: infos.get(symbol, {}) for symbol in unique}
+
+
+def fetch_last_prices(symbols: Iterable[str]) -> Dict[str, float]:
+    """Last close for every symbol, downloaded in one request."""
+    unique = sorted(set(symbols))
+    if not unique:
+        return {}
+    history = get_scheduler().call(
+        "prices", lambda: yf.download(unique, period="5d", progress=False, auto_adjust=False, group_by="column"),
+        Priority.PEER)
+    if history is None or history.empty:
+        return {}
+    closes = history["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(unique[0])
+    last = closes.ffill().iloc[-1]
+    return {symbol: float(price) for symbol, price in last.items() if pd.notna(price)}
+
+
+def info_frame(infos: Dict[str, Dict], fields: List[str]) -> pd.DataFrame:
+    """Columnar view of selected numeric `info` fields (missing or non-numeric values become NaN)."""
+    frame = pd.DataFrame.from_dict(
+        {symbol: {field: info.get(field) for field in fields} for symbol, info in infos.items()},
+        orient="index",
+        columns=fields,
+    )
+    return frame.apply(pd.to_numeric, errors="coerce")
@@ -0,0 +1,122 @@
+import collections
+import threading
+import time
+
+from typing import Iterable, List, Optional
+
+from src.valuation.fetch_scheduler import FetchError, TokenBucket
+from src.valuation.ticker_handle import HANDLE_TTL, cached_handle, handle_expires_in, refresh_handle
+from src.valuation.yfinance_api import suggest_multiple_peers
+
+# Data refreshed for every watched ticker; anything else a handle has loaded is refreshed too
+BASE_ATTRIBUTES = ("info",)
+# Smallest burst of the request budget: enough to refresh a handle with every attribute loaded
+MIN_BURST = 5
+
+
+# --------------------------- Refresh-ahead prefetcher ---------------------------
+
+class Prefetcher:
+    """
+    Keeps the shared ticker handles of a watchlist warm.
+
+    A worker thread refreshes each watched ticker `refresh_ahead` seconds before its handle
+    expires (tickers never loaded are fetched first), at BACKGROUND priority so interactive
+    requests are always scheduled ahead of it, and never above `budget` requests per minute.
+    With `include_peers`, the `suggest_multiple_peers` peers of each ticker join the watchlist
+    once its industry is known.
+
+        prefetcher = Prefetcher(["AAPL", "MSFT"]).start()
+        ...
+        prefetcher.stop()
+    """
+
+    def __init__(self,
+                 symbols: Iterable[str],
+                 include_peers: bool = True,
+                 refresh_ahead: float = 120.0,
+                 budget: float = 60.0,
+                 interval: float = 5.0):
+        if refresh_ahead >= HANDLE_TTL:
+            raise ValueError("refresh_ahead must be shorter than the handle TTL.")
+        self.watchlist: List[str] = list(dict.fromkeys(s.upper() for s in symbols))
+        self.include_peers = include_peers
+        self.refresh_ahead = refresh_ahead
+        self.interval = interval
+        self.budget = TokenBucket(budget / 60.0, max(MIN_BURST, int(budget)))
+        self.stats = collections.Counter()
+        self.failures = {}
+        self._expanded = set()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def watch(self, symbols: Iterable[str]) -> None:
+        for symbol in symbols:
+            if symbol not in self.watchlist:
+                self.watchlist.append(symbol)
+
+    def due(self) -> List[str]:
+        """Watched tickers to refresh now, the ones never loaded or closest to expiry first."""
+        remaining = {s: handle_expires_in(s) for s in self.watchlist}
+        due = [s for s, left in remaining.items() if left is None or left <= self.refresh_ahead]
+        return sorted(due, key=lambda s: -float("inf") if remaining[s] is None else remaining[s])
+
+    def run_once(self) -> int:
+        """Refresh the tickers that are due, as far as the request budget allows; returns how many."""
+        refreshed = 0
+        for symbol in self.due():
+            if self._stop.is_set():
+                break
+            current = cached_handle(symbol)
+            attributes = list(dict.fromkeys(BASE_ATTRIBUTES + tuple(
+                current.downloads if current is not None else ())))
+            if not self.budget.try_acquire(len(attributes)):
+                self.stats["over_budget"] += 1
+                break
+            try:
+                handle = refresh_handle(symbol, attributes)
+            except FetchError as e:
+                self.failures[symbol] = e.reason
+                self.stats["failed"] += 1
+                continue
+            self.failures.pop(symbol, None)
+            self.stats["refreshed"] += 1
+            self.stats["requests"] += len(attributes)
+            refreshed += 1
+            self._expand(symbol, handle.info)
+        return refreshed
+
+    def _expand(self, symbol: str, info: dict) -> None:
+        if not self.include_peers or symbol in self._expanded:
+            return
+        self._expanded.add(symbol)
+        industry = info.get("industry")
+        if industry:
+            self.watch(suggest_multiple_peers(industry, exclude=symbol))
+
+    # -- worker thread ------------------------------------------------------------
+
+    def start(self) -> "Prefetcher":
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="prefetcher", daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            started = time.monotonic()
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"⚠️ Prefetch round failed: {e}")
+            self._stop.wait(max(0.0, self.interval - (time.monotonic() - started)))
@@ -0,0 +1,349 @@
+import datetime
+import os
+import threading
+import numpy as np
+import pandas as pd
+import yfinance as yf
+
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from src.valuation.data_dir import data_path
+from src.valuation.fetch_scheduler import Priority, get_scheduler
+
+history_dir = 'price_history'
+# One fixed-size record per trading day; `date` is days since 1970-01-01
+OHLCV_DTYPE = np.dtype([("date", "<i8"), ("open", "<f8"), ("high", "<f8"), ("low", "<f8"), ("close", "<f8"),
+                        ("adj_close", "<f8"), ("volume", "<f8")])
+_YAHOO_COLUMNS = {"open": "Open", "high": "High", "low": "Low", "close": "Close", "adj_close": "Adj Close",
+                  "volume": "Volume"}
+# History downloaded for a ticker seen for the first time
+INITIAL_YEARS = 5
+TRADING_DAYS = 252
+# Fewer overlapping returns than this give no beta
+MIN_OBSERVATIONS = 20
+
+# Market index each ticker's beta is measured against, by Yahoo suffix
+DEFAULT_INDEX = "^GSPC"
+SUFFIX_INDEXES = {
+    ".DE": "^GDAXI",
+    ".L": "^FTSE",
+}
+
+
+def benchmark_for(symbol: str) -> str:
+    for suffix, index in SUFFIX_INDEXES.items():
+        if symbol.upper().endswith(suffix.upper()):
+            return index
+    return DEFAULT_INDEX
+
+
+def _day_number(date: datetime.date) -> int:
+    return int(np.datetime64(date, "D").astype(np.int64))
+
+
+def _day(number: int) -> datetime.date:
+    return np.datetime64(int(number), "D").astype(datetime.date)
+
+
+# --------------------------- Download -------------------------------------------
+
+def download_history(symbols: Sequence[str], start: datetime.date) -> Dict[str, pd.DataFrame]:
+    """Daily OHLCV of every symbol since `start`, in one request (columns named like Yahoo's)."""
+    history = get_scheduler().call(
+        f"history {','.join(symbols)}", lambda: yf.download(list(symbols), start=start, progress=False, auto_adjust=False,
+                                       actions=False, group_by="ticker"),
+        Priority.PEER)
+    if history is None or history.empty:
+        return {}
+    if not isinstance(history.columns, pd.MultiIndex):
+        return {symbols[0]: history}
+    tickers = history.columns.get_level_values(0).unique()
+    return {symbol: history[symbol].dropna(how="all") for symbol in symbols if symbol in tickers}
+
+
+# --------------------------- Store ----------------------------------------------
+
+class PriceHistory:
+    """
+    Daily OHLCV per ticker in `directory`, one raw file of OHLCV_DTYPE records per symbol.
+
+    Records are only ever appended (rows newer than the last stored day), so an update costs
+    one small download per day; reading is a single `np.fromfile` of fixed-size records.
+    """
+
+    def __init__(self, directory: Optional[str] = None,
+                 fetch: Callable[[Sequence[str], datetime.date], Dict[str, pd.DataFrame]] = download_history):
+        self.directory = directory or data_path(history_dir)
+        self.fetch = fetch
+        self._lock = threading.Lock()
+
+    def path(self, symbol: str) -> str:
+        # "^GSPC" and "BRK/B" style symbols are kept readable but file-system safe
+        name = symbol.upper().replace("/", "_").replace("\\", "_")
+        return os.path.join(self.directory, f"{name}.ohlcv")
+
+    def symbols(self) -> List[str]:
+        if not os.path.isdir(self.directory):
+            return []
+        return sorted(os.path.splitext(name)[0] for name in os.listdir(self.directory) if name.endswith(".ohlcv"))
+
+    def read(self, symbol: str, start: Optional[datetime.date] = None,
+             end: Optional[datetime.date] = None) -> np.ndarray:
+        """Stored records of `symbol` (oldest first), optionally limited to [start, end]."""
+        path = self.path(symbol)
+        if not os.path.exists(path):
+            return np.empty(0, dtype=OHLCV_DTYPE)
+        records = np.fromfile(path, dtype=OHLCV_DTYPE)
+        lo = 0 if start is None else np.searchsorted(records["date"], _day_number(start), side="left")
+        hi = len(records) if end is None else np.searchsorted(records["date"], _day_number(end), side="right")
+        return records[lo:hi]
+
+    def last_date(self, symbol: str) -> Optional[datetime.date]:
+        """Day of the last stored record, reading only that record."""
+        path = self.path(symbol)
+        size = os.path.getsize(path) if os.path.exists(path) else 0
+        if size < OHLCV_DTYPE.itemsize:
+            return None
+        with open(path, "rb") as f:
+            f.seek(size - size % OHLCV_DTYPE.itemsize - OHLCV_DTYPE.itemsize)
+            record = np.frombuffer(f.read(OHLCV_DTYPE.itemsize), dtype=OHLCV_DTYPE)
+        return _day(record["date"][0])
+
+    def append(self, symbol: str, frame: pd.DataFrame) -> int:
+        """Append the rows of a Yahoo-style OHLCV frame newer than the stored ones; returns how many."""
+        if frame is None or frame.empty:
+            return 0
+        days = pd.DatetimeIndex(frame.index).tz_localize(None).normalize()
+        records = np.zeros(len(frame), dtype=OHLCV_DTYPE)
+        records["date"] = days.to_numpy(dtype="datetime64[D]").astype(np.int64)
+        for field, column in _YAHOO_COLUMNS.items():
+            records[field] = frame[column].to_numpy(dtype=float) if column in frame else np.nan
+        records = records[~np.isnan(records["close"])]
+
+        with self._lock:
+            last = self.last_date(symbol)
+            if last is not None:
+                records = records[records["date"] > _day_number(last)]
+            # Keep one record per day, in order
+            records = records[np.sort(np.unique(records["date"], return_index=True)[1])]
+            if len(records):
+                # The directory only appears once there is something to store
+                os.makedirs(self.directory, exist_ok=True)
+                with open(self.path(symbol), "ab") as f:
+                    f.write(records.tobytes())
+        return len(records)
+
+    def update(self, symbols: Iterable[str], today: Optional[datetime.date] = None) -> Dict[str, int]:
+        """
+        Bring every symbol up to date: one download from the oldest last-stored day
+        (INITIAL_YEARS back for new symbols). Returns the number of new records per symbol.
+        """
+        today = today or datetime.date.today()
+        symbols = sorted({s.upper() for s in symbols})
+        starts = {s: self.last_date(s) for s in symbols}
+        due = [s for s in symbols if starts[s] is None or starts[s] < today]
+        if not due:
+            return {s: 0 for s in symbols}
+        initial = today - datetime.timedelta(days=365 * INITIAL_YEARS)
+        start = min(initial if starts[s] is None else starts[s] + datetime.timedelta(days=1) for s in due)
+        frames = self.fetch(due, start)
+        return {s: self.append(s, frames[s]) if s in frames else 0 for s in symbols}
+
+    def panel(self, symbols: Sequence[str], field: str = "adj_close",
+              start: Optional[datetime.date] = None,
+              end: Optional[datetime.date] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        One field of several tickers aligned on the union of their trading days:
+        (dates as datetime64[D], matrix of shape (days, tickers) with NaN where a ticker has no record).
+        """
+        histories = [self.read(s, start, end) for s in symbols]
+        days = np.unique(np.concatenate([h["date"] for h in histories])) if histories else np.empty(0, np.int64)
+        matrix = np.full((len(days), len(symbols)), np.nan)
+        for j, history in enumerate(histories):
+            matrix[np.searchsorted(days, history["date"]), j] = history[field]
+        return days.astype("datetime64[D]"), matrix
+
+
+_default_history: Optional[PriceHistory] = None
+_default_lock = threading.Lock()
+
+
+def get_price_history() -> PriceHistory:
+    """Process-wide store (price_history/ in the working directory)."""
+    global _default_history
+    with _default_lock:
+        if _default_history is None:
+            _default_history = PriceHistory()
+        return _default_history
+
+
+# --------------------------- Vectorized analytics -------------------------------
+# Every function takes a (days x tickers) matrix, oldest day first, NaN where there is no price.
+
+def forward_fill(prices: np.ndarray) -> np.ndarray:
+    """Carry the last known price over gaps (holidays of one market); leading NaNs stay."""
+    prices = np.asarray(prices, dtype=float)
+    rows = np.where(np.isnan(prices), 0, np.arange(len(prices))[:, None])
+    np.maximum.accumulate(rows, axis=0, out=rows)
+    filled = prices[rows, np.arange(prices.shape[1])]
+    return filled
+
+
+def log_returns(prices: np.ndarray) -> np.ndarray:
+    """Daily log returns, one row shorter than `prices`; NaN until a ticker's first two prices."""
+    filled = forward_fill(prices)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return np.diff(np.log(filled), axis=0)
+
+
+def trailing_return(prices: np.ndarray, days: int = TRADING_DAYS) -> np.ndarray:
+    """Simple return over the last `days` rows, per ticker (NaN without a price that far back)."""
+    filled = forward_fill(prices)
+    if len(filled) <= days:
+        return np.full(filled.shape[1], np.nan)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return filled[-1] / filled[-1 - days] - 1
+
+
+def _rolling_sums(values: np.ndarray, valid: np.ndarray, window: int) -> np.ndarray:
+    # Sum over each trailing window (rows window-1 ... end), from one cumulative sum
+    totals = np.cumsum(np.where(valid, values, 0.0), axis=0)
+    totals = np.vstack([np.zeros((1,) + totals.shape[1:]), totals])
+    return totals[window:] - totals[:-window]
+
+
+def _pad(rolled: np.ndarray, length: int) -> np.ndarray:
+    return np.vstack([np.full((length - len(rolled),) + rolled.shape[1:], np.nan), rolled])
+
+
+def rolling_volatility(returns: np.ndarray, window: int = 21, periods: int = TRADING_DAYS) -> np.ndarray:
+    """
+    Annualised standard deviation of each trailing `window` of returns, same shape as `returns`
+    (NaN where the window has fewer than two returns).
+    """
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) < window:
+        return np.full(returns.shape, np.nan)
+    valid = ~np.isnan(returns)
+    n = _rolling_sums(np.ones_like(returns), valid, window)
+    s1 = _rolling_sums(returns, valid, window)
+    s2 = _rolling_sums(returns ** 2, valid, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        variance = np.where(n > 1, (s2 - s1 ** 2 / n) / (n - 1), np.nan)
+    return _pad(np.sqrt(np.maximum(variance, 0.0) * periods), len(returns))
+
+
+def max_drawdown(prices: np.ndarray) -> np.ndarray:
+    """Largest peak-to-trough fall per ticker, as a negative fraction (0 when prices never fell)."""
+    filled = forward_fill(prices)
+    peaks = np.fmax.accumulate(filled, axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        drawdowns = filled / peaks - 1
+    return np.where(np.all(np.isnan(filled), axis=0), np.nan, np.nanmin(np.where(np.isnan(drawdowns), 0.0,
+                                                                                  drawdowns), axis=0))
+
+
+def beta(returns: np.ndarray, index_returns: np.ndarray) -> np.ndarray:
+    """
+    Beta of every ticker against the index over the days where both have a return
+    (cov(r, m) / var(m)); NaN with fewer than MIN_OBSERVATIONS common days.
+    """
+    returns = np.asarray(returns, dtype=float)
+    market = np.asarray(index_returns, dtype=float).reshape(-1, 1)
+    valid = ~np.isnan(returns) & ~np.isnan(market)
+    n = valid.sum(axis=0)
+    r = np.where(valid, returns, 0.0)
+    m = np.where(valid, market, 0.0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        r_mean = r.sum(axis=0) / n
+        m_mean = m.sum(axis=0) / n
+        dm = np.where(valid, m - m_mean, 0.0)
+        covariance = (np.where(valid, r - r_mean, 0.0) * dm).sum(axis=0)
+        variance = (dm ** 2).sum(axis=0)
+        return np.where((n >= MIN_OBSERVATIONS) & (variance > 0), covariance / variance, np.nan)
+
+
+def rolling_beta(returns: np.ndarray, index_returns: np.ndarray, window: int = 126) -> np.ndarray:
+    """Beta over each trailing `window` of days, same shape as `returns`."""
+    returns = np.asarray(returns, dtype=float)
+    if len(returns) < window:
+        return np.full(returns.shape, np.nan)
+    market = np.broadcast_to(np.asarray(index_returns, dtype=float).reshape(-1, 1), returns.shape)
+    valid = ~np.isnan(returns) & ~np.isnan(market)
+    n = _rolling_sums(np.ones_like(returns), valid, window)
+    sr, sm = _rolling_sums(returns, valid, window), _rolling_sums(market, valid, window)
+    srm, smm = _rolling_sums(returns * market, valid, window), _rolling_sums(market ** 2, valid, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        covariance = srm - sr * sm / n
+        variance = smm - sm ** 2 / n
+        rolled = np.where((n >= MIN_OBSERVATIONS) & (variance > 0), covariance / variance, np.nan)
+    return _pad(rolled, len(returns))
+
+
+def history_metrics(prices: np.ndarray, index_prices: np.ndarray, days: int = TRADING_DAYS,
+                    volatility_window: int = 21) -> Dict[str, np.ndarray]:
+    """
+    Per-ticker summary over the last `days` rows of an aligned panel: trailing return, annualised
+    volatility (full window and latest `volatility_window`), max drawdown and beta against the index.
+    """
+    prices = np.asarray(prices, dtype=float)[-(days + 1):]
+    index_prices = np.asarray(index_prices, dtype=float)[-(days + 1):]
+    returns = log_returns(prices)
+    market = log_returns(index_prices.reshape(-1, 1))[:, 0]
+    valid = ~np.isnan(returns)
+    n = valid.sum(axis=0)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        mean = np.where(valid, returns, 0.0).sum(axis=0) / n
+        squares = (np.where(valid, returns - mean, 0.0) ** 2).sum(axis=0)
+        volatility = np.where(n > 1, np.sqrt(squares / (n - 1) * TRADING_DAYS), np.nan)
+    recent = rolling_volatility(returns, volatility_window)
+    return {
+        "return": trailing_return(prices, min(days, len(prices) - 1)) if len(prices) > 1
+        else np.full(prices.shape[1], np.nan),
+        "volatility": volatility,
+        "recent_volatility": recent[-1] if len(recent) else np.full(prices.shape[1], np.nan),
+        "max_drawdown": max_drawdown(prices),
+        "beta": beta(returns, market),
+    }
+
+
+def universe_metrics(symbols: Sequence[str], store: Optional[PriceHistory] = None,
+                     days: int = TRADING_DAYS) -> pd.DataFrame:
+    """`history_metrics` of stored tickers, each against its benchmark_for index, as a table."""
+    store = store or get_price_history()
+    symbols = [s.upper() for s in symbols]
+    table = pd.DataFrame(index=pd.Index(symbols, name="Symbol"),
+                         columns=["return", "volatility", "recent_volatility", "max_drawdown", "beta"], dtype=float)
+    groups: Dict[str, List[str]] = {}
+    for symbol in symbols:
+        groups.setdefault(benchmark_for(symbol), []).append(symbol)
+    for index, members in groups.items():
+        _, matrix = store.panel(members + [index])
+        if not len(matrix):
+            continue
+        for name, values in history_metrics(matrix[:, :-1], matrix[:, -1], days).items():
+            table.loc[members, name] = values
+    return table
+
+
+def measured_beta(symbol: str, store: Optional[PriceHistory] = None, update: bool = False,
+                  days: int = TRADING_DAYS) -> Optional[float]:
+    """Beta of `symbol` against its benchmark from stored history (brought up to date first with `update`)."""
+    store = store or get_price_history()
+    if update:
+        store.update([symbol, benchmark_for(symbol)])
+    value = universe_metrics([symbol], store, days)["beta"].iloc[0]
+    return None if np.isnan(value) else float(value)
+
+
+def with_measured_beta(infos: Dict[str, Dict], store: Optional[PriceHistory] = None) -> Dict[str, Dict]:
+    """
+    Copies of `info` dicts whose `beta` is replaced by the one measured from stored history
+    (Yahoo's value is kept where there is not enough local history).
+    """
+    measured = universe_metrics(list(infos), store)["beta"]
+    result = {}
+    for symbol, info in infos.items():
+        value = measured.get(symbol.upper())
+        result[symbol] = info if value is None or np.isnan(value) else {**info, "beta": float(value)}
+    return result
@@ -0,0 +1,140 @@
+import collections
+import contextlib
+import cProfile
+import datetime
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+from typing import Counter, Dict, List, Optional
+
+# Profiling is switched on with `python main.py --profile` or VALUATION_PROFILE=1
+PROFILE_FLAG = "--profile"
+PROFILE_ENV = "VALUATION_PROFILE"
+PROFILE_DIR_ENV = "VALUATION_PROFILE_DIR"
+DEFAULT_DIR = "profiles"
+SAMPLE_INTERVAL = 0.005
+TOP_N = 25
+
+
+def profiling_enabled(argv: Optional[List[str]] = None) -> bool:
+    argv = sys.argv[1:] if argv is None else argv
+    return PROFILE_FLAG in argv or os.environ.get(PROFILE_ENV, "").lower() in ("1", "true", "yes", "on")
+
+
+# --------------------------- Stack sampler --------------------------------------
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    module = os.path.splitext(os.path.basename(code.co_filename))[0]
+    return f"{module}:{code.co_name}"
+
+
+class StackSampler:
+    """
+    Samples the Python stack of every thread each `interval` seconds, counting identical stacks.
+    The counts are what flamegraph tools read as collapsed stacks ("thread;outer;…;inner count").
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.interval = interval
+        self.stacks: Counter[str] = collections.Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        names: Dict[int, str] = {}
+        while not self._stop.wait(self.interval):
+            if len(names) != threading.active_count():
+                names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                self.stacks[";".join(reversed(labels))] += 1
+            self.samples += 1
+
+    def collapsed(self) -> str:
+        return "".join(f"{stack} {count}\n" for stack, count in self.stacks.most_common())
+
+
+# --------------------------- Per-action profile ---------------------------------
+
+def _format_bytes(size: float) -> str:
+    for unit in ("B", "KiB", "MiB", "GiB"):
+        if abs(size) < 1024 or unit == "GiB":
+            return f"{size:,.1f} {unit}"
+        size /= 1024
+
+
+@contextlib.contextmanager
+def profile_action(name: str, directory: Optional[str] = None, top: int = TOP_N):
+    """
+    Run the body under cProfile, a stack sampler and tracemalloc, then write to `directory`:
+      <name>-<time>.collapsed  sampled stacks for flamegraph.pl / speedscope / inferno
+      <name>-<time>.txt        wall time, peak memory, top-N functions and top allocation sites
+      <name>-<time>.pstats     raw cProfile data (snakeviz, pstats)
+    A summary is printed when the action ends, also if it was interrupted.
+    """
+    directory = directory or os.environ.get(PROFILE_DIR_ENV, DEFAULT_DIR)
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, f"{name}-{datetime.datetime.now():%Y%m%d-%H%M%S}")
+
+    tracing = tracemalloc.is_tracing()
+    if not tracing:
+        tracemalloc.start()
+    tracemalloc.reset_peak()
+    sampler = StackSampler()
+    profiler = cProfile.Profile()
+    started = time.perf_counter()
+    sampler.start()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        elapsed = time.perf_counter() - started
+        sampler.stop()
+        current, peak = tracemalloc.get_traced_memory()
+        allocations = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        if not tracing:
+            tracemalloc.stop()
+
+        stats_text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=stats_text)
+        stats.sort_stats("cumulative").print_stats(top)
+        stats.dump_stats(f"{base}.pstats")
+
+        with open(f"{base}.collapsed", "w") as f:
+            f.write(sampler.collapsed())
+        with open(f"{base}.txt", "w") as f:
+            f.write(f"Action: {name}\n")
+            f.write(f"Wall time: {elapsed:.3f} s ({sampler.samples} stack samples)\n")
+            f.write(f"Peak traced memory: {_format_bytes(peak)} (still allocated: {_format_bytes(current)})\n\n")
+            f.write("Top allocation sites:\n")
+            for stat in allocations:
+                f.write(f"  {_format_bytes(stat.size):>12}  {stat.count:>8} blocks  {stat.traceback}\n")
+            f.write(f"\nTop {top} functions by cumulative time:\n")
+            f.write(stats_text.getvalue())
+
+        print(f"\n⏱️ {name}: {elapsed:.2f} s, peak memory {_format_bytes(peak)}")
+        print(f"📄 Profile written to {base}.txt (flamegraph stacks: {base}.collapsed)")
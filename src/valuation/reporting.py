@@ -1,8 +1,46 @@
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 import datetime
 # --------------------------- Reporting ------------------------------------------
 from src.valuation.utility_helpers import fmt_money, fmt_price
 
+# Sensitivity table rows: (label, greek, key of the current input, step, step label)
+SENSITIVITY_STEPS = [
+    ("Growth rate", "d_growth", "growth_rate", 0.01, "+1pp"),
+    ("Discount rate", "d_discount_rate", "discount_rate", 0.01, "+1pp"),
+    ("Terminal growth", "d_terminal_growth", "terminal_growth", 0.01, "+1pp"),
+    ("Base FCF", "d_fcf", "fcf", None, "+1%"),
+]
+
+
+def sensitivity_lines(sensitivity: Dict) -> List[str]:
+    """
+    Table of first-order changes of intrinsic value per share for a small step in each DCF input,
+    from the analytic derivatives of `dcf_sensitivity`.
+    """
+    value = sensitivity["intrinsic_per_share"]
+    lines = [f"{'Input':<16}{'Current':>18}{'Step':>7}{'Impact':>12}{'New value':>12}{'dV/dx':>16}"]
+    for label, greek, key, step, step_label in SENSITIVITY_STEPS:
+        current = sensitivity.get(key)
+        if current is None:
+            continue
+        # FCF is scaled by 1%, so its step is relative to the current value
+        impact = sensitivity[greek] * (current * 0.01 if step is None else step)
+        shown = fmt_money(current) if step is None else f"{current:.2%}"
+        sign = "-" if impact < 0 else "+"
+        lines.append(f"{label:<16}{shown:>18}{step_label:>7}{sign + fmt_price(abs(impact)):>12}"
+                     f"{fmt_price(value + impact):>12}{sensitivity[greek]:>16.4g}")
+    return lines
+
+
+def comps_progress_line(progress) -> str:
+    """One line of a progressive comparable valuation (a `CompsProgress`): peers so far and implied prices."""
+    head = f"[{progress.peers}/{progress.total} peers, {progress.elapsed:4.1f}s]"
+    if not progress.implied:
+        return f"{head} waiting for usable multiples …"
+    parts = [f"{m} {fmt_price(p)} (avg {progress.averages[m]:.2f}, n={progress.counts[m]})"
+             for m, p in progress.implied.items()]
+    return f"{head} " + " · ".join(parts)
+
 
 def export_report(filename: str,
                   symbol: str,
@@ -11,7 +49,9 @@ def export_report(filename: str,
                   dcf: Optional[Dict],
                   comps: Dict[str, float],
                   avg_multiples: Dict[str, float],
-                  rule_of_40: dict):
+                  rule_of_40: dict,
+                  sensitivity: Optional[Dict] = None,
+                  comps_peers: Optional[Dict] = None):
     lines = []
     lines.append("Valuation Report – " + symbol.upper())
     lines.append("Date: " + datetime.date.today().isoformat())
@@ -32,6 +72,11 @@ def export_report(filename: str,
 
     # DCF
     lines.append("Discounted Cash‑Flow (DCF)")
+    if dcf and "pv_high_growth" in dcf:
+        lines.append(f"Model: multi-stage – {dcf['high_years']}y at {dcf['high_growth']:.2%}, "
+                     f"{dcf['fade_years']}y linear fade, then terminal growth")
+        lines.append(f"PV of high-growth FCFs: {fmt_money(dcf['pv_high_growth'])}")
+        lines.append(f"PV of fade FCFs: {fmt_money(dcf['pv_fade'])}")
     if dcf:
         lines.append(f"PV of forecast FCFs: {fmt_money(dcf['pv_fcfs'])}")
         lines.append(f"PV of terminal value: {fmt_money(dcf['pv_terminal'])}")
@@ -41,11 +86,23 @@ def export_report(filename: str,
         lines.append("DCF: N/A (missing data)")
     lines.append("")
 
+    # DCF sensitivity
+    if dcf and sensitivity:
+        lines.append("DCF sensitivity (first-order change of intrinsic value per share)")
+        lines.extend(sensitivity_lines(sensitivity))
+        lines.append("")
+
     # Comps
     lines.append("Comparable Company Analysis (Comps)")
     if comps:
+        counts = (comps_peers or {}).get("counts", {})
         for m, pv in comps.items():
-            lines.append(f"Implied price by {m}: {fmt_price(pv)} (avg multiple {avg_multiples[m]:.2f})")
+            peers = f", {counts[m]} peers" if m in counts else ""
+            lines.append(f"Implied price by {m}: {fmt_price(pv)} (avg multiple {avg_multiples[m]:.2f}{peers})")
+        if comps_peers:
+            late = comps_peers.get("late") or []
+            lines.append(f"Peers answered: {comps_peers['peers']} of {comps_peers['total']}"
+                         + (f" ({len(late)} dropped at the deadline: {', '.join(late)})" if late else ""))
     else:
         lines.append("Comps: N/A (missing or insufficient data)")
     lines.append("")
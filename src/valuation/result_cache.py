@@ -0,0 +1,240 @@
+import functools
+import hashlib
+import inspect
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import numpy as np
+
+from collections import Counter
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+
+from src.valuation.data_dir import data_path
+
+results_db = 'valuation_results.db'
+# Memoization is opt-in: VALUATION_RESULT_CACHE=on uses valuation_results.db in the data directory,
+# VALUATION_RESULT_CACHE=<path> another file
+RESULT_CACHE_ENV = "VALUATION_RESULT_CACHE"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key     TEXT PRIMARY KEY,
+    name    TEXT NOT NULL,
+    created REAL NOT NULL,
+    value   BLOB NOT NULL
+);
+"""
+# SQLite limit on host parameters per statement is 999 on older builds
+_BATCH = 900
+
+
+# --------------------------- Keys -----------------------------------------------
+
+def _canonical(value: Any) -> Any:
+    # JSON-friendly form with a stable ordering; NaN and numpy scalars normalised
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple)):
+        return [_canonical(v) for v in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if isinstance(value, float) and value != value:
+        return "NaN"
+    return value
+
+
+def content_key(*parts: Any) -> str:
+    """SHA-256 of the canonical JSON of `parts`: equal inputs give equal keys across runs and machines."""
+    payload = json.dumps(_canonical(list(parts)), separators=(",", ":"), sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+@functools.lru_cache(maxsize=None)
+def code_fingerprint(module_name: str) -> str:
+    """Hash of a module's source; keys include those of the modules a result depends on."""
+    try:
+        source = inspect.getsource(sys.modules[module_name])
+    except (KeyError, OSError, TypeError):
+        return module_name
+    return hashlib.sha256(source.encode("utf-8")).hexdigest()[:16]
+
+
+def column_keys(rows: np.ndarray, *parts: Any) -> List[str]:
+    """One key per column of a (fields x tickers) float matrix, combined with `parts` (parameters, code)."""
+    salt = content_key(*parts).encode("ascii")
+    values = np.ascontiguousarray(np.asarray(rows, dtype=np.float64).T)
+    # A single NaN bit pattern, so every missing value hashes the same
+    values[np.isnan(values)] = np.nan
+    return [hashlib.sha256(salt + row.tobytes()).hexdigest() for row in values]
+
+
+# --------------------------- Values ---------------------------------------------
+
+def _json_default(value: Any) -> Any:
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _dump(value: Any) -> bytes:
+    # JSON rather than pickle: the file may be shared between runs and machines, and loading it
+    # must never execute code. NaN and infinities round-trip through Python's json module.
+    return json.dumps(value, separators=(",", ":"), default=_json_default).encode("utf-8")
+
+
+def _load(blob: bytes) -> Any:
+    return json.loads(blob)
+
+
+# --------------------------- Store ----------------------------------------------
+
+class ResultCache:
+    """
+    Valuation results in one SQLite table, addressed by a hash of the exact inputs and parameters
+    that produced them. Entries never go stale: changed inputs simply hash to a new key.
+    `stats` counts hits and misses per computation name.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or data_path(results_db)
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+        self.stats: Counter = Counter()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def get_many(self, name: str, keys: Sequence[str]) -> Dict[str, Any]:
+        """Cached values of the `keys` that are present."""
+        found = {}
+        with self._lock:
+            for i in range(0, len(keys), _BATCH):
+                chunk = list(keys[i:i + _BATCH])
+                found.update(self._db.execute(
+                    f"SELECT key, value FROM results WHERE key IN ({','.join('?' * len(chunk))})", chunk).fetchall())
+        self.stats[f"{name} hits"] += len(found)
+        self.stats[f"{name} misses"] += len(set(keys)) - len(found)
+        return {key: _load(value) for key, value in found.items()}
+
+    def put_many(self, name: str, values: Dict[str, Any]) -> None:
+        now = time.time()
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                                 [(key, name, now, _dump(value))
+                                  for key, value in values.items()])
+
+    def get(self, name: str, key: str, default=None):
+        return self.get_many(name, [key]).get(key, default)
+
+    def put(self, name: str, key: str, value: Any) -> None:
+        self.put_many(name, {key: value})
+
+    def prune(self, older_than: float) -> int:
+        """Drop entries stored more than `older_than` seconds ago; returns how many."""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM results WHERE created < ?", (time.time() - older_than,)).rowcount
+
+
+_default_cache: Optional[ResultCache] = None
+_default_lock = threading.Lock()
+
+
+def get_result_cache() -> Optional[ResultCache]:
+    """Process-wide result cache, None unless enabled through VALUATION_RESULT_CACHE."""
+    global _default_cache
+    setting = os.environ.get(RESULT_CACHE_ENV, "").strip()
+    if setting.lower() in ("", "0", "off", "false", "no"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = ResultCache(None if setting.lower() in ("1", "on", "true", "yes") else setting)
+        return _default_cache
+
+
+# --------------------------- Memoization ----------------------------------------
+
+def memoize(fields: Optional[Iterable[str]] = None, name: Optional[str] = None,
+            cache: Optional[Callable[[], Optional[ResultCache]]] = None,
+            depends: Iterable[Any] = ()):
+    """
+    Memoize a valuation function in the result cache. With `fields`, the first argument is an
+    `info` dict and only those fields of it are part of the key, so a ticker whose relevant fields
+    did not change is served from the cache; without, every argument is. The other arguments
+    (defaults applied), the source of the function's module and the source of the `depends`
+    modules (modules or module names doing the actual maths) are always part of the key.
+
+        @memoize(["freeCashflow", "sharesOutstanding"], depends=METRIC_CODE)
+        def dcf_sensitivity(info, growth_rate, years=5): ...
+    """
+    fields = None if fields is None else tuple(fields)
+    depends = tuple(getattr(module, "__name__", module) for module in depends)
+    cache = cache or get_result_cache
+
+    def decorator(func):
+        signature = inspect.signature(func)
+        label = name or func.__name__
+        first = next(iter(signature.parameters))
+        modules = (func.__module__,) + depends
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = cache()
+            if store is None:
+                return func(*args, **kwargs)
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            arguments = dict(bound.arguments)
+            if fields is not None:
+                info = arguments.pop(first)
+                if not isinstance(info, dict):
+                    return func(*args, **kwargs)
+                # Missing and None stay distinct: callers often use info.get(field, default)
+                arguments[first] = {f: info[f] for f in fields if f in info}
+            key = content_key(label, [code_fingerprint(module) for module in modules], arguments)
+            hit = store.get_many(label, [key])
+            if key in hit:
+                return hit[key]
+            value = func(*args, **kwargs)
+            store.put(label, key, value)
+            return value
+
+        wrapper.uncached = func
+        wrapper.cache_fields = fields
+        wrapper.cache_modules = modules
+        return wrapper
+    return decorator
+
+
+def cached_columns(store: Optional[ResultCache],
+                   name: str,
+                   rows: np.ndarray,
+                   compute: Callable[[np.ndarray], np.ndarray],
+                   *parts: Any) -> np.ndarray:
+    """
+    Column-wise memoization of a vectorized computation. `rows` holds the inputs (fields x tickers),
+    `compute(columns)` returns a (results x len(columns)) block for the given column indices.
+    Only tickers whose inputs (with `parts`) were never seen are passed to `compute`.
+    """
+    n = rows.shape[1]
+    if store is None or n == 0:
+        return compute(np.arange(n))
+    keys = column_keys(rows, name, *parts)
+    hits = store.get_many(name, keys)
+    missing = np.array([j for j, key in enumerate(keys) if key not in hits], dtype=int)
+    fresh = compute(missing) if len(missing) else None
+
+    width = len(next(iter(hits.values()))) if hits else fresh.shape[0]
+    results = np.empty((width, n), dtype=np.float64)
+    for j, key in enumerate(keys):
+        if key in hits:
+            results[:, j] = np.asarray(hits[key], dtype=np.float64)
+    if fresh is not None:
+        results[:, missing] = fresh
+        store.put_many(name, {keys[j]: fresh[:, i].copy() for i, j in enumerate(missing)})
+    return results
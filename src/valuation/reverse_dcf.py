@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+from typing import Callable, Dict, List, Tuple
+
+from src.valuation.columnar import Columns
+from src.valuation.dcf_vectorized import present_value_factors
+
+
+# ------------------------------- Solver -----------------------------------------
+
+def _solve_monotone(fn: Callable[[np.ndarray], Tuple[np.ndarray, np.ndarray]],
+                    lo: np.ndarray,
+                    hi: np.ndarray,
+                    valid: np.ndarray,
+                    increasing: bool,
+                    tol: float,
+                    max_iter: int) -> Dict[str, np.ndarray]:
+    """
+    Find the root of a monotone fn(x) for every element at once.
+
+    Newton steps are taken where they stay inside the element's bracket, bisection otherwise,
+    and each element stops updating as soon as it has converged. Elements without a sign
+    change over [lo, hi] (no solution) are left as NaN.
+    """
+    lo = np.array(lo, dtype=float)
+    hi = np.array(hi, dtype=float)
+    with np.errstate(all="ignore"):
+        f_lo, _ = fn(lo)
+        f_hi, _ = fn(hi)
+        if increasing:
+            bracketed = valid & (f_lo <= 0) & (f_hi >= 0)
+        else:
+            bracketed = valid & (f_lo >= 0) & (f_hi <= 0)
+
+        x = (lo + hi) / 2
+        active = bracketed.copy()
+        converged = np.zeros_like(active)
+        iterations = np.zeros(x.shape, dtype=int)
+        for _ in range(max_iter):
+            if not active.any():
+                break
+            f, df = fn(x)
+            done = active & (np.abs(f) <= tol)
+            converged |= done
+            active &= ~done
+
+            above = f > 0
+            if increasing:
+                hi = np.where(active & above, x, hi)
+                lo = np.where(active & ~above, x, lo)
+            else:
+                lo = np.where(active & above, x, lo)
+                hi = np.where(active & ~above, x, hi)
+
+            step = x - f / df
+            inside = np.isfinite(step) & (step > lo) & (step < hi)
+            iterations += active
+            x = np.where(active, np.where(inside, step, (lo + hi) / 2), x)
+
+            collapsed = active & (hi - lo <= tol * np.maximum(1.0, np.abs(x)))
+            converged |= collapsed
+            active &= ~collapsed
+
+    return {"root": np.where(converged, x, np.nan), "converged": converged, "iterations": iterations}
+
+
+# ------------------------------- Reverse DCF ------------------------------------
+
+def implied_growth(price,
+                   fcf,
+                   shares_out,
+                   years: int = 5,
+                   discount_rate=0.10,
+                   terminal_growth=0.03,
+                   lower: float = -0.95,
+                   upper: float = 2.0,
+                   tol: float = 1e-10,
+                   max_iter: int = 60) -> Dict[str, np.ndarray]:
+    """
+    FCF growth rate that makes the `calculate_dcf_v2` value per share equal `price`, for arrays of tickers.
+
+    The model value is price = FCF / shares * S(q) with q = (1 + g) / (1 + r), so the solver works on
+    q directly: S is increasing in q and its derivative is known in closed form.
+    Tickers with non-positive FCF, price or shares, or whose price needs a growth outside
+    [lower, upper], get NaN.
+    """
+    price, fcf, shares_out, r, tg = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                                          (price, fcf, shares_out, discount_rate, terminal_growth)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = price * shares_out / fcf
+        k = (1 + tg) / (r - tg)
+    valid = (fcf > 0) & (shares_out > 0) & (price > 0) & (r > tg)
+
+    def fn(q):
+        factor, d_factor = present_value_factors(q, years, k)
+        return factor / target - 1, d_factor / target
+
+    solution = _solve_monotone(fn, (1 + lower) / (1 + r), (1 + upper) / (1 + r), valid, True, tol, max_iter)
+    return {"growth": solution["root"] * (1 + r) - 1,
+            "converged": solution["converged"],
+            "iterations": solution["iterations"]}
+
+
+def implied_discount_rate(price,
+                          fcf,
+                          shares_out,
+                          growth_rate,
+                          years: int = 5,
+                          terminal_growth=0.03,
+                          upper: float = 1.0,
+                          tol: float = 1e-10,
+                          max_iter: int = 60) -> Dict[str, np.ndarray]:
+    """
+    Discount rate that makes the `calculate_dcf_v2` value per share equal `price` for a given growth rate.
+    The value falls as the rate rises; the search runs over (terminal_growth, upper].
+    """
+    price, fcf, shares_out, g, tg = np.broadcast_arrays(*(np.asarray(a, dtype=float) for a in
+                                                          (price, fcf, shares_out, growth_rate, terminal_growth)))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        target = price * shares_out / fcf
+    valid = (fcf > 0) & (shares_out > 0) & (price > 0) & (g > -1)
+
+    def fn(r):
+        q = (1 + g) / (1 + r)
+        k = (1 + tg) / (r - tg)
+        factor, d_factor = present_value_factors(q, years, k)
+        # dS/dr = S'(q) dq/dr + q^n dk/dr
+        d_r = d_factor * (-q / (1 + r)) + q ** years * (-k / (r - tg))
+        return factor / target - 1, d_r / target
+
+    solution = _solve_monotone(fn, tg + 1e-6, np.full(tg.shape, upper), valid, False, tol, max_iter)
+    return {"discount_rate": solution["root"],
+            "converged": solution["converged"],
+            "iterations": solution["iterations"]}
+
+
+def rank_by_implied_growth(symbols: List[str],
+                           cols: Columns,
+                           years: int = 5,
+                           discount_rate: float = 0.10,
+                           terminal_growth: float = 0.03) -> pd.DataFrame:
+    """Implied FCF growth for every ticker of a snapshot, highest first (unsolvable tickers last)."""
+    result = implied_growth(cols["currentPrice"], cols["freeCashflow"], cols["sharesOutstanding"],
+                            years, discount_rate, terminal_growth)
+    table = pd.DataFrame({
+        "price": cols["currentPrice"],
+        "implied_growth": result["growth"],
+        "iterations": result["iterations"],
+    }, index=pd.Index(symbols, name="Symbol"))
+    return table.sort_values("implied_growth", ascending=False, na_position="last")
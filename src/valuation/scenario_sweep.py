@@ -0,0 +1,129 @@
+import contextlib
+import time
+import numpy as np
+import pandas as pd
+
+from typing import Callable, Dict, Iterable, Iterator, Optional, Sequence
+
+try:
+    import pyarrow
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet output is optional
+    pyarrow = pq = None
+
+# Inputs of one scenario of `project_company_price`
+SCENARIO_COLUMNS = ["revenue_growth_rate", "profit_margin", "future_pe_multiple"]
+RESULT_COLUMNS = SCENARIO_COLUMNS + [
+    "final_revenue", "total_earnings", "projected_market_cap", "projected_price_per_share", "upside",
+]
+DEFAULT_CHUNK_SIZE = 1_000_000
+# CSV number format; np.savetxt with a fixed format is several times faster than DataFrame.to_csv
+CSV_FORMAT = "%.10g"
+
+Chunk = Dict[str, np.ndarray]
+
+
+# --------------------------- Scenario sources -----------------------------------
+
+def grid_size(growth_rates: Sequence[float], margins: Sequence[float], pe_multiples: Sequence[float]) -> int:
+    return len(growth_rates) * len(margins) * len(pe_multiples)
+
+
+def grid_scenarios(growth_rates: Sequence[float],
+                   margins: Sequence[float],
+                   pe_multiples: Sequence[float],
+                   chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """
+    Cartesian product of the three ranges, `chunk_size` scenarios at a time.
+    Each chunk is decoded from a flat index range, so the product is never materialised.
+    """
+    axes = [np.asarray(growth_rates, dtype=float), np.asarray(margins, dtype=float),
+            np.asarray(pe_multiples, dtype=float)]
+    shape = tuple(len(a) for a in axes)
+    total = grid_size(*axes)
+    for start in range(0, total, chunk_size):
+        flat = np.arange(start, min(start + chunk_size, total))
+        positions = np.unravel_index(flat, shape)
+        yield {column: axis[position] for column, axis, position in zip(SCENARIO_COLUMNS, axes, positions)}
+
+
+def file_scenarios(path: str, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Chunk]:
+    """Scenarios from a CSV file with SCENARIO_COLUMNS columns, read `chunk_size` rows at a time."""
+    for frame in pd.read_csv(path, usecols=SCENARIO_COLUMNS, dtype=float, chunksize=chunk_size):
+        yield {column: frame[column].to_numpy() for column in SCENARIO_COLUMNS}
+
+
+# --------------------------- Vectorized projection ------------------------------
+
+def project_chunk(chunk: Chunk,
+                  current_shares_outstanding: float,
+                  base_market_cap_for_upside: float,
+                  initial_projected_revenue_year1: float,
+                  projection_years: int) -> pd.DataFrame:
+    """`project_company_price` for a whole chunk of scenarios at once (unformatted numbers)."""
+    growth = chunk["revenue_growth_rate"]
+    margin = chunk["profit_margin"]
+    pe = chunk["future_pe_multiple"]
+    final_revenue = initial_projected_revenue_year1 * (1 + growth) ** (projection_years - 1)
+    earnings = final_revenue * margin
+    market_cap = earnings * pe
+    return pd.DataFrame({
+        "revenue_growth_rate": growth,
+        "profit_margin": margin,
+        "future_pe_multiple": pe,
+        "final_revenue": final_revenue,
+        "total_earnings": earnings,
+        "projected_market_cap": market_cap,
+        "projected_price_per_share": market_cap / current_shares_outstanding,
+        "upside": market_cap / base_market_cap_for_upside - 1,
+    }, columns=RESULT_COLUMNS)
+
+
+def stream_projections(scenarios: Iterable[Chunk], **model) -> Iterator[pd.DataFrame]:
+    """Lazily project each chunk of `scenarios`; `model` holds the arguments of `project_chunk`."""
+    for chunk in scenarios:
+        yield project_chunk(chunk, **model)
+
+
+# --------------------------- Output ---------------------------------------------
+
+def print_progress(done: int, total: Optional[int], elapsed: float) -> None:
+    rate = done / elapsed if elapsed > 0 else float("inf")
+    share = f" / {total:,} ({done / total:.0%})" if total else ""
+    print(f"📊 {done:,}{share} scenarios, {rate:,.0f}/s")
+
+
+def write_projections(results: Iterable[pd.DataFrame],
+                      path: str,
+                      total: Optional[int] = None,
+                      progress: Optional[Callable[[int, Optional[int], float], None]] = print_progress) -> int:
+    """
+    Write projected chunks to `path` (Parquet for .parquet, CSV otherwise) as they are produced,
+    so memory use is bounded by one chunk. Returns the number of scenarios written.
+    """
+    parquet = path.endswith(".parquet")
+    if parquet and pq is None:
+        raise ImportError("Parquet output needs pyarrow (pip install pyarrow); use a .csv path instead.")
+
+    started = time.perf_counter()
+    written = 0
+    writer = None
+    try:
+        with contextlib.nullcontext() if parquet else open(path, "w", newline="") as f:
+            for frame in results:
+                if parquet:
+                    table = pyarrow.Table.from_pandas(frame, preserve_index=False)
+                    if writer is None:
+                        writer = pq.ParquetWriter(path, table.schema)
+                    writer.write_table(table)
+                else:
+                    if written == 0:
+                        f.write(",".join(frame.columns) + "\n")
+                    np.savetxt(f, frame.to_numpy(), fmt=CSV_FORMAT, delimiter=",")
+                written += len(frame)
+                if progress:
+                    progress(written, total, time.perf_counter() - started)
+    finally:
+        if writer is not None:
+            writer.close()
+    return written
@@ -0,0 +1,205 @@
+import heapq
+import math
+import operator
+import numpy as np
+import yfinance as yf
+
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.valuation.columnar import snapshot_matrix, as_columns
+from src.valuation.fetch_scheduler import FetchError, Priority, get_scheduler
+from src.valuation.ticker_handle import get_handle
+from src.valuation.yfinance_api import dcf_intrinsic_value_from
+
+# Data stages, cheapest first. Each stage is fetched only for tickers that passed every earlier stage.
+INFO = "info"
+DIVIDENDS = "dividends"
+CASHFLOW = "cashflow"
+STAGES = [INFO, DIVIDENDS, CASHFLOW]
+
+OPERATORS = {
+    ">": operator.gt,
+    ">=": operator.ge,
+    "<": operator.lt,
+    "<=": operator.le,
+    "==": operator.eq,
+    "!=": operator.ne,
+}
+
+TickerData = Dict[str, Any]
+Loader = Callable[[List[str]], Tuple[Dict[str, Any], Dict[str, str]]]
+
+
+# --------------------------- Stage loaders --------------------------------------
+
+def _load_each(symbols: List[str], attribute: str) -> Tuple[Dict[str, Any], Dict[str, str]]:
+    # Shared handles that already hold the data (prefetcher, earlier valuations) are reused; the rest
+    # is fetched as one scheduled batch and seeded into the handles for later lookups
+    handles = {s: get_handle(s, Priority.PEER) for s in symbols}
+    loaded = {s: getattr(h, attribute) for s, h in handles.items() if h.is_loaded(attribute)}
+    scheduler = get_scheduler()
+    futures = {s: scheduler.submit(s, lambda s=s: getattr(yf.Ticker(s), attribute), Priority.PEER)
+               for s in symbols if s not in loaded}
+    failures = {}
+    for symbol, future in futures.items():
+        try:
+            loaded[symbol] = future.result()
+        except FetchError as e:
+            failures[symbol] = e.reason
+            continue
+        handles[symbol].set(attribute, loaded[symbol])
+    return loaded, failures
+
+
+DEFAULT_LOADERS: Dict[str, Loader] = {
+    INFO: lambda symbols: get_scheduler().fetch_infos(symbols, Priority.PEER),
+    DIVIDENDS: lambda symbols: _load_each(symbols, "dividends"),
+    CASHFLOW: lambda symbols: _load_each(symbols, "cashflow"),
+}
+
+
+# --------------------------- Built-in metrics -----------------------------------
+
+def _as_number(value: Any) -> float:
+    # Yahoo sometimes returns strings ("Infinity", "N/A") or containers: they rank as missing
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+
+def dcf_upside(data: TickerData) -> Optional[float]:
+    """Upside of `dcf_intrinsic_value` over the current price (needs the CASHFLOW stage)."""
+    price = data[INFO].get("currentPrice")
+    if not price:
+        return None
+    try:
+        intrinsic, _, _ = dcf_intrinsic_value_from(data[INFO], data[CASHFLOW])
+    except (ValueError, TypeError, ZeroDivisionError, KeyError):
+        return None
+    return intrinsic / price - 1
+
+
+def dividend_years(data: TickerData) -> int:
+    """Number of calendar years with at least one dividend (needs the DIVIDENDS stage)."""
+    dividends = data[DIVIDENDS]
+    if dividends is None or len(dividends) == 0:
+        return 0
+    return int(dividends.index.year.nunique())
+
+
+# --------------------------- Screen ---------------------------------------------
+
+class Screen:
+    """
+    Declarative universe screen.
+
+    Filters are declared up front and tagged with the data stage they need. `run` evaluates the
+    stages that a filter or the metric reads cheapest first, fetching each stage only for the
+    survivors of the previous ones (through the shared ticker handles); plain
+    numeric `info` comparisons are evaluated column-wise for the whole universe at once.
+    The ranking metric is kept in a bounded heap, so only the top `k` results are retained.
+
+        screen = (Screen()
+                  .where("marketCap", ">", 10e9)
+                  .where_in("sector", ["Technology"])
+                  .where("trailingPE", "<", 30)
+                  .top(10, dcf_upside, stage=CASHFLOW))
+        results = screen.run(symbols)
+    """
+
+    def __init__(self):
+        self.field_filters: List[Tuple[str, Callable, float]] = []
+        self.filters: List[Tuple[str, str, Callable[[TickerData], bool]]] = []
+        self.metric: Optional[Callable[[TickerData], Any]] = None
+        self.metric_stage = INFO
+        self.k = 10
+        self.largest = True
+        self.stats: Dict[str, int] = {}
+        self.failures: Dict[str, str] = {}
+
+    def where(self, field: str, op: str, value: float) -> "Screen":
+        """Numeric `info` field comparison, e.g. where("marketCap", ">", 10e9). Missing values fail."""
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator {op}; use one of {', '.join(OPERATORS)}.")
+        self.field_filters.append((field, OPERATORS[op], value))
+        return self
+
+    def where_in(self, field: str, values: Iterable[str]) -> "Screen":
+        """Text `info` field (sector, industry, country …) must be one of `values` (case-insensitive)."""
+        allowed = {str(v).lower() for v in values}
+        return self.where_fn(lambda data: str(data[INFO].get(field, "")).lower() in allowed, INFO,
+                             f"{field} in {sorted(allowed)}")
+
+    def where_fn(self, predicate: Callable[[TickerData], bool], stage: str = INFO,
+                 name: str = "custom") -> "Screen":
+        """Arbitrary predicate on the ticker data; `stage` is the most expensive data it reads."""
+        if stage not in STAGES:
+            raise ValueError(f"Unknown stage {stage}; use one of {', '.join(STAGES)}.")
+        self.filters.append((stage, name, predicate))
+        return self
+
+    def top(self, k: int, metric: Union[str, Callable[[TickerData], Any]], stage: str = INFO,
+            largest: bool = True) -> "Screen":
+        """Rank survivors by `metric` (an `info` field name or a function) and keep the best `k`."""
+        if isinstance(metric, str):
+            field = metric
+            metric = lambda data: data[INFO].get(field)
+        self.metric, self.metric_stage, self.k, self.largest = metric, stage, k, largest
+        return self
+
+    def run(self,
+            symbols: Iterable[str],
+            infos: Optional[Dict[str, Dict]] = None,
+            loaders: Optional[Dict[str, Loader]] = None) -> List[Tuple[str, float]]:
+        """
+        Run the screen and return [(symbol, metric value)] best first.
+        Pass `infos` to screen already fetched data (e.g. a snapshot) without any INFO requests.
+        """
+        loaders = {**DEFAULT_LOADERS, **(loaders or {})}
+        survivors = list(dict.fromkeys(symbols))
+        data: Dict[str, TickerData] = {s: {} for s in survivors}
+        self.stats = {"universe": len(survivors)}
+        self.failures = {}
+
+        # Only the stages a filter or the metric reads are fetched (INFO always, for the field filters)
+        needed = {INFO} | {s for s, _, _ in self.filters} | ({self.metric_stage} if self.metric else set())
+        for stage in [s for s in STAGES if s in needed]:
+            if stage == INFO and infos is not None:
+                loaded = {s: infos[s] for s in survivors if s in infos}
+                failed = {s: "not in snapshot" for s in survivors if s not in infos}
+                self.stats[f"{stage}_fetched"] = 0
+            else:
+                loaded, failed = loaders[stage](survivors)
+                self.stats[f"{stage}_fetched"] = len(survivors)
+            self.failures.update(failed)
+            survivors = [s for s in survivors if s in loaded]
+            for symbol in survivors:
+                data[symbol][stage] = loaded[symbol]
+
+            if stage == INFO:
+                survivors = self._apply_field_filters(survivors, data)
+            for filter_stage, _, predicate in self.filters:
+                if filter_stage == stage:
+                    survivors = [s for s in survivors if predicate(data[s])]
+            self.stats[f"after_{stage}"] = len(survivors)
+
+        if self.metric is None:
+            return [(s, math.nan) for s in survivors]
+        scored = ((s, self.metric(data[s])) for s in survivors)
+        scored = ((s, _as_number(v)) for s, v in scored)
+        scored = ((s, v) for s, v in scored if not math.isnan(v))
+        pick = heapq.nlargest if self.largest else heapq.nsmallest
+        return pick(self.k, scored, key=lambda item: item[1])
+
+    def _apply_field_filters(self, survivors: List[str], data: Dict[str, TickerData]) -> List[str]:
+        if not self.field_filters or not survivors:
+            return survivors
+        fields = list(dict.fromkeys(field for field, _, _ in self.field_filters))
+        _, matrix = snapshot_matrix({s: data[s][INFO] for s in survivors}, fields)
+        cols = as_columns(matrix, fields)
+        mask = True
+        for field, compare, value in self.field_filters:
+            # NaN already fails every comparison but "!=": missing values must fail it too
+            mask = mask & compare(cols[field], value) & ~np.isnan(cols[field])
+        return [s for s, keep in zip(survivors, mask) if keep]
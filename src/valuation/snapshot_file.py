@@ -0,0 +1,157 @@
+import datetime
+import json
+import os
+import struct
+import numpy as np
+
+from typing import List, Dict, Optional, Tuple
+
+from src.valuation.columnar import SNAPSHOT_FIELDS, snapshot_matrix, as_columns
+
+# File layout:
+#   8 bytes  magic
+#   8 bytes  header length (little-endian uint64)
+#   header   UTF-8 JSON: fields, symbols, categories, dtype, created
+#   padding  up to a 64-byte boundary
+#   data     float64 matrix, one contiguous row per field, one column per symbol
+MAGIC = b"FESNAP01"
+ALIGNMENT = 64
+DTYPE = "<f8"
+
+# Text fields stored as float codes into the header's category lists
+TEXT_FIELDS = ["industry", "sector"]
+
+
+# --------------------------- Writing --------------------------------------------
+
+def write_snapshot(path: str, infos: Dict[str, Dict], fields: List[str] = SNAPSHOT_FIELDS) -> None:
+    """Write `info` dicts as a memory-mappable snapshot file (atomically replaces `path`)."""
+    symbols, matrix = snapshot_matrix(infos, fields)
+
+    categories: Dict[str, List[str]] = {}
+    text_rows = []
+    for field in TEXT_FIELDS:
+        values = [infos[s].get(field) for s in symbols]
+        labels = sorted({v for v in values if isinstance(v, str) and v})
+        codes = {label: i for i, label in enumerate(labels)}
+        categories[field] = labels
+        text_rows.append([codes.get(v, np.nan) for v in values])
+    if symbols:
+        matrix = np.vstack([matrix, np.asarray(text_rows, dtype=float)])
+    else:
+        matrix = np.empty((len(fields) + len(TEXT_FIELDS), 0))
+
+    header = json.dumps({
+        "fields": list(fields) + TEXT_FIELDS,
+        "symbols": symbols,
+        "categories": categories,
+        "dtype": DTYPE,
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+    }).encode("utf-8")
+    prefix = len(MAGIC) + 8 + len(header)
+    padding = (-prefix) % ALIGNMENT
+
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        f.write(b"\0" * padding)
+        f.write(np.ascontiguousarray(matrix, dtype=DTYPE).tobytes())
+    os.replace(tmp_path, path)
+
+
+# --------------------------- Reading --------------------------------------------
+
+class SnapshotFile:
+    """
+    Read-only, memory-mapped view of a snapshot file.
+
+    Opening only parses the JSON header; the numeric data stays in the page cache and is
+    shared by every process that maps the same file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"{path} is not a snapshot file.")
+            (header_len,) = struct.unpack("<Q", f.read(8))
+            header = json.loads(f.read(header_len).decode("utf-8"))
+
+        prefix = len(MAGIC) + 8 + header_len
+        offset = prefix + (-prefix) % ALIGNMENT
+        self.fields: List[str] = header["fields"]
+        self.symbols: List[str] = header["symbols"]
+        self.categories: Dict[str, List[str]] = header["categories"]
+        self.created: str = header["created"]
+        self._index: Optional[Dict[str, int]] = None
+        shape = (len(self.fields), len(self.symbols))
+        if shape[1]:
+            self.matrix = np.memmap(path, dtype=header["dtype"], mode="r", offset=offset, shape=shape)
+        else:
+            self.matrix = np.empty(shape)
+
+    def __len__(self) -> int:
+        return len(self.symbols)
+
+    def __contains__(self, symbol: str) -> bool:
+        return symbol in self.index
+
+    @property
+    def index(self) -> Dict[str, int]:
+        """Symbol -> column position (built on first use)."""
+        if self._index is None:
+            self._index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        return self._index
+
+    def columns(self, start: int = 0, stop: Optional[int] = None) -> Dict[str, np.ndarray]:
+        """Named column views (no copy) for symbols[start:stop]."""
+        return as_columns(self.matrix[:, start:stop], self.fields)
+
+    def labels(self, field: str, start: int = 0, stop: Optional[int] = None) -> List[Optional[str]]:
+        """Decode a text field (e.g. industry) for symbols[start:stop]."""
+        names = self.categories[field]
+        codes = self.matrix[self.fields.index(field), start:stop]
+        return [None if np.isnan(c) else names[int(c)] for c in codes]
+
+    def info(self, symbol: str) -> Dict:
+        """Rebuild an `info`-like dict for one symbol (missing values are left out)."""
+        j = self.index[symbol]
+        info = {}
+        for i, field in enumerate(self.fields):
+            value = float(self.matrix[i, j])
+            if np.isnan(value):
+                continue
+            info[field] = self.categories[field][int(value)] if field in self.categories else value
+        return info
+
+
+# --------------------------- Dated snapshot store -------------------------------
+
+def snapshot_path(directory: str, date: datetime.date) -> str:
+    return os.path.join(directory, f"{date.isoformat()}.bin")
+
+
+def write_dated_snapshot(directory: str, date: datetime.date, infos: Dict[str, Dict]) -> str:
+    """Store the snapshot of one day as `<directory>/<YYYY-MM-DD>.bin`."""
+    os.makedirs(directory, exist_ok=True)
+    path = snapshot_path(directory, date)
+    write_snapshot(path, infos)
+    return path
+
+
+def list_snapshots(directory: str) -> List[Tuple[datetime.date, str]]:
+    """(date, path) of every dated snapshot in `directory`, oldest first."""
+    if not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        stem, ext = os.path.splitext(name)
+        if ext != ".bin":
+            continue
+        try:
+            snapshots.append((datetime.date.fromisoformat(stem), os.path.join(directory, name)))
+        except ValueError:
+            continue
+    return sorted(snapshots)
@@ -0,0 +1,174 @@
+import datetime
+import json
+import math
+import sqlite3
+import threading
+import zlib
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# A full copy is stored again after this many deltas, so an "as of" lookup never replays more than that
+KEYFRAME_INTERVAL = 60
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS records (
+    symbol  TEXT NOT NULL,
+    date    TEXT NOT NULL,
+    is_full INTEGER NOT NULL,
+    payload BLOB NOT NULL,
+    PRIMARY KEY (symbol, date)
+);
+CREATE INDEX IF NOT EXISTS records_date ON records (date);
+CREATE TABLE IF NOT EXISTS latest (
+    symbol  TEXT PRIMARY KEY,
+    date    TEXT NOT NULL,
+    deltas  INTEGER NOT NULL,
+    raw_size INTEGER NOT NULL,
+    payload BLOB NOT NULL
+);
+"""
+
+
+def _pack(value: Any) -> bytes:
+    return zlib.compress(json.dumps(value, separators=(",", ":"), default=str).encode("utf-8"), 6)
+
+
+def _unpack(blob: bytes) -> Any:
+    return json.loads(zlib.decompress(blob).decode("utf-8"))
+
+
+def _same(a: Any, b: Any) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    return a == b
+
+
+def diff_info(old: Dict, new: Dict) -> Tuple[Dict, List[str]]:
+    """Fields that were added or changed (with their new value) and fields that disappeared."""
+    changed = {k: v for k, v in new.items() if k not in old or not _same(old[k], v)}
+    removed = [k for k in old if k not in new]
+    return changed, removed
+
+
+# --------------------------- History store --------------------------------------
+
+class SnapshotHistory:
+    """
+    Day-by-day history of raw `info` payloads in one SQLite file.
+
+    The first snapshot of a ticker (and every KEYFRAME_INTERVAL-th after it) is stored in full;
+    other days store only the fields that changed, zlib-compressed. Days without any change
+    store nothing. "As of" lookups start from the nearest keyframe and replay the deltas after it.
+    A ticker that drops out of a full snapshot gets a tombstone (a keyframe without payload), so
+    lookups after that day no longer return its last values.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    # -- writing ------------------------------------------------------------------
+
+    def record(self, date: datetime.date, infos: Dict[str, Dict], full: bool = False) -> Dict[str, int]:
+        """
+        Store one day of snapshots. Tickers whose last record is on or after `date` are skipped,
+        so re-running a day is harmless, and so are empty infos (a failed or throttled fetch says
+        nothing about the ticker). With `full`, `infos` is the whole tracked universe and every
+        ticker missing from it is tombstoned. Returns counts of full, delta, unchanged, skipped and
+        removed tickers.
+        """
+        day = date.isoformat()
+        stats = {"full": 0, "delta": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+        with self._lock, self._db:
+            latest = {symbol: (last_day, deltas, payload) for symbol, last_day, deltas, payload in
+                      self._db.execute("SELECT symbol, date, deltas, payload FROM latest")}
+            records, states = [], []
+            for symbol, info in infos.items():
+                previous = latest.get(symbol)
+                if not info or (previous is not None and previous[0] >= day):
+                    stats["skipped"] += 1
+                    continue
+                raw_size = len(json.dumps(info, separators=(",", ":"), default=str))
+                last_info = None if previous is None else _unpack(previous[2])
+                if last_info is None or previous[1] + 1 >= KEYFRAME_INTERVAL:
+                    records.append((symbol, day, 1, _pack(info)))
+                    states.append((symbol, day, 0, raw_size, _pack(info)))
+                    stats["full"] += 1
+                    continue
+                changed, removed = diff_info(last_info, info)
+                if not changed and not removed:
+                    stats["unchanged"] += 1
+                    continue
+                records.append((symbol, day, 0, _pack({"set": changed, "unset": removed})))
+                states.append((symbol, day, previous[1] + 1, raw_size, _pack(info)))
+                stats["delta"] += 1
+            if full:
+                for symbol, (last_day, _, payload) in latest.items():
+                    if symbol in infos or last_day >= day or _unpack(payload) is None:
+                        continue
+                    records.append((symbol, day, 1, _pack(None)))
+                    states.append((symbol, day, 0, 0, _pack(None)))
+                    stats["removed"] += 1
+            self._db.executemany("INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)", records)
+            self._db.executemany("INSERT OR REPLACE INTO latest VALUES (?, ?, ?, ?, ?)", states)
+        return stats
+
+    # -- reading ------------------------------------------------------------------
+
+    def as_of(self, symbol: str, date: datetime.date) -> Optional[Dict]:
+        """The `info` payload of `symbol` as it was on `date` (None if nothing was recorded yet, or it was removed)."""
+        day = date.isoformat()
+        keyframe = self._db.execute(
+            "SELECT date, payload FROM records WHERE symbol = ? AND is_full = 1 AND date <= ? "
+            "ORDER BY date DESC LIMIT 1", (symbol, day)).fetchone()
+        if keyframe is None:
+            return None
+        info = _unpack(keyframe[1])
+        if info is None:
+            return None
+        for (payload,) in self._db.execute(
+                "SELECT payload FROM records WHERE symbol = ? AND date > ? AND date <= ? ORDER BY date",
+                (symbol, keyframe[0], day)):
+            delta = _unpack(payload)
+            info.update(delta["set"])
+            for field in delta["unset"]:
+                info.pop(field, None)
+        return info
+
+    def as_of_many(self, date: datetime.date, symbols: Optional[Iterable[str]] = None) -> Dict[str, Dict]:
+        """`as_of` for many tickers (every recorded ticker by default)."""
+        if symbols is None:
+            symbols = [s for (s,) in self._db.execute("SELECT symbol FROM latest ORDER BY symbol")]
+        result = {}
+        for symbol in symbols:
+            info = self.as_of(symbol, date)
+            if info is not None:
+                result[symbol] = info
+        return result
+
+    def changes_since(self, symbol: str, since: datetime.date,
+                      until: Optional[datetime.date] = None) -> Dict[str, Tuple[Any, Any]]:
+        """Fields whose value differs between `since` and `until` (latest by default), as field -> (old, new)."""
+        old = self.as_of(symbol, since) or {}
+        new = self.as_of(symbol, until or datetime.date.max) or {}
+        changed, removed = diff_info(old, new)
+        result = {field: (old.get(field), value) for field, value in changed.items()}
+        result.update({field: (old[field], None) for field in removed})
+        return result
+
+    def changed_symbols(self, since: datetime.date) -> List[str]:
+        """Tickers with at least one recorded change after `since`."""
+        return [s for (s,) in self._db.execute(
+            "SELECT DISTINCT symbol FROM records WHERE date > ? ORDER BY symbol", (since.isoformat(),))]
+
+    def storage_stats(self) -> Dict[str, int]:
+        """Stored bytes versus the size the same days would take as uncompressed full copies."""
+        stored, records = self._db.execute("SELECT COALESCE(SUM(LENGTH(payload)), 0), COUNT(*) FROM records").fetchone()
+        days = self._db.execute("SELECT COUNT(DISTINCT date) FROM records").fetchone()[0]
+        full_copy = self._db.execute("SELECT COALESCE(SUM(raw_size), 0) FROM latest").fetchone()[0]
+        return {"records": records, "days": days, "stored_bytes": stored, "full_copies_bytes": full_copy * days}
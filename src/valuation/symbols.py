@@ -0,0 +1,212 @@
+import os
+import sqlite3
+import threading
+import time
+
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from pytickersymbols import PyTickerSymbols
+
+from src.valuation.data_dir import data_path
+
+missing_db = 'missing_symbols.db'
+# VALUATION_NEGATIVE_CACHE=<path> moves the negative cache file, VALUATION_NEGATIVE_CACHE=off disables it
+NEGATIVE_CACHE_ENV = "VALUATION_NEGATIVE_CACHE"
+# A symbol (or field) Yahoo reported missing is not asked for again for a week
+NEGATIVE_TTL = 7 * 24 * 3600.0
+# An empty `info` can also be a transient Yahoo hiccup: such symbols are retried after a day
+EMPTY_INFO_TTL = 24 * 3600.0
+
+# --------------------------- Symbol resolution ----------------------------------
+
+# Index listings Yahoo knows under another symbol that the rules below cannot derive
+SYMBOL_OVERRIDES = {
+    "BRK.B": "BRK-B",
+    "BF.B": "BF-B",
+    "AIR.PA.DE": "AIR.PA",
+    "BTRW.L": "BDEV.L",
+}
+
+# Yahoo suffixes of the exchanges the index listings are quoted on
+EXCHANGE_SUFFIXES = (".DE", ".L", ".PA", ".AS", ".MC", ".MI", ".SW", ".F", ".T", ".V", ".TO", ".HK", ".AX")
+
+
+def resolve_symbol(symbol: str, yahoo_symbols: Sequence[str] = ()) -> str:
+    """
+    Yahoo symbol of an index listing (or of a ticker typed in by hand). `yahoo_symbols` are the
+    Yahoo listings pytickersymbols knows for the stock, used to confirm the rules:
+
+    * a hand-maintained override wins;
+    * a listing that already is one of its Yahoo symbols is kept;
+    * one-letter share classes are written with a dash on Yahoo ("BRK.B" -> "BRK-B");
+    * a listing with two exchange suffixes keeps the primary one ("AIR.PA.DE" -> "AIR.PA").
+    """
+    symbol = symbol.strip().upper()
+    if symbol in SYMBOL_OVERRIDES:
+        return SYMBOL_OVERRIDES[symbol]
+    candidates = {s.upper() for s in yahoo_symbols}
+    if symbol in candidates:
+        return symbol
+    stem, dot, suffix = symbol.rpartition(".")
+    if dot and len(suffix) == 1 and f".{suffix}" not in EXCHANGE_SUFFIXES and "." not in stem:
+        return f"{stem}-{suffix}"
+    if dot and f".{suffix}" in EXCHANGE_SUFFIXES and os.path.splitext(stem)[1].upper() in EXCHANGE_SUFFIXES:
+        return stem
+    return symbol
+
+
+@lru_cache(maxsize=None)
+def index_listings(indexes: Tuple[str, ...]) -> Tuple[Tuple[str, str, Tuple[str, ...]], ...]:
+    """(listing symbol, Yahoo symbol, industries) of every stock of the given indexes, built once per process."""
+    stock_data = PyTickerSymbols()
+    listings = []
+    for index in indexes:
+        for stock in stock_data.get_stocks_by_index(index):
+            symbol = stock.get("symbol")
+            if not symbol:
+                continue
+            yahoo = [s.get("yahoo") for s in stock.get("symbols") or () if s.get("yahoo")]
+            listings.append((symbol, resolve_symbol(symbol, yahoo), tuple(stock.get("industries") or ())))
+    return tuple(listings)
+
+
+def resolution_table(indexes: Iterable[str] = ('S&P 500', 'DAX', 'FTSE 100')) -> Dict[str, str]:
+    """Listing symbol -> Yahoo symbol for the given indexes (only the ones that differ)."""
+    return {listing: yahoo for listing, yahoo, _ in index_listings(tuple(indexes)) if listing != yahoo}
+
+
+# --------------------------- Negative cache -------------------------------------
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS missing (
+    symbol  TEXT NOT NULL,
+    field   TEXT NOT NULL,
+    reason  TEXT NOT NULL,
+    until   REAL NOT NULL,
+    PRIMARY KEY (symbol, field)
+);
+"""
+# Reasons of a failed fetch that mean "this symbol does not exist" rather than "try again later"
+_MISSING_MARKERS = ("404", "not found", "delisted", "no data found", "symbol may be delisted", "quote not found")
+# An `info` without any of these is what Yahoo returns for unknown symbols
+_QUOTE_FIELDS = ("regularMarketPrice", "currentPrice", "previousClose", "marketCap", "quoteType")
+
+
+def is_missing_reason(reason: str) -> bool:
+    reason = reason.lower()
+    return any(marker in reason for marker in _MISSING_MARKERS)
+
+
+def is_empty_info(info: Optional[Dict]) -> bool:
+    return not info or all(info.get(field) is None for field in _QUOTE_FIELDS)
+
+
+class NegativeCache:
+    """
+    Symbols, and fields of symbols, known to be missing on Yahoo, each for `ttl` seconds.
+    The whole symbol is stored under the field "". Kept in SQLite so that batch runs share it.
+    """
+
+    def __init__(self, path: Optional[str] = None, ttl: float = NEGATIVE_TTL):
+        self.path = path or data_path(missing_db)
+        self.ttl = ttl
+        self._db = sqlite3.connect(self.path, check_same_thread=False)
+        self._db.executescript(_SCHEMA)
+        self._lock = threading.Lock()
+
+    def close(self) -> None:
+        self._db.close()
+
+    def add(self, symbol: str, reason: str, fields: Iterable[str] = ("",), ttl: Optional[float] = None) -> None:
+        until = time.time() + (self.ttl if ttl is None else ttl)
+        with self._lock, self._db:
+            self._db.executemany("INSERT OR REPLACE INTO missing VALUES (?, ?, ?, ?)",
+                                 [(symbol, field, reason, until) for field in fields])
+
+    def missing(self, symbols: Iterable[str], field: str = "") -> Dict[str, str]:
+        """Reason by symbol, for the `symbols` known to miss `field` ("" = the whole symbol)."""
+        symbols = list(dict.fromkeys(symbols))
+        found: Dict[str, str] = {}
+        with self._lock:
+            for i in range(0, len(symbols), 900):
+                chunk = symbols[i:i + 900]
+                found.update(self._db.execute(
+                    f"SELECT symbol, reason FROM missing WHERE field = ? AND until > ? "
+                    f"AND symbol IN ({','.join('?' * len(chunk))})", [field, time.time(), *chunk]).fetchall())
+        return found
+
+    def missing_fields(self, symbol: str) -> Set[str]:
+        with self._lock:
+            rows = self._db.execute("SELECT field FROM missing WHERE symbol = ? AND field != '' AND until > ?",
+                                    (symbol, time.time())).fetchall()
+        return {field for field, in rows}
+
+    def forget(self, symbol: str) -> None:
+        with self._lock, self._db:
+            self._db.execute("DELETE FROM missing WHERE symbol = ?", (symbol,))
+
+    def purge(self) -> int:
+        """Drop expired entries; returns how many."""
+        with self._lock, self._db:
+            return self._db.execute("DELETE FROM missing WHERE until <= ?", (time.time(),)).rowcount
+
+
+_default_cache: Optional[NegativeCache] = None
+_default_lock = threading.Lock()
+
+
+def get_negative_cache() -> Optional[NegativeCache]:
+    """Process-wide negative cache (missing_symbols.db in the data directory), None when disabled."""
+    global _default_cache
+    setting = os.environ.get(NEGATIVE_CACHE_ENV, "")
+    if setting.lower() in ("0", "off", "false", "no"):
+        return None
+    with _default_lock:
+        if _default_cache is None:
+            _default_cache = NegativeCache(setting or None)
+        return _default_cache
+
+
+def skip_known_missing(symbols: Iterable[str],
+                       fields: Sequence[str] = (),
+                       cache: Optional[NegativeCache] = None) -> Tuple[List[str], Dict[str, str]]:
+    """
+    Split `symbols` into those worth fetching and those skipped (with the reason): symbols known
+    to be missing, and, when `fields` are given, symbols known to have none of them.
+    """
+    symbols = list(dict.fromkeys(symbols))
+    cache = cache or get_negative_cache()
+    if cache is None:
+        return symbols, {}
+    skipped = cache.missing(symbols)
+    if fields:
+        lacking = [cache.missing(symbols, field) for field in fields]
+        for symbol in symbols:
+            if symbol not in skipped and all(symbol in part for part in lacking):
+                skipped[symbol] = f"none of {', '.join(fields)} available"
+    return [s for s in symbols if s not in skipped], skipped
+
+
+def record_fetch(symbol: str,
+                 info: Optional[Dict] = None,
+                 reason: Optional[str] = None,
+                 fields: Sequence[str] = (),
+                 cache: Optional[NegativeCache] = None) -> None:
+    """
+    Remember the outcome of one fetch: a "not found" failure marks the symbol missing for the
+    cache's ttl, an empty `info` for EMPTY_INFO_TTL, and the `fields` absent from a valid `info` are marked missing for that symbol.
+    Throttling and other transient failures are never cached.
+    """
+    cache = cache or get_negative_cache()
+    if cache is None:
+        return
+    if reason is not None:
+        if is_missing_reason(reason):
+            cache.add(symbol, reason)
+    elif is_empty_info(info):
+        cache.add(symbol, "empty info (unknown or delisted symbol)", ttl=EMPTY_INFO_TTL)
+    else:
+        absent = [field for field in fields if info.get(field) is None]
+        if absent:
+            cache.add(symbol, "field missing", absent)
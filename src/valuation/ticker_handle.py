@@ -0,0 +1,137 @@
+import collections
+import threading
+import yfinance as yf
+
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+from src.valuation.cache import TTLCache
+from src.valuation.fetch_scheduler import Priority, get_scheduler
+
+# Handles are shared for this long, so a menu session reuses the data it already downloaded
+HANDLE_TTL = 900.0
+
+
+# --------------------------- Ticker handle --------------------------------------
+
+class TickerHandle:
+    """
+    One symbol's Yahoo data, downloaded lazily and at most once.
+
+    `info`, the statements and the dividend history are fetched through the shared scheduler
+    on first access and memoized; `downloads` counts the requests actually made.
+    """
+
+    def __init__(self, symbol: str, priority: Priority = Priority.TARGET):
+        self.symbol = symbol
+        self.priority = priority
+        self.downloads = collections.Counter()
+        self._ticker = None
+        self._data: Dict[str, Any] = {}
+        self._locks = collections.defaultdict(threading.Lock)
+        self._guard = threading.Lock()
+
+    def __str__(self) -> str:
+        return self.symbol
+
+    def __repr__(self) -> str:
+        return f"TickerHandle({self.symbol!r})"
+
+    def _load(self, attribute: str):
+        if attribute in self._data:
+            return self._data[attribute]
+        with self._guard:
+            lock = self._locks[attribute]
+        with lock:
+            if attribute not in self._data:
+                if self._ticker is None:
+                    self._ticker = yf.Ticker(self.symbol)
+                self._data[attribute] = get_scheduler().call(
+                    self.symbol, lambda: getattr(self._ticker, attribute), self.priority)
+                self.downloads[attribute] += 1
+        return self._data[attribute]
+
+    def is_loaded(self, attribute: str) -> bool:
+        return attribute in self._data
+
+    def set(self, attribute: str, value) -> None:
+        """Seed a piece of data fetched elsewhere (e.g. a batch or a snapshot)."""
+        self._data[attribute] = value
+
+    @property
+    def info(self) -> Dict:
+        return self._load("info") or {}
+
+    @property
+    def cashflow(self):
+        return self._load("cashflow")
+
+    @property
+    def balance_sheet(self):
+        return self._load("balance_sheet")
+
+    @property
+    def financials(self):
+        return self._load("financials")
+
+    @property
+    def dividends(self):
+        return self._load("dividends")
+
+
+_handles = TTLCache(HANDLE_TTL)
+
+
+def get_handle(symbol: str, priority: Priority = Priority.TARGET) -> TickerHandle:
+    """Shared handle for `symbol` (a new one once the previous handle is older than HANDLE_TTL)."""
+    return _handles.get_or_load(symbol, lambda: TickerHandle(symbol, priority))
+
+
+def as_handle(ticker: Union[str, TickerHandle], priority: Priority = Priority.TARGET) -> TickerHandle:
+    """Accept either a symbol or a handle, as the functions in yfinance_api do."""
+    return ticker if isinstance(ticker, TickerHandle) else get_handle(ticker, priority)
+
+
+def cached_handle(symbol: str) -> Optional[TickerHandle]:
+    """The shared handle for `symbol` if one is alive, without creating it."""
+    return _handles.get(symbol)
+
+
+def drop_handle(symbol: str) -> None:
+    """Forget the shared handle of `symbol`, so the next lookup downloads again."""
+    _handles.invalidate(symbol)
+
+
+def handle_count() -> int:
+    """Number of shared handles held (expired ones included until they are replaced)."""
+    return len(_handles)
+
+
+def handle_expires_in(symbol: str) -> Optional[float]:
+    """Seconds until the shared handle of `symbol` is replaced (None if there never was one)."""
+    return _handles.expires_in(symbol)
+
+
+def refresh_handle(symbol: str, attributes: Iterable[str] = ("info",),
+                   priority: Priority = Priority.BACKGROUND) -> TickerHandle:
+    """
+    Download `attributes` into a fresh handle and only then swap it in as the shared one,
+    so callers keep using the old data until the new data is complete.
+    """
+    fresh = TickerHandle(symbol, priority)
+    for attribute in attributes:
+        fresh._load(attribute)
+    fresh.priority = Priority.TARGET
+    _handles.set(symbol, fresh)
+    return fresh
+
+
+def loaded_infos(symbols: Iterable[str]) -> Tuple[Dict[str, Dict], List[str]]:
+    """`info` of the symbols whose shared handle already holds it, and the symbols that still need a fetch."""
+    warm, missing = {}, []
+    for symbol in dict.fromkeys(symbols):
+        handle = _handles.get(symbol)
+        if handle is not None and handle.is_loaded("info"):
+            warm[symbol] = handle.info
+        else:
+            missing.append(symbol)
+    return warm, missing
@@ -1,32 +1,32 @@
+import time
 import yfinance as yf
 
-from typing import List, Dict, Optional
-from pytickersymbols import PyTickerSymbols
+from concurrent.futures import TimeoutError as FutureTimeout, as_completed
+from typing import Iterator, List, Dict, NamedTuple, Optional, Tuple, Union
+from src.valuation.dcf_vectorized import GREEKS, multi_stage_dcf
+from src.valuation.fetch_scheduler import Priority, get_scheduler
+from src.valuation.fx import convert_infos
+from src.valuation.growth import default_growth, yearly_dividends
+from src.valuation.metrics import METRIC_CODE, metric_values
+from src.valuation.parallel import MULTIPLE_FIELDS
+from src.valuation.result_cache import memoize
+from src.valuation.symbols import index_listings, record_fetch, skip_known_missing
+from src.valuation.ticker_handle import TickerHandle, as_handle, loaded_infos
 from src.valuation.utility_helpers import safe_get
 
 
 # ------------------------------- PEGY -------------------------------------------
 
 def calculate_pegy(info: Dict) -> Optional[Dict[str, float]]:
-    pe = safe_get(info, "trailingPE")
-    growth = safe_get(info, "earningsQuarterlyGrowth")
-    dividend_yield = safe_get(info, "dividendYield")
-
-    if pe is None or growth is None:
+    """PEGY (PEG where there is no dividend yield) of one `info`, as registered in metrics."""
+    if safe_get(info, "trailingPE") is None or safe_get(info, "earningsQuarterlyGrowth") is None:
         print("⚠️ trailingPE is missing")
         return None
 
-    growth_pct = growth * 100
-    if dividend_yield:
-        dividend_pct = dividend_yield * 100
-        denominator = growth_pct + dividend_pct
-        if denominator == 0:
-            return None
-        return {"type": "PEGY", "value": pe / denominator}
-    else:
-        if growth_pct == 0:
-            return None
-        return {"type": "PEG", "value": pe / growth_pct}
+    values = metric_values(info, ["pegy", "is_pegy"])
+    if values["pegy"] is None:
+        return None
+    return {"type": "PEGY" if values["is_pegy"] else "PEG", "value": values["pegy"]}
 
 
 def interpret_pegy_ratio(pegy: float) -> str:
@@ -40,6 +40,7 @@ def interpret_pegy_ratio(pegy: float) -> str:
 
 # ------------------------------- DCF --------------------------------------------
 
+@memoize(["freeCashflow", "sharesOutstanding", "earningsGrowth"], depends=["src.valuation.utility_helpers"])
 def calculate_dcf_v2(info: Dict,
                   growth_rate: float,
                   years: int = 5,
@@ -78,6 +79,54 @@ def calculate_dcf_v2(info: Dict,
     }
 
 
+@memoize(["freeCashflow", "sharesOutstanding", "earningsGrowth"],
+         depends=["src.valuation.utility_helpers", "src.valuation.dcf_vectorized"])
+def calculate_multi_stage_dcf(info: Dict,
+                              high_growth: float,
+                              high_years: int = 5,
+                              fade_years: int = 5,
+                              discount_rate: float = 0.10,
+                              terminal_growth: float = 0.03) -> Optional[Dict]:
+    """
+    Multi-stage DCF (see dcf_vectorized.multi_stage_dcf): `high_years` at `high_growth`, a linear fade
+    to `terminal_growth` over `fade_years`, then the terminal value. Same inputs as `calculate_dcf_v2`
+    (a zero `high_growth` falls back to earningsGrowth); None if data missing.
+    """
+    fcf = safe_get(info, "freeCashflow")
+    shares_out = safe_get(info, "sharesOutstanding")
+    if high_growth == 0.0:
+        high_growth = info.get("earningsGrowth", 0.05)
+    if None in (fcf, shares_out, high_growth):
+        return None
+
+    result = multi_stage_dcf(fcf, shares_out, high_growth, high_years, fade_years, discount_rate, terminal_growth)
+    return {"high_growth": high_growth, "high_years": high_years, "fade_years": fade_years,
+            **{key: float(value) for key, value in result.items()}}
+
+
+@memoize(["freeCashflow", "sharesOutstanding", "earningsGrowth"], depends=METRIC_CODE)
+def dcf_sensitivity(info: Dict,
+                    growth_rate: float,
+                    years: int = 5,
+                    discount_rate: float = 0.10,
+                    terminal_growth: float = 0.03) -> Optional[Dict[str, float]]:
+    """
+    Derivatives of the `calculate_dcf_v2` value per share with respect to growth rate, discount rate,
+    terminal growth and base FCF (keys of dcf_vectorized.GREEKS), or None if data missing.
+    """
+    names = ["dcf_intrinsic_per_share"] + [f"dcf_{greek}" for greek in GREEKS]
+    values = metric_values(info, names, growth_rate=growth_rate, years=years, discount_rate=discount_rate,
+                           terminal_growth=terminal_growth)
+    if values["dcf_intrinsic_per_share"] is None:
+        return None
+    earnings_growth = info.get("earningsGrowth")
+    growth = growth_rate if growth_rate != 0.0 else (0.05 if earnings_growth is None else earnings_growth)
+    return {"intrinsic_per_share": values["dcf_intrinsic_per_share"],
+            "growth_rate": growth, "discount_rate": discount_rate, "terminal_growth": terminal_growth,
+            "fcf": info.get("freeCashflow"),
+            **{greek: values[f"dcf_{greek}"] for greek in GREEKS}}
+
+
 # --------------------------- Peer suggestion ------------------------------------
 
 def suggest_peers(
@@ -85,14 +134,9 @@ def suggest_peers(
         exclude: str = '',
         index: str = 'S&P 500',  # 'S&P 500', 'DAX', 'FTSE 100'
         max_peers: int = 10) -> List[str]:
-    """Return up to `max_peers` peer tickers in the same industry."""
-    stock_data = PyTickerSymbols()
-    stocks = stock_data.get_stocks_by_index(index)
+    """Return up to `max_peers` peer tickers (Yahoo symbols) in the same industry."""
     peers = []
-    for stock in stocks:
-        symbol = stock.get("symbol")
-        industries = stock.get("industries")
-        # print(f"symbol: ${symbol}, industries: ${industries}")
+    for symbol, industries in load_peer_index((index,)):
         for item in industries:
             if (target_industry.lower() == str(item).lower()):
                 peers.append(symbol)
@@ -107,17 +151,8 @@ def suggest_multiple_peers(
         indexes: list[str] = ('S&P 500', 'DAX', 'FTSE 100'),
         max_peers: int = 10) -> List[str]:
     """Return up to `max_peers` peer tickers in the same industry."""
-    stock_data = PyTickerSymbols()
-    stocks = []
-    for index in indexes:
-        index_stock = stock_data.get_stocks_by_index(index)
-        for s in index_stock:
-            stocks.append(s)
-
     peers = []
-    for stock in stocks:
-        symbol = stock.get("symbol")
-        industries = stock.get("industries")
+    for symbol, industries in load_peer_index(tuple(indexes)):
         # print(f"symbol: ${symbol}, industries: ${industries}")
         for item in industries:
             if (is_partial_match(target_industry, item)):
@@ -127,6 +162,11 @@ def suggest_multiple_peers(
     return peers
 
 
+def load_peer_index(indexes: Tuple[str, ...]) -> Tuple[Tuple[str, Tuple[str, ...]], ...]:
+    """(Yahoo symbol, industries) for every stock of the given indexes, loaded once per process."""
+    return tuple((yahoo, industries) for _, yahoo, industries in index_listings(tuple(indexes)))
+
+
 def is_partial_match(source: str, target: str) -> bool:
     source_words = set(source.lower().split())
     target_words = set(target.lower().split())
@@ -135,14 +175,38 @@ def is_partial_match(source: str, target: str) -> bool:
 
 # --------------------------- Comparable valuation -------------------------------
 
-def collect_peer_multiples(tickers: List[str], multiples: List[str]) -> Dict[str, List[float]]:
-    """Fetch selected multiples for peer tickers and return dict of lists."""
+def collect_peer_multiples(tickers: List[str],
+                           multiples: List[str],
+                           failures: Optional[Dict[str, str]] = None) -> Dict[str, List[float]]:
+    """
+    Fetch selected multiples for peer tickers and return dict of lists.
+    Peers already held by a shared ticker handle (e.g. a prefetched watchlist) are not fetched again,
+    nor are peers the negative cache knows to be missing (or to lack every requested multiple).
+    Peers that could not be fetched are reported and, if `failures` is given, recorded there.
+    """
+    infos, missing = loaded_infos(tickers)
+    fields = [MULTIPLE_FIELDS[m] for m in multiples if m in MULTIPLE_FIELDS]
+    missing, skipped = skip_known_missing(missing, fields)
+    fetched, failed = get_scheduler().fetch_infos(missing, Priority.PEER)
+    infos.update(fetched)
+    for peer in missing:
+        record_fetch(peer, fetched.get(peer), failed.get(peer), fields)
+    for peer, reason in failed.items():
+        print(f"❌ Could not fetch data for {peer}: {reason}")
+    if skipped:
+        print(f"⏭️ Skipped {len(skipped)} peers known to be missing: {', '.join(skipped)}")
+    if failures is not None:
+        failures.update(failed)
+        failures.update(skipped)
+    # Yahoo's multiples mix currencies for pence-quoted and foreign-reporting peers
+    infos = convert_infos(infos)
+    return peer_multiples_from_infos([infos[p] for p in tickers if p in infos], multiples)
+
+
+def peer_multiples_from_infos(infos: List[Dict], multiples: List[str]) -> Dict[str, List[float]]:
+    """Selected multiples of already fetched peer `info` dicts, as a dict of lists."""
     data: Dict[str, List[float]] = {m: [] for m in multiples}
-    for peer in tickers:
-        try:
-            info = yf.Ticker(peer).info
-        except Exception:
-            continue
+    for info in infos:
         if "P/E" in multiples:
             val = safe_get(info, "trailingPE")
             if val:
@@ -158,6 +222,8 @@ def collect_peer_multiples(tickers: List[str], multiples: List[str]) -> Dict[str
     return data
 
 
+@memoize(["sharesOutstanding", "trailingEps", "totalRevenue", "ebitda", "totalDebt", "cash"],
+         depends=["src.valuation.utility_helpers"])
 def apply_comps(target_info: Dict, avg_multiples: Dict[str, float]) -> Dict[str, float]:
     """Return implied price per share for each multiple (where possible)."""
     implied_prices: Dict[str, float] = {}
@@ -188,9 +254,102 @@ def apply_comps(target_info: Dict, avg_multiples: Dict[str, float]) -> Dict[str,
     return implied_prices
 
 
-def ticket_info(symbol):
-    ticker = yf.Ticker(symbol)
-    return ticker.info
+# Seconds after which comparable valuation finishes with the peers that answered
+COMPS_DEADLINE = 10.0
+
+
+class CompsProgress(NamedTuple):
+    """Running state of a progressive comparable valuation."""
+    implied: Dict[str, float]          # implied price per multiple
+    averages: Dict[str, float]         # running average of each multiple
+    counts: Dict[str, int]             # peers contributing to each average
+    peers: int                         # peers answered so far (with or without usable multiples)
+    total: int                         # peers asked for
+    elapsed: float
+    late: List[str]                    # peers dropped at the deadline (final update only)
+    done: bool
+
+
+def progressive_comps(target_info: Dict,
+                      tickers: List[str],
+                      multiples: List[str],
+                      deadline: Optional[float] = COMPS_DEADLINE,
+                      failures: Optional[Dict[str, str]] = None) -> Iterator[CompsProgress]:
+    """
+    Comparable valuation that streams: peers already held by a shared handle are used at once,
+    the others are fetched in parallel and each one updates the running averages and implied
+    prices as it arrives. After `deadline` seconds (None: wait for all) the remaining fetches are
+    cancelled and the last update, with `done` set, covers the peers that made it.
+    Averages are those of `collect_peer_multiples` over the same peers.
+    """
+    start = time.monotonic()
+    sums: Dict[str, float] = {m: 0.0 for m in multiples}
+    counts: Dict[str, int] = {m: 0 for m in multiples}
+    answered = 0
+
+    def add(infos: Dict[str, Dict]) -> None:
+        nonlocal answered
+        answered += len(infos)
+        # Yahoo's multiples mix currencies for pence-quoted and foreign-reporting peers
+        for m, values in peer_multiples_from_infos(list(convert_infos(infos).values()), multiples).items():
+            sums[m] += sum(values)
+            counts[m] += len(values)
+
+    def update(done: bool, late: List[str]) -> CompsProgress:
+        averages = {m: sums[m] / counts[m] for m in multiples if counts[m]}
+        # Intermediate averages are not worth a cache entry each
+        implied = (apply_comps if done else apply_comps.uncached)(target_info, averages) if averages else {}
+        return CompsProgress(implied, averages, {m: c for m, c in counts.items() if c}, answered, len(tickers),
+                             time.monotonic() - start, late, done)
+
+    warm, missing = loaded_infos(tickers)
+    if warm:
+        add(warm)
+        yield update(not missing, [])
+    if not missing:
+        if not warm:
+            yield update(True, [])
+        return
+
+    fields = [MULTIPLE_FIELDS[m] for m in multiples if m in MULTIPLE_FIELDS]
+    missing, skipped = skip_known_missing(missing, fields)
+    if skipped:
+        print(f"⏭️ Skipped {len(skipped)} peers known to be missing: {', '.join(skipped)}")
+        if failures is not None:
+            failures.update(skipped)
+    scheduler = get_scheduler()
+    futures = {scheduler.fetch_info(peer, Priority.PEER): peer for peer in missing}
+    pending = set(futures)
+    try:
+        for future in as_completed(futures, timeout=None if deadline is None else max(0.0, deadline - (
+                time.monotonic() - start))):
+            pending.discard(future)
+            peer = futures[future]
+            try:
+                info = future.result() or {}
+            except Exception as e:
+                reason = getattr(e, "reason", str(e))
+                print(f"❌ Could not fetch data for {peer}: {reason}")
+                record_fetch(peer, reason=reason)
+                if failures is not None:
+                    failures[peer] = reason
+                continue
+            record_fetch(peer, info, fields=fields)
+            add({peer: info})
+            if pending:
+                yield update(False, [])
+    except FutureTimeout:
+        for future in pending:
+            future.cancel()
+    late = [futures[f] for f in futures if f in pending]
+    if failures is not None:
+        failures.update({peer: f"no answer within {deadline:.0f}s" for peer in late})
+    yield update(True, late)
+
+
+def ticket_info(symbol: Union[str, TickerHandle], priority: Priority = Priority.TARGET):
+    # A symbol goes through its shared handle, so later statement or dividend lookups reuse it
+    return as_handle(symbol, priority).info
 
 
 def rule_of_40(revenue_growth_rate: float, profitability_margin: float) -> dict:
@@ -218,31 +377,6 @@ def rule_of_40(revenue_growth_rate: float, profitability_margin: float) -> dict:
     }
 
 
-def calculate_pegy(ticker_symbol, info):
-    pe_ratio = info.get("trailingPE")
-    earnings_growth = info.get("earningsQuarterlyGrowth")
-    dividend_yield = info.get("dividendYield")
-
-    print(f"\n🔍 PEGY Data:")
-    print(f"  P/E Ratio: {pe_ratio}")
-    print(f"  Earnings Growth: {earnings_growth}")
-    print(f"  Dividend Yield: {dividend_yield}")
-
-    if pe_ratio is None or earnings_growth is None or dividend_yield is None:
-        print("❌ Missing one or more required data points. Cannot calculate PEGY.")
-        return
-
-    dividend_yield_percent = dividend_yield * 100
-    earnings_growth_percent = earnings_growth * 100
-
-    if (earnings_growth_percent + dividend_yield_percent) == 0:
-        print("❌ Invalid denominator (growth + dividend is zero).")
-        return
-
-    pegy = pe_ratio / (earnings_growth_percent + dividend_yield_percent)
-    print(f"📊 PEGY Ratio: {pegy:.2f}")
-
-
 def calculate_dcf(ticker_symbol, info):
     fcf = info.get("freeCashflow")
     shares_outstanding = info.get("sharesOutstanding")
@@ -305,15 +439,14 @@ def calculate_comparables(target_symbol, target_info):
 
     print(f"\n🔍 Fetching data for peers: {', '.join(peer_tickers)}")
 
-    for peer in peer_tickers:
-        try:
-            peer_info = yf.Ticker(peer).info
-            peer_pe = peer_info.get("trailingPE")
-            peer_ps = peer_info.get("priceToSalesTrailing12Months")
-            if peer_pe: peer_pe_ratios.append(peer_pe)
-            if peer_ps: peer_ps_ratios.append(peer_ps)
-        except Exception as e:
-            print(f"❌ Could not fetch data for {peer}: {e}")
+    peer_infos, failures = get_scheduler().fetch_infos(peer_tickers, Priority.PEER)
+    for peer, reason in failures.items():
+        print(f"❌ Could not fetch data for {peer}: {reason}")
+    for peer_info in peer_infos.values():
+        peer_pe = peer_info.get("trailingPE")
+        peer_ps = peer_info.get("priceToSalesTrailing12Months")
+        if peer_pe: peer_pe_ratios.append(peer_pe)
+        if peer_ps: peer_ps_ratios.append(peer_ps)
 
     if not peer_pe_ratios and not peer_ps_ratios:
         print("❌ Not enough peer data for comparison.")
@@ -347,7 +480,7 @@ def calculate_comparables(target_symbol, target_info):
 import yfinance as yf
 
 
-def dcf_intrinsic_value(ticker: str,
+def dcf_intrinsic_value(ticker: Union[str, TickerHandle],
                         discount_rate=0.08,
                         terminal_growth_rate=0.03,
                         fcf_growth_rate=0.10,
@@ -355,7 +488,7 @@ def dcf_intrinsic_value(ticker: str,
     """
     Calculates intrinsic value per share using a traditional DCF model.
 
-    :param ticker: Stock ticker symbol (e.g., "AAPL")
+    :param ticker: Stock ticker symbol (e.g., "AAPL") or its TickerHandle
     :param discount_rate: Discount rate (WACC) in decimal form
     :param terminal_growth_rate: Long-term growth rate in decimal form
     :param fcf_growth_rate: Growth rate of FCF during forecast period
@@ -363,14 +496,23 @@ def dcf_intrinsic_value(ticker: str,
     :return: Intrinsic value per share
     """
 
-    # Download financial data
-    stock = yf.Ticker(ticker)
-    shares_outstanding = stock.info.get("sharesOutstanding", None)
-    cash = stock.info.get("totalCash", 0)
-    debt = stock.info.get("totalDebt", 0)
+    # Financial data and historical cash flow, downloaded once per handle
+    stock = as_handle(ticker)
+    return dcf_intrinsic_value_from(stock.info, stock.cashflow, discount_rate, terminal_growth_rate, fcf_growth_rate,
+                                    forecast_years)
+
+
+def dcf_intrinsic_value_from(info: Dict,
+                             cashflow,
+                             discount_rate=0.08,
+                             terminal_growth_rate=0.03,
+                             fcf_growth_rate=0.10,
+                             forecast_years=5):
+    """`dcf_intrinsic_value` on already fetched `info` and `cashflow` statement."""
+    shares_outstanding = info.get("sharesOutstanding", None)
+    cash = info.get("totalCash", 0)
+    debt = info.get("totalDebt", 0)
 
-    # Get historical cash flow data
-    cashflow = stock.cashflow
     if "Free Cash Flow" not in cashflow.index or "Capital Expenditure" not in cashflow.index:
         raise ValueError("Cash flow data not available for this ticker.")
 
@@ -405,17 +547,16 @@ def check_dividends_and_ddm(ticker, discount_rate=0.10, growth_rate=None):
     Checks if a company pays dividends and calculates the Dividend Discount Model (DDM) value using the Gordon Growth Model.
 
     Parameters:
-    - ticker: str, the stock ticker symbol (e.g., 'AAPL')
+    - ticker: str or TickerHandle, the stock ticker symbol (e.g., 'AAPL')
     - discount_rate: float, the required rate of return (default: 10% or 0.10)
     - growth_rate: float or None, the expected dividend growth rate. If None, it will be calculated from historical data.
 
     Returns:
     - A string with the result: whether it pays dividends and the estimated stock price if applicable.
     """
-    # Fetch stock data
-    stock = yf.Ticker(ticker)
-
-    # Get dividend history
+    # Get dividend history (shared with the other functions given the same handle)
+    stock = as_handle(ticker)
+    ticker = stock.symbol
     dividends = stock.dividends
 
     if dividends.empty:
@@ -424,21 +565,28 @@ def check_dividends_and_ddm(ticker, discount_rate=0.10, growth_rate=None):
     print(f"The company {ticker} pays dividends.")
 
     # Resample to annual dividends (sum quarterly/semi-annual dividends per year)
-    annual_dividends = dividends.resample('Y').sum()
+    annual_dividends = dividends.groupby(dividends.index.year).sum()
 
     if len(annual_dividends) < 2:
         return "Not enough historical dividend data to perform DDM analysis."
 
-    # Calculate historical growth rate if not provided
+    # Calculate historical growth rate if not provided: a robust trend over the completed years,
+    # falling back to the average year-on-year change when the trend does not fit
     if growth_rate is None:
-        growth_rates = annual_dividends.pct_change().dropna()
-        if growth_rates.empty:
-            return "Unable to calculate growth rate from historical data."
-        growth_rate = growth_rates.mean()
-        print(f"Calculated average dividend growth rate: {growth_rate:.4f} ({growth_rate * 100:.2f}%)")
+        trend = default_growth({"dividends": yearly_dividends(dividends)}, "dividends", "theil_sen")
+        if trend:
+            growth_rate = trend["growth"]
+            print(f"Dividend trend growth rate: {growth_rate:.4f} ({growth_rate * 100:.2f}%, "
+                  f"R² {trend['r2']:.2f} over {trend['points']} years)")
+        else:
+            growth_rates = annual_dividends.pct_change().dropna()
+            if growth_rates.empty:
+                return "Unable to calculate growth rate from historical data."
+            growth_rate = growth_rates.mean()
+            print(f"Calculated average dividend growth rate: {growth_rate:.4f} ({growth_rate * 100:.2f}%)")
 
     # Last annual dividend
-    last_annual_div = annual_dividends[-1]
+    last_annual_div = annual_dividends.iloc[-1]
 
     # Next year's expected dividend
     d1 = last_annual_div * (1 + growth_rate)
@@ -494,9 +642,8 @@ def dcf_valuation(
 
 
 def print_ticker_current_value(symbol):
-    ticker = yf.Ticker(symbol)
-    info = ticker.info
+    info = ticket_info(symbol)
     price = info.get("currentPrice")
     print(
-        f"\n💵 Current Market Price for {symbol.upper()}: ${price:.2f}" if price else "⚠️ Current price not available.")
+        f"\n💵 Current Market Price for {str(symbol).upper()}: ${price:.2f}" if price else "⚠️ Current price not available.")
     return info
@@ -0,0 +1,24 @@
+import pytest
+
+from src.valuation import data_dir, fx, price_history, result_cache, symbols
+
+
+@pytest.fixture(autouse=True)
+def tmp_data_dir(tmp_path, monkeypatch):
+    """Every local cache of a test lives in its tmp dir instead of the working directory."""
+    monkeypatch.setenv(data_dir.DATA_DIR_ENV, str(tmp_path))
+    monkeypatch.delenv(result_cache.RESULT_CACHE_ENV, raising=False)
+    monkeypatch.delenv(symbols.NEGATIVE_CACHE_ENV, raising=False)
+    monkeypatch.setattr(result_cache, "_default_cache", None)
+    monkeypatch.setattr(symbols, "_default_cache", None)
+    monkeypatch.setattr(price_history, "_default_history", None)
+    yield
+    for cache in (result_cache._default_cache, symbols._default_cache):
+        if cache is not None:
+            cache.close()
+
+
+@pytest.fixture(autouse=True)
+def offline_fx_rates(tmp_data_dir, monkeypatch):
+    """Default FX rate store in the test's data dir, with no rate downloads."""
+    monkeypatch.setattr(fx, "_default_rates", fx.FxRates(fetch=lambda c, d: {}))
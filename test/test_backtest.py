@@ -0,0 +1,31 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from src.valuation.backtest import forward_returns, run_backtest
+from src.valuation.snapshot_file import write_dated_snapshot
+
+
+def test_forward_returns():
+    dates = [datetime.date(2024, 1, 1), datetime.date(2024, 7, 1), datetime.date(2025, 1, 2)]
+    prices = np.array([[10.0, 20.0], [12.0, np.nan], [15.0, 10.0]])
+    returns = forward_returns(dates, prices, 365)
+    assert returns[0] == pytest.approx([0.5, -0.5])
+    assert np.isnan(returns[1]).all() and np.isnan(returns[2]).all()
+
+
+def test_run_backtest(tmp_path):
+    cheap = {"trailingPE": 10.0, "enterpriseToEbitda": 5.0, "returnOnEquity": 0.3}
+    rich = {"trailingPE": 80.0, "enterpriseToEbitda": 30.0, "returnOnEquity": -0.1}
+    for year, (cheap_price, rich_price) in zip((2020, 2021, 2022), ((10, 10), (15, 9), (20, 8))):
+        write_dated_snapshot(str(tmp_path), datetime.date(year, 1, 1), {
+            "CHEAP": {**cheap, "currentPrice": cheap_price},
+            "RICH": {**rich, "currentPrice": rich_price},
+            "NEW": {**cheap, "currentPrice": 5} if year == 2022 else {},
+        })
+    result = run_backtest(str(tmp_path), horizon_days=365)
+    by_bucket = result["by_score_bucket"]
+    assert by_bucket["observations"].sum() == 4
+    assert by_bucket["mean_return"].iloc[-1] > 0 > by_bucket["mean_return"].iloc[0]
+    assert result["by_category"].loc["Other", "observations"] == 4
@@ -0,0 +1,92 @@
+import csv
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.valuation.cost_basis import FifoLedger, Trade, iter_ibkr_trades, merge_trades, realized_pnl, time_key
+
+HEADER = ["Symbol", "Date/Time", "Quantity", "Price", "Commission", "Buy/Sell", "CurrencyPrimary"]
+
+
+def write_export(path, rows):
+    with open(path, "w", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(HEADER)
+        writer.writerows(rows)
+
+
+def test_fifo_closes_oldest_lots_with_commissions():
+    ledger = FifoLedger()
+    assert ledger.add(Trade("AAPL", "1", 10, 100.0, 1.0)) == []
+    assert ledger.add(Trade("AAPL", "2", 10, 110.0, 1.0)) == []
+    closed = ledger.add(Trade("AAPL", "3", -15, 120.0, 1.5))
+
+    assert [(lot.opened, lot.quantity) for lot in closed] == [("1", 10), ("2", 5)]
+    assert closed[0].commission == pytest.approx(1.0 + 1.0)
+    assert closed[0].realized_pnl == pytest.approx(10 * 20 - 2.0)
+    assert closed[1].realized_pnl == pytest.approx(5 * 10 - 0.5 - 0.5)
+    [lot] = ledger.open_lots()
+    assert (lot.opened, lot.quantity, lot.commission) == ("2", 5, pytest.approx(0.5))
+    assert lot.cost_basis == pytest.approx(5 * 110 + 0.5)
+
+    summary = ledger.summary().loc["AAPL"]
+    assert summary["realized_pnl"] == pytest.approx(198 + 49)
+    assert summary["commission"] == pytest.approx(3.5)
+    assert summary["open_quantity"] == 5
+
+
+def test_sell_through_zero_opens_a_short():
+    ledger = FifoLedger()
+    ledger.add(Trade("X", "1", 5, 10.0, 0.0))
+    assert [lot.quantity for lot in ledger.add(Trade("X", "2", -8, 12.0, 0.0))] == [5]
+    [short] = ledger.open_lots()
+    assert short.quantity == -3
+    [cover] = ledger.add(Trade("X", "3", 3, 9.0, 0.0))
+    assert cover.quantity == -3 and cover.realized_pnl == pytest.approx(9.0)
+    assert ledger.open_lots() == []
+
+
+def test_out_of_order_trades_are_rejected_and_streams_merge():
+    ledger = FifoLedger()
+    ledger.add(Trade("X", time_key("2024-01-02,1000 UTC"), 1, 1.0, 0.0))
+    with pytest.raises(ValueError):
+        ledger.add(Trade("X", time_key("2024-01-01,1000 UTC"), 1, 1.0, 0.0))
+
+    first = [Trade("X", "1", 1, 1.0, 0.0), Trade("X", "3", 1, 1.0, 0.0)]
+    second = [Trade("X", "2", -1, 2.0, 0.0)]
+    assert [t.time for t in merge_trades(first, second)] == ["1", "2", "3"]
+
+
+def test_export_is_parsed_like_positions(tmp_path):
+    path = tmp_path / "trades.csv"
+    write_export(path, [["AAPL", "2024-01-01,1000 UTC", 10, 100, -1, "BUY", "USD"],
+                        ["AAPL", "2024-01-02,1000 UTC", -4, 120, -1, "SELL", "USD"],
+                        ["AAPL", "2024-01-03,1000 UTC", 2, 130, -1, "SELL", "USD"]])
+    trades = list(iter_ibkr_trades(str(path)))
+    assert [t.quantity for t in trades] == [10, -4, -2]
+    assert trades[0].commission == 1 and trades[0].time == "20240101100000"
+
+
+def test_parallel_matches_serial(tmp_path):
+    rng = np.random.default_rng(3)
+    rows, held = [], {}
+    for i in range(3000):
+        symbol = f"S{rng.integers(20)}"
+        quantity = int(rng.integers(1, 50))
+        side = "SELL" if held.get(symbol, 0) >= quantity and rng.random() < 0.5 else "BUY"
+        held[symbol] = held.get(symbol, 0) + (quantity if side == "BUY" else -quantity)
+        rows.append([symbol, f"2024-01-01,{i:06d}", quantity, round(rng.uniform(10, 100), 2), -1, side, "USD"])
+    path = tmp_path / "trades.csv"
+    write_export(path, rows)
+
+    summary, lots = realized_pnl(str(path), str(tmp_path / "serial.csv"))
+    parallel_summary, parallel_lots = realized_pnl(str(path), str(tmp_path / "parallel.csv"), workers=3)
+    pd.testing.assert_frame_equal(summary, parallel_summary)
+    pd.testing.assert_frame_equal(lots, parallel_lots)
+    assert lots.groupby("symbol")["quantity"].sum().to_dict() == {s: q for s, q in held.items() if q > 0}
+
+    serial_closed = pd.read_csv(tmp_path / "serial.csv").sort_values(["symbol", "closed", "opened"])
+    parallel_closed = pd.read_csv(tmp_path / "parallel.csv").sort_values(["symbol", "closed", "opened"])
+    pd.testing.assert_frame_equal(serial_closed.reset_index(drop=True), parallel_closed.reset_index(drop=True))
+    assert serial_closed["realized_pnl"].sum() == pytest.approx(summary["realized_pnl"].sum())
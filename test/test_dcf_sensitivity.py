@@ -0,0 +1,48 @@
+import numpy as np
+import pytest
+
+from src.valuation.dcf_vectorized import dcf_per_share, dcf_sensitivities
+from src.valuation.reporting import export_report
+from src.valuation.yfinance_api import calculate_dcf_v2, dcf_sensitivity
+
+FCF = np.array([1e9, -5e8, 2e9, 3e8])
+SHARES = np.array([1e8, 2e8, 5e7, 1e8])
+# The last ticker has growth == discount rate (q == 1)
+GROWTH = np.array([0.08, 0.10, 0.25, 0.10])
+RATE = np.array([0.10, 0.09, 0.11, 0.10])
+
+
+def value(**changes):
+    inputs = {"fcf": FCF, "shares_out": SHARES, "growth_rate": GROWTH, "years": 5, "discount_rate": RATE,
+              "terminal_growth": 0.03, **changes}
+    return dcf_per_share(**inputs)["intrinsic_per_share"]
+
+
+def central_difference(name, base, h):
+    return (value(**{name: base + h}) - value(**{name: base - h})) / (2 * h)
+
+
+def test_greeks_match_finite_differences():
+    greeks = dcf_sensitivities(FCF, SHARES, GROWTH, 5, RATE, 0.03)
+    assert greeks["intrinsic_per_share"] == pytest.approx(value())
+    # Steps stay outside the q == 1 tolerance band of dcf_per_share
+    assert greeks["d_growth"] == pytest.approx(central_difference("growth_rate", GROWTH, 1e-4), rel=1e-5)
+    assert greeks["d_discount_rate"] == pytest.approx(central_difference("discount_rate", RATE, 1e-4), rel=1e-5)
+    assert greeks["d_terminal_growth"] == pytest.approx(central_difference("terminal_growth", 0.03, 1e-4), rel=1e-5)
+    assert greeks["d_fcf"] == pytest.approx(central_difference("fcf", FCF, 1e3), rel=1e-6)
+
+
+def test_sensitivity_of_one_info_and_report(tmp_path):
+    info = {"freeCashflow": 1e9, "sharesOutstanding": 1e8, "earningsGrowth": 0.08}
+    dcf = calculate_dcf_v2(info, 0.0)
+    sensitivity = dcf_sensitivity(info, 0.0)
+    assert sensitivity["intrinsic_per_share"] == pytest.approx(dcf["intrinsic_per_share"])
+    assert sensitivity["growth_rate"] == 0.08
+    assert sensitivity["d_discount_rate"] < 0 < sensitivity["d_growth"]
+    assert dcf_sensitivity({"freeCashflow": 1e9}, 0.0) is None
+
+    path = tmp_path / "report.txt"
+    export_report(str(path), "TEST", 150.0, None, dcf, {}, {}, {}, sensitivity)
+    report = path.read_text(encoding="utf-8")
+    assert "DCF sensitivity" in report
+    assert "Discount rate" in report and "-$26.55" in report
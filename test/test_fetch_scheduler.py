@@ -0,0 +1,88 @@
+import threading
+
+import pytest
+
+from src.valuation.fetch_scheduler import FetchScheduler, FetchError, Priority, CircuitBreaker, is_throttling_error
+
+
+class YFRateLimitError(Exception):
+    pass
+
+
+def test_priorities_run_target_first():
+    scheduler = FetchScheduler(rate=1000, burst=1000, workers=1)
+    gate = threading.Event()
+    order = []
+    # keep the single worker busy while the queue fills up
+    blocker = scheduler.submit("block", gate.wait)
+    futures = [scheduler.submit(name, lambda name=name: order.append(name), priority)
+               for name, priority in [("bg", Priority.BACKGROUND), ("peer", Priority.PEER),
+                                      ("target", Priority.TARGET)]]
+    gate.set()
+    blocker.result(timeout=5)
+    for future in futures:
+        future.result(timeout=5)
+    assert order == ["target", "peer", "bg"]
+    scheduler.close()
+
+
+class HTTPError(Exception):
+    def __init__(self, message, status_code):
+        super().__init__(message)
+        self.response = type("Response", (), {"status_code": status_code})()
+
+
+def test_throttling_is_recognised_by_status_not_by_any_429():
+    assert is_throttling_error(YFRateLimitError("Rate limited. Try after a while."))
+    assert is_throttling_error(HTTPError("Client Error", 429))
+    assert not is_throttling_error(HTTPError("Not Found for url: https://x/v7/429", 404))
+    assert is_throttling_error(Exception("HTTP Error 429: Too Many Requests"))
+    assert is_throttling_error(Exception("status code 429"))
+    assert not is_throttling_error(Exception("No data found for symbol 6429.T"))
+    assert not is_throttling_error(Exception("price 429.5 outside range"))
+    assert not is_throttling_error(KeyError("429"))
+
+
+def test_throttled_requests_are_retried():
+    scheduler = FetchScheduler(rate=1000, burst=1000, workers=2, backoff_base=0.01,
+                               breaker=CircuitBreaker(threshold=100))
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise YFRateLimitError("Too Many Requests. Rate limited. Try after a while.")
+        return {"trailingPE": 10}
+
+    assert scheduler.call("AAA", flaky) == {"trailingPE": 10}
+    assert len(attempts) == 3
+    assert scheduler.stats["retried"] == 2
+    scheduler.close()
+
+
+def test_failures_are_reported():
+    scheduler = FetchScheduler(rate=1000, burst=1000, workers=2, max_retries=1, backoff_base=0.01,
+                               breaker=CircuitBreaker(threshold=100))
+
+    def broken():
+        raise KeyError("delisted")
+
+    def throttled():
+        raise RuntimeError("HTTP Error 429")
+
+    with pytest.raises(FetchError) as error:
+        scheduler.call("BBB", broken)
+    assert not error.value.throttled
+    with pytest.raises(FetchError) as error:
+        scheduler.call("CCC", throttled)
+    assert error.value.throttled and error.value.key == "CCC"
+    scheduler.close()
+
+
+def test_circuit_breaker_opens_on_error_spike():
+    breaker = CircuitBreaker(threshold=3, window=10, cooldown=30)
+    breaker.record_failure()
+    breaker.record_failure()
+    assert not breaker.is_open
+    breaker.record_failure()
+    assert breaker.is_open
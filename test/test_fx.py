@@ -0,0 +1,88 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts.portfolio_valuation import value_portfolio
+from src.valuation.fx import FxRates, convert_infos, currency_unit
+from src.valuation.yfinance_api import apply_comps, peer_multiples_from_infos
+
+DAY = datetime.date(2025, 1, 2)
+USD_PER_UNIT = {"EUR": 1.10, "GBP": 1.25, "DKK": 0.15}
+
+
+def fake_rates(tmp_path, calls):
+    def fetch(currencies, date):
+        calls.append(sorted(currencies))
+        return {c: USD_PER_UNIT[c] for c in currencies if c in USD_PER_UNIT}
+    return FxRates(str(tmp_path / "fx.db"), fetch=fetch)
+
+
+def test_rates_are_fetched_once_per_day_and_cached(tmp_path):
+    calls = []
+    rates = fake_rates(tmp_path, calls)
+    factors = rates.factors(["GBp", "EUR", "USD", "GBp", None, "XYZ"], "EUR", DAY)
+    assert factors == pytest.approx([1.25 / 1.10 / 100, 1.0, 1 / 1.10, 1.25 / 1.10 / 100, 1.0, np.nan], nan_ok=True)
+    assert calls == [["EUR", "GBP", "XYZ"]]
+
+    rates.factors(["GBp", "EUR"], "USD", DAY)
+    assert len(calls) == 1
+    reopened = FxRates(str(tmp_path / "fx.db"), fetch=lambda c, d: pytest.fail("rate should be cached"))
+    assert reopened.convert([200.0], ["GBP"], "USD", DAY) == pytest.approx([250.0])
+
+
+def test_unknown_currencies_are_not_refetched_and_local_conversions_skip_the_store(tmp_path):
+    calls = []
+    rates = fake_rates(tmp_path, calls)
+    rates.factors(["XYZ"], "USD", DAY)
+    assert np.isnan(rates.factors(["XYZ", "USD"], "USD", DAY)[0])
+    assert calls == [["XYZ"]]
+
+    local = FxRates(str(tmp_path / "local.db"), fetch=lambda c, d: pytest.fail("no rate needed"))
+    converted = convert_infos({"BME.L": {"currency": "GBp", "currentPrice": 240.0}}, rates=local, date=DAY)
+    assert converted["BME.L"]["currentPrice"] == pytest.approx(2.40)
+    assert not (tmp_path / "local.db").exists()
+
+
+def test_pence_and_foreign_reporting_are_normalised(tmp_path):
+    calls = []
+    rates = fake_rates(tmp_path, calls)
+    infos = {
+        # pence-quoted: Yahoo's P/E divides a price in pence by an EPS in pounds
+        "BME.L": {"currency": "GBp", "financialCurrency": "GBP", "currentPrice": 240.0, "trailingEps": 0.16,
+                  "trailingPE": 1500.0, "marketCap": 2.4e9, "totalRevenue": 5.8e9, "sharesOutstanding": 1e9},
+        # USD-listed, reporting in DKK
+        "NVO": {"currency": "USD", "financialCurrency": "DKK", "currentPrice": 90.0, "marketCap": 4e11,
+                "totalRevenue": 2.3e12, "priceToSalesTrailing12Months": 0.17, "enterpriseValue": 4.1e11,
+                "ebitda": 1.2e12, "enterpriseToEbitda": 0.34},
+        "AAPL": {"currency": "USD", "currentPrice": 200.0, "trailingPE": 30.0},
+    }
+    converted = convert_infos(infos, rates=rates, date=DAY)
+    assert converted["BME.L"]["currentPrice"] == pytest.approx(2.40)
+    assert converted["BME.L"]["currency"] == "GBP"
+    assert converted["BME.L"]["trailingPE"] == pytest.approx(15.0)
+    assert converted["NVO"]["totalRevenue"] == pytest.approx(2.3e12 * 0.15)
+    assert converted["NVO"]["priceToSalesTrailing12Months"] == pytest.approx(4e11 / (2.3e12 * 0.15))
+    assert converted["AAPL"] == {**infos["AAPL"], "currency": "USD", "financialCurrency": "USD"}
+    assert calls == [["DKK"]]
+
+    multiples = peer_multiples_from_infos(list(converted.values()), ["P/E"])
+    assert multiples["P/E"] == pytest.approx([15.0, 30.0])
+    implied = apply_comps(converted["BME.L"], {"P/E": 15.0})
+    assert implied["P/E"] == pytest.approx(2.40)
+
+
+def test_portfolio_totals_in_base_currency(tmp_path):
+    rates = fake_rates(tmp_path, [])
+    positions = pd.DataFrame({"net_quantity": [10.0, 100.0], "net_cost": [1000.0, 200.0], "commission": [1.0, 1.0],
+                              "trades": [1, 1], "currency": ["EUR", "GBP"]}, index=["SAP.DE", "BME.L"])
+    positions["cost_basis"] = positions["net_cost"]
+    positions["avg_cost"] = positions["cost_basis"] / positions["net_quantity"]
+    infos = {"SAP.DE": {"currency": "EUR", "currentPrice": 120.0},
+             "BME.L": {"currency": "GBp"}}
+    table, totals = value_portfolio(positions, infos, {"BME.L": 250.0}, base_currency="USD", rates=rates)
+    assert table.loc["BME.L", "price"] == pytest.approx(2.50)
+    assert totals["market_value"] == pytest.approx(10 * 120 * 1.10 + 100 * 2.50 * 1.25)
+    assert totals["cost"] == pytest.approx(1000 * 1.10 + 200 * 1.25)
+    assert currency_unit("ZAc") == ("ZAR", 100.0)
@@ -0,0 +1,69 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.valuation.growth import default_growth, estimate_growth, fit_log_linear, growth_table, history_matrix, \
+    statement_row, yearly_dividends
+
+
+def test_batched_fit_matches_polyfit_per_ticker():
+    rng = np.random.default_rng(0)
+    values = 100 * np.exp(np.cumsum(rng.normal(0.05, 0.1, (50, 6)), axis=1))
+    values[3, 0] = np.nan
+    values[4, 2] = -10.0  # a loss year is left out of the log fit
+    fit = fit_log_linear(values)
+    for i in (0, 3, 4):
+        valid = np.isfinite(values[i]) & (values[i] > 0)
+        slope, intercept = np.polyfit(np.arange(6)[valid], np.log(values[i][valid]), 1)
+        assert fit["slope"][i] == pytest.approx(slope)
+        assert fit["intercept"][i] == pytest.approx(intercept)
+    assert list(fit["points"][[0, 3, 4]]) == [6, 5, 5]
+
+
+def test_growth_and_fit_quality():
+    exact = 50 * 1.08 ** np.arange(5)
+    noisy = exact * np.array([1.0, 1.3, 0.7, 1.25, 0.8])
+    short = [np.nan, np.nan, np.nan, 10.0, 12.0]
+    table = estimate_growth(np.vstack([exact, noisy, short]))
+    assert table.loc[0, "growth"] == pytest.approx(0.08)
+    assert table.loc[0, "r2"] == pytest.approx(1.0) and table.loc[0, "reliable"]
+    assert table.loc[1, "r2"] < 0.5 and not table.loc[1, "reliable"]
+    assert np.isnan(table.loc[2, "growth"]) and table.loc[2, "points"] == 2
+
+
+def test_theil_sen_ignores_a_special_dividend():
+    dividends = 1.0 * 1.05 ** np.arange(8)
+    dividends[5] *= 3
+    assert estimate_growth(dividends, "theil_sen").loc[0, "growth"] == pytest.approx(0.05)
+    assert estimate_growth(dividends, "log_linear").loc[0, "growth"] > 0.08
+    with pytest.raises(ValueError):
+        estimate_growth(dividends, "cubic")
+
+
+def test_universe_table_and_defaults():
+    histories = {
+        "AAA": {"fcf": [100, 110, 121, 133.1], "revenue": [1000, 1050, 1102.5, 1157.625]},
+        "BBB": {"fcf": [-5, 3], "dividends": [1.0, 1.1, 1.21]},
+    }
+    table = growth_table(histories, ["fcf", "revenue", "dividends"])
+    assert table.loc["AAA", "fcf_growth"] == pytest.approx(0.10)
+    assert table.loc["AAA", "revenue_growth"] == pytest.approx(0.05)
+    assert table.loc["BBB", "dividends_growth"] == pytest.approx(0.10)
+    assert not table.loc["BBB", "fcf_reliable"]
+
+    assert default_growth(histories["AAA"])["growth"] == pytest.approx(0.10)
+    assert default_growth(histories["BBB"]) is None
+    assert history_matrix({"A": [1, 2, 3, 4, 5]}, 3)[1].tolist() == [[3, 4, 5]]
+
+
+def test_statement_and_dividend_history():
+    statement = pd.DataFrame({pd.Timestamp("2024-12-31"): [130.0], pd.Timestamp("2023-12-31"): [120.0],
+                              pd.Timestamp("2022-12-31"): [110.0]}, index=["Free Cash Flow"])
+    assert statement_row(statement, "Free Cash Flow").tolist() == [110.0, 120.0, 130.0]
+    assert statement_row(statement, "Total Revenue").size == 0
+
+    dates = pd.to_datetime(["2022-03-01", "2022-09-01", "2023-03-01", "2023-09-01", "2024-03-01"])
+    dividends = pd.Series([0.5, 0.5, 0.55, 0.55, 0.6], index=dates)
+    assert yearly_dividends(dividends, datetime.date(2024, 6, 1)).tolist() == [1.0, 1.1]
@@ -0,0 +1,97 @@
+import csv
+import os
+
+from src.scripts.convert_ibkr_to_yahoo_finance_trade_report import convert_incremental, watch_directory, \
+    ConversionIndex
+
+HEADER = "Symbol,Date/Time,TradeDate,Quantity,Price,Commission,Buy/Sell\n"
+
+
+def trade(i, symbol="AAPL", side="BUY"):
+    return f'{symbol},"2024-01-{1 + i % 28:02d},{1000 + i} UTC",2024-01-{1 + i % 28:02d},{1 + i},{100 + i}.5,-1,{side}\n'
+
+
+def read_output(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+def test_incremental_conversion_appends_only_new_trades(tmp_path):
+    source, output, index = tmp_path / "trades.csv", str(tmp_path / "out.csv"), str(tmp_path / "out.index")
+    source.write_text(HEADER + "".join(trade(i) for i in range(5)))
+
+    assert convert_incremental(str(source), output, index) == 5
+    assert convert_incremental(str(source), output, index) == 0
+
+    with open(source, "a") as f:
+        f.write(trade(5) + trade(6, side="SELL"))
+        f.write("MSFT,\"2024-02-01,1")  # export still being written: incomplete line is left for later
+    assert convert_incremental(str(source), output, index) == 2
+
+    rows = read_output(output)
+    assert len(rows) == 7
+    assert rows[0]["Date"] == "2024/01/01" and rows[-1]["Transaction Type"] == "SELL"
+
+
+def test_overlapping_exports_in_watched_directory(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    output, index = str(tmp_path / "out.csv"), str(tmp_path / "out.index")
+
+    (exports / "day1.csv").write_text(HEADER + "".join(trade(i) for i in range(10)))
+    assert watch_directory(str(exports), output, index, once=True) == 10
+
+    # the next day's export repeats the full history plus two new trades
+    day2 = exports / "day2.csv"
+    day2.write_text(HEADER + "".join(trade(i) for i in range(12)))
+    os.utime(day2, (os.path.getmtime(exports / "day1.csv") + 1,) * 2)
+    assert watch_directory(str(exports), output, index, once=True) == 2
+    assert watch_directory(str(exports), output, index, once=True) == 0
+
+    assert len(read_output(output)) == 12
+    stored = ConversionIndex(index)
+    assert len(stored) == 12
+    stored.close()
+
+
+def test_identical_fills_in_one_file_are_all_converted(tmp_path):
+    exports = tmp_path / "exports"
+    exports.mkdir()
+    output, index = str(tmp_path / "out.csv"), str(tmp_path / "out.index")
+
+    # two partial fills with the same symbol, time, quantity, price and side
+    (exports / "day1.csv").write_text(HEADER + trade(0) + trade(0) + trade(1))
+    assert watch_directory(str(exports), output, index, once=True) == 3
+
+    # an overlapping export repeats both fills and adds a third identical one
+    day2 = exports / "day2.csv"
+    day2.write_text(HEADER + trade(0) + trade(0) + trade(1) + trade(0))
+    os.utime(day2, (os.path.getmtime(exports / "day1.csv") + 1,) * 2)
+    assert watch_directory(str(exports), output, index, once=True) == 1
+
+    # occurrences already read from a file still count when it grows
+    with open(day2, "a") as f:
+        f.write(trade(0))
+    assert convert_incremental(str(day2), output, index) == 1
+    assert len(read_output(output)) == 5
+
+
+def test_execution_ids_identify_trades(tmp_path):
+    source, output, index = tmp_path / "trades.csv", str(tmp_path / "out.csv"), str(tmp_path / "out.index")
+    source.write_text(HEADER.replace("\n", ",IBExecID\n") + trade(0).replace("\n", ",E1\n") +
+                      trade(0).replace("\n", ",E2\n"))
+    assert convert_incremental(str(source), output, index) == 2
+    assert convert_incremental(str(source), output, index) == 0
+
+
+def test_rewritten_export_is_read_again(tmp_path):
+    source, output, index = tmp_path / "trades.csv", str(tmp_path / "out.csv"), str(tmp_path / "out.index")
+    source.write_text(HEADER + "".join(trade(i) for i in range(5)))
+    assert convert_incremental(str(source), output, index) == 5
+
+    # the daily re-export overwrites the file: a trade inserted before the old end and one appended
+    source.write_text(HEADER + trade(0) + trade(10) + "".join(trade(i) for i in range(1, 6)))
+    assert convert_incremental(str(source), output, index) == 2
+    assert convert_incremental(str(source), output, index) == 0
+    rows = read_output(output)
+    assert sorted(int(row["Quantity"]) for row in rows) == [1, 2, 3, 4, 5, 6, 11]
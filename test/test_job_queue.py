@@ -0,0 +1,87 @@
+import io
+import time
+
+import numpy as np
+import pandas as pd
+
+from src.valuation import batch_valuation
+from src.valuation.batch_valuation import distributed_valuation, run_worker, start_local_workers, submit_valuation
+from src.valuation.job_queue import JobQueue
+from src.valuation.parallel import value_snapshot_file
+from src.valuation.snapshot_file import write_snapshot
+from test.test_parallel import random_infos
+
+
+def test_expired_lease_is_retried_and_then_failed(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), lease=0.05, max_attempts=2)
+    [job_id] = queue.submit("b", "noop", [b"{}"])
+
+    first = queue.claim("w1")
+    assert first.id == job_id and first.attempt == 1
+    assert queue.claim("w2") is None
+
+    time.sleep(0.1)
+    second = queue.claim("w2")
+    assert second.id == job_id and second.attempt == 2
+    # The first worker lost its lease: its late result is dropped
+    assert not queue.complete(first, b"late")
+    assert not queue.extend(first)
+
+    time.sleep(0.1)
+    assert queue.claim("w3") is None
+    assert queue.counts("b")["failed"] == 1
+    assert queue.failures("b") == {job_id: "lease expired"}
+
+
+def test_failed_job_is_retried_until_max_attempts(tmp_path):
+    queue = JobQueue(str(tmp_path / "jobs.db"), max_attempts=2)
+    queue.submit("b", "noop", [b"{}"])
+    assert queue.fail(queue.claim("w"), "boom")
+    assert queue.counts("b")["pending"] == 1
+    job = queue.claim("w")
+    assert job.attempt == 2
+    queue.fail(job, "boom again")
+    assert queue.failures("b") == {job.id: "boom again"}
+    assert queue.unfinished("b") == 0
+
+
+def test_worker_runs_jobs_and_reports_results(tmp_path, monkeypatch):
+    path = str(tmp_path / "jobs.db")
+    monkeypatch.setitem(batch_valuation.HANDLERS, "square", lambda payload: str(payload["x"] ** 2).encode())
+    monkeypatch.setitem(batch_valuation.HANDLERS, "explode", lambda payload: 1 / 0)
+    queue = JobQueue(path, max_attempts=2)
+    queue.submit("squares", "square", [b'{"x": 2}', b'{"x": 3}'])
+    queue.submit("bad", "explode", [b"{}"])
+
+    assert run_worker(path, exit_when_drained=True, poll=0.01) == 2
+    assert [r for _, r in queue.results("squares")] == [b"4", b"9"]
+    assert "ZeroDivisionError" in queue.failures("bad")[3]
+    # The retry limit set by the submitter holds for every worker
+    assert queue._db.execute("SELECT attempts FROM jobs WHERE id = 3").fetchone() == (2,)
+
+
+def test_distributed_valuation_matches_single_process(tmp_path):
+    snapshot = str(tmp_path / "universe.bin")
+    write_snapshot(snapshot, random_infos(400, seed=7))
+    queue = JobQueue(str(tmp_path / "jobs.db"))
+
+    table = distributed_valuation(queue, snapshot, shards=7, local_workers=3)
+    expected = value_snapshot_file(snapshot, workers=1)
+
+    pd.testing.assert_frame_equal(table, expected)
+    assert queue.counts() == {"pending": 0, "leased": 0, "done": 0, "failed": 0}
+
+
+def test_workers_share_the_shards(tmp_path):
+    snapshot = str(tmp_path / "universe.bin")
+    write_snapshot(snapshot, random_infos(200, seed=3))
+    path = str(tmp_path / "jobs.db")
+    queue = JobQueue(path)
+    batch = submit_valuation(queue, snapshot, shards=12)
+
+    for process in start_local_workers(path, 3, poll=0.01):
+        process.join()
+    workers = {w for (w,) in queue._db.execute("SELECT worker FROM jobs WHERE batch = ?", (batch,))}
+    assert queue.counts(batch)["done"] == 12
+    assert len(workers) >= 2
+    assert np.hstack([np.load(io.BytesIO(r)) for _, r in queue.results(batch)]).shape[1] == 200
@@ -0,0 +1,77 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.valuation import metrics
+from src.valuation.columnar import snapshot_matrix, as_columns
+from src.valuation.metrics import METRICS, compute_metrics, metrics_frame, metric_values, register, required_fields
+from src.valuation.yfinance_api import calculate_pegy
+from test.test_parallel import random_infos
+
+
+def test_calculate_pegy_uses_registry_semantics():
+    infos = random_infos(200, seed=3)
+    table = metrics_frame(infos, ["pegy", "is_pegy"])
+    for symbol, info in infos.items():
+        result = calculate_pegy(info)
+        if result is None:
+            assert np.isnan(table.loc[symbol, "pegy"])
+        else:
+            assert result["value"] == pytest.approx(table.loc[symbol, "pegy"])
+            assert (result["type"] == "PEGY") == bool(table.loc[symbol, "is_pegy"])
+
+
+def test_metric_values_of_one_info():
+    info = {"trailingPE": 20.0, "earningsGrowth": 0.1, "revenueGrowth": 0.3, "operatingMargins": None}
+    values = metric_values(info, ["peg", "rule_of_40", "meets_rule_of_40", "score_pct"])
+    assert values["peg"] == pytest.approx(2.0)
+    assert values["rule_of_40"] == pytest.approx(30.0)
+    assert values["meets_rule_of_40"] == 0.0
+    assert values["score_pct"] == pytest.approx(80.0)
+
+
+def test_required_fields_follow_dependencies():
+    assert required_fields(["rule_of_40"]) == ["revenueGrowth", "operatingMargins"]
+    fields = required_fields(["score_pct", "pegy"])
+    assert len(fields) == len(set(fields))
+    assert {"trailingPE", "dividendYield", "returnOnEquity"} <= set(fields)
+    with pytest.raises(KeyError):
+        required_fields(["no_such_metric"])
+
+
+def test_registered_metric_is_computed_once_per_pass(monkeypatch):
+    monkeypatch.setattr(metrics, "METRICS", dict(METRICS))
+    calls = []
+
+    @register("earnings_yield", fields=["trailingPE"])
+    def earnings_yield(frame):
+        calls.append(1)
+        return 1 / frame["trailingPE"]
+
+    @register("double_yield", depends=["earnings_yield"])
+    def double_yield(frame):
+        return frame["earnings_yield"] * 2
+
+    with pytest.raises(ValueError):
+        register("earnings_yield")(earnings_yield)
+
+    table = metrics_frame({"A": {"trailingPE": 20.0}, "B": {"trailingPE": 10.0}},
+                          ["earnings_yield", "double_yield"])
+    assert table["double_yield"].tolist() == pytest.approx([0.1, 0.2])
+    assert len(calls) == 1
+
+
+def test_all_metrics_for_10k_tickers_in_one_pass():
+    infos = random_infos(10_000, seed=4)
+    fields = required_fields(METRICS)
+    _, matrix = snapshot_matrix(infos, fields)
+    cols = as_columns(matrix, fields)
+
+    started = time.perf_counter()
+    values = compute_metrics(cols)
+    elapsed = time.perf_counter() - started
+
+    assert len(values) == len(METRICS) >= 30
+    assert all(len(v) == 10_000 for v in values.values())
+    assert elapsed < 5
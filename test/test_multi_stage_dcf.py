@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from src.valuation.dcf_vectorized import dcf_per_share, multi_stage_dcf
+from src.valuation.metrics import metrics_frame
+from src.valuation.reporting import export_report
+from src.valuation.yfinance_api import calculate_multi_stage_dcf
+
+
+def looped_equity(fcf, growth, high_years, fade_years, rate, terminal):
+    # Year-by-year reference of the three stages
+    value, pv, year = fcf, 0.0, 0
+    yearly_growth = [growth] * high_years + [growth + (terminal - growth) * j / fade_years
+                                              for j in range(1, fade_years + 1)]
+    for g in yearly_growth:
+        value *= 1 + g
+        year += 1
+        pv += value / (1 + rate) ** year
+    return pv + value * (1 + terminal) / (rate - terminal) / (1 + rate) ** year
+
+
+def test_multi_stage_matches_year_by_year_projection():
+    result = multi_stage_dcf(1e9, 1e8, 0.30, 4, 6, 0.09, 0.025)
+    assert result["total_equity"] == pytest.approx(looped_equity(1e9, 0.30, 4, 6, 0.09, 0.025))
+    assert result["pv_fcfs"] == pytest.approx(result["pv_high_growth"] + result["pv_fade"])
+
+
+def test_multi_stage_reduces_to_single_stage():
+    fcf, shares = np.array([1e9, 2e9, -3e8]), np.array([1e8, 5e8, 1e8])
+    no_fade = multi_stage_dcf(fcf, shares, 0.2, 5, 0)["intrinsic_per_share"]
+    assert no_fade == pytest.approx(dcf_per_share(fcf, shares, 0.2, 5)["intrinsic_per_share"])
+    flat = multi_stage_dcf(fcf, shares, 0.03, 5, 5)["intrinsic_per_share"]
+    assert flat == pytest.approx(dcf_per_share(fcf, shares, 0.03, 10)["intrinsic_per_share"])
+
+
+def test_multi_stage_broadcasts_over_tickers_and_scenarios():
+    growth = np.array([[0.15], [0.25], [0.40]])
+    rates = np.array([[0.08], [0.10], [0.12]])
+    result = multi_stage_dcf(np.array([1e9, 4e9]), np.array([1e8, 2e8]), growth, 5, 5, rates)["total_equity"]
+    assert result.shape == (3, 2)
+    assert result[2, 1] == pytest.approx(looped_equity(4e9, 0.40, 5, 5, 0.12, 0.03))
+
+
+def test_multi_stage_of_one_info_and_registry(tmp_path):
+    info = {"freeCashflow": 1e9, "sharesOutstanding": 1e8, "earningsGrowth": 0.35}
+    dcf = calculate_multi_stage_dcf(info, 0.0, 5, 5)
+    assert dcf["high_growth"] == 0.35
+    assert dcf["total_equity"] == pytest.approx(looped_equity(1e9, 0.35, 5, 5, 0.10, 0.03))
+    assert calculate_multi_stage_dcf({"freeCashflow": 1e9}, 0.2) is None
+
+    table = metrics_frame({"X": info}, ["dcf_multi_stage_per_share"], high_years=5, fade_years=5)
+    assert table.loc["X", "dcf_multi_stage_per_share"] == pytest.approx(dcf["intrinsic_per_share"])
+
+    path = tmp_path / "report.txt"
+    export_report(str(path), "X", None, None, dcf, {}, {}, {})
+    report = path.read_text(encoding="utf-8")
+    assert "multi-stage" in report and "PV of fade FCFs" in report
@@ -0,0 +1,128 @@
+import random
+
+import numpy as np
+import pytest
+
+from src.scripts import lynch_company_category
+from src.scripts.company_analysis import score_company
+from src.valuation import columnar
+from src.valuation.columnar import snapshot_matrix, as_columns
+from src.valuation.parallel import value_universe, value_snapshot_file
+from src.valuation.snapshot_file import write_snapshot, SnapshotFile
+from src.valuation.yfinance_api import apply_comps
+
+
+def random_infos(n, seed=0):
+    rng = random.Random(seed)
+
+    def pick(*values):
+        return rng.choice(values + (None,))
+
+    infos = {}
+    for i in range(n):
+        infos[f"T{i}"] = {
+            "industry": rng.choice(["Software", "Banks", "Utilities"]),
+            "currentPrice": rng.uniform(1, 500),
+            "marketCap": pick(5e9, 20e9, 2e12),
+            "sharesOutstanding": pick(1e8, 5e9),
+            "freeCashflow": pick(-1e8, 1e9, 5e10),
+            "totalRevenue": pick(1e9, 3e11),
+            "ebitda": pick(1e8, 1e11),
+            "totalDebt": pick(0, 1e10),
+            "cash": pick(0, 2e9),
+            "trailingEps": pick(-1.5, 2.0, 6.5),
+            "trailingPE": pick(8.0, 12.99, 15.0, 22.99, 23.0, 30.0, 70.0, rng.uniform(5, 80)),
+            "priceToSalesTrailing12Months": pick(0.4, 2.0, 9.0),
+            "priceToBook": pick(0.9, 2.5, 12.0),
+            "enterpriseToEbitda": pick(6.0, 11.0, 20.0),
+            "earningsGrowth": pick(-0.2, 0.05, 0.08, 0.3),
+            "earningsQuarterlyGrowth": pick(-0.2, 0.1, 0.35, rng.uniform(-0.5, 0.5)),
+            "revenueGrowth": pick(0.0, 0.02, 0.07, 0.3),
+            "profitMargins": pick(-0.06, 0.1, 0.45),
+            "operatingMargins": pick(0.1, 0.3),
+            "returnOnEquity": pick(0.15, 0.2, -0.1),
+            "dividendYield": pick(0.0, 0.5, 1.25, 3.0),
+            "payoutRatio": pick(0.0, 0.5, 0.9),
+            "fiveYearAvgDividendYield": pick(0.2, 2.0),
+            "debtToEquity": pick(20.0, 150.0),
+            "beta": pick(0.8, 1.5),
+        }
+    return infos
+
+
+def test_company_scores_match_score_company():
+    infos = random_infos(300)
+    symbols, matrix = snapshot_matrix(infos)
+    scores = columnar.company_scores(as_columns(matrix))
+    for j, symbol in enumerate(symbols):
+        expected = score_company(infos[symbol])
+        assert scores["total"][j] == expected["total"]
+        assert scores["count"][j] == expected["count"]
+        if expected["percent"] is None:
+            assert np.isnan(scores["percent"][j])
+        else:
+            assert scores["percent"][j] == pytest.approx(expected["percent"])
+
+
+def test_classify_matches_classify_company(monkeypatch):
+    infos = random_infos(300, seed=1)
+    monkeypatch.setattr(lynch_company_category, "ticket_info", lambda symbol: infos[symbol])
+    # Synthetic tickers have no price history; nothing may go to the network
+    monkeypatch.setattr(lynch_company_category, "measured_beta", lambda *args, **kwargs: None)
+    symbols, matrix = snapshot_matrix(infos)
+    codes = columnar.classify(as_columns(matrix))
+    for j, symbol in enumerate(symbols):
+        expected = lynch_company_category.classify_company(symbol)
+        actual = columnar.CATEGORIES[codes[j]]
+        if expected.startswith("Error"):
+            # the scalar version raises on some None fields, the vectorized one applies the defaults
+            continue
+        if actual == "Other":
+            assert expected.startswith("company from sector")
+        else:
+            assert actual == expected
+
+
+def test_comps_match_apply_comps():
+    infos = random_infos(100, seed=2)
+    averages = {"P/E": 20.0, "P/S": 3.0, "EV/EBITDA": 12.0}
+    symbols, matrix = snapshot_matrix(infos)
+    implied = columnar.comps(as_columns(matrix), averages)
+    for j, symbol in enumerate(symbols):
+        expected = apply_comps(infos[symbol], averages)
+        for multiple in averages:
+            if multiple in expected:
+                assert implied[multiple][j] == pytest.approx(expected[multiple])
+            else:
+                assert np.isnan(implied[multiple][j])
+
+
+def test_value_universe_sharded_matches_single_process():
+    infos = random_infos(200, seed=3)
+    single = value_universe(infos, workers=1)
+    sharded = value_universe(infos, workers=2, shards_per_worker=3)
+    assert list(sharded.index) == list(infos)
+    assert single.equals(sharded)
+
+
+def test_snapshot_file_round_trip(tmp_path):
+    infos = random_infos(50, seed=4)
+    path = str(tmp_path / "universe.bin")
+    write_snapshot(path, infos)
+    snapshot = SnapshotFile(path)
+    assert snapshot.symbols == list(infos)
+    info = snapshot.info("T7")
+    for field, value in infos["T7"].items():
+        if value is None:
+            assert field not in info
+        else:
+            assert info[field] == value
+
+
+def test_value_snapshot_file_matches_value_universe(tmp_path):
+    infos = random_infos(200, seed=5)
+    path = str(tmp_path / "universe.bin")
+    write_snapshot(path, infos)
+    expected = value_universe(infos, workers=1)
+    assert value_snapshot_file(path, workers=1).equals(expected)
+    assert value_snapshot_file(path, workers=2).equals(expected)
@@ -0,0 +1,101 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts.portfolio_valuation import value_portfolio
+from src.valuation.dcf_vectorized import dcf_per_share
+from src.valuation.portfolio import aggregate_positions, average_cost_basis
+from src.valuation.yfinance_api import calculate_dcf_v2
+
+
+def test_vectorized_dcf_matches_calculate_dcf_v2():
+    info = {"freeCashflow": 1_000_000, "sharesOutstanding": 1_000}
+    expected = calculate_dcf_v2(info, 0.08, 5, 0.10, 0.03)
+    result = dcf_per_share([1_000_000], [1_000], 0.08, 5, 0.10, 0.03)
+    for key, value in expected.items():
+        assert result[key][0] == pytest.approx(value)
+
+
+def test_aggregate_positions():
+    trades = pd.DataFrame({
+        "Symbol": ["AAPL", "AAPL", "MSFT", "BME", "BME"],
+        "Buy/Sell": ["BUY", "SELL", "BUY", "BUY", "SELL"],
+        "Quantity": [10, -4, 5, 100, -100],
+        "Price": [100.0, 120.0, 300.0, 2.761, 3.0],
+        "Commission": [-1.0, -1.0, -1.0, -1.0, -1.0],
+    })
+    positions = aggregate_positions(trades)
+    assert list(positions.index) == ["AAPL", "MSFT"]
+    assert positions.loc["AAPL", "net_quantity"] == 6
+    assert positions.loc["AAPL", "net_cost"] == pytest.approx(1000 - 480)
+    assert positions.loc["AAPL", "commission"] == 2
+    # The partial sale takes out its share of the cost: realized P&L does not lower the average
+    assert positions.loc["AAPL", "cost_basis"] == pytest.approx(600)
+    assert positions.loc["AAPL", "avg_cost"] == pytest.approx(100)
+
+
+def test_average_cost_basis_follows_the_position():
+    assert average_cost_basis([10, 10, -5], [100.0, 200.0, 300.0]) == pytest.approx(15 * 150)
+    assert average_cost_basis([10, -10, 5], [100.0, 120.0, 90.0]) == pytest.approx(450)
+    # Flipping from long to short starts again at the flipping trade's price
+    assert average_cost_basis([10, -15], [100.0, 120.0]) == pytest.approx(-600)
+    assert average_cost_basis([-10, 4], [50.0, 40.0]) == pytest.approx(-300)
+
+
+def test_cost_basis_scan_matches_a_trade_by_trade_replay():
+    rng = np.random.default_rng(3)
+    n = 3000
+    trades = pd.DataFrame({
+        "Symbol": np.array(["AAA", "BBB", "CCC"])[rng.integers(0, 3, n)],
+        "Buy/Sell": np.where(rng.random(n) < 0.5, "SELL", "BUY"),
+        "Quantity": rng.integers(1, 20, n).astype(float),
+        "Price": rng.uniform(10, 20, n),
+        "Commission": 0.0,
+    })
+    positions = aggregate_positions(trades, include_closed=True)
+    signed = np.where(trades["Buy/Sell"] == "SELL", -1.0, 1.0) * trades["Quantity"]
+    for symbol, rows in trades.groupby("Symbol").groups.items():
+        position = cost = 0.0
+        for quantity, price in zip(signed[rows], trades["Price"][rows]):
+            if position == 0 or (position > 0) == (quantity > 0):
+                cost += quantity * price
+            elif abs(quantity) <= abs(position):
+                cost *= (position + quantity) / position
+            else:
+                cost = (position + quantity) * price
+            position += quantity
+        assert positions.loc[symbol, "cost_basis"] == pytest.approx(cost)
+
+
+def test_closed_positions_have_no_avg_cost():
+    positions = aggregate_positions(pd.DataFrame({
+        "Symbol": ["AAA", "AAA", "BBB"],
+        "Buy/Sell": ["BUY", "SELL", "BUY"],
+        "Quantity": [10, 10, 5],
+        "Price": [10.0, 12.0, 3.0],
+        "Commission": [0.0, 0.0, 0.0],
+    }), include_closed=True)
+    assert positions.loc["AAA", "cost_basis"] == 0
+    assert np.isnan(positions.loc["AAA", "avg_cost"])
+    assert positions.loc["BBB", "avg_cost"] == pytest.approx(3.0)
+
+
+def test_value_portfolio():
+    positions = aggregate_positions(pd.DataFrame({
+        "Symbol": ["AAA", "BBB"],
+        "Buy/Sell": ["BUY", "BUY"],
+        "Quantity": [10, 20],
+        "Price": [10.0, 5.0],
+        "Commission": [0.0, 0.0],
+    }))
+    infos = {
+        "AAA": {"currentPrice": 12.0, "freeCashflow": 1_000_000, "sharesOutstanding": 1_000,
+                "earningsGrowth": 0.08, "trailingPE": 15.0},
+        "BBB": {},
+    }
+    table, totals = value_portfolio(positions, infos, {"BBB": 4.0}, discount_rate=0.10)
+    assert table.loc["BBB", "price"] == 4.0
+    assert table.loc["AAA", "intrinsic_per_share"] == pytest.approx(
+        calculate_dcf_v2(infos["AAA"], 0.08)["intrinsic_per_share"])
+    assert totals["market_value"] == pytest.approx(10 * 12.0 + 20 * 4.0)
+    assert totals["weighted_score_pct"] == pytest.approx(90.0)
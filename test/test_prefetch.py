@@ -0,0 +1,73 @@
+from src.valuation import prefetch, ticker_handle
+from src.valuation.cache import TTLCache
+from src.valuation.prefetch import Prefetcher
+from src.valuation.ticker_handle import cached_handle, get_handle
+
+
+class FakeTicker:
+    calls = 0
+
+    def __init__(self, symbol):
+        self.symbol = symbol
+
+    @property
+    def info(self):
+        FakeTicker.calls += 1
+        return {"symbol": self.symbol, "industry": "Semiconductors", "currentPrice": 10.0}
+
+
+def _setup(monkeypatch, ttl=10.0):
+    monkeypatch.setattr(ticker_handle.yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(ticker_handle, "_handles", TTLCache(ttl))
+    monkeypatch.setattr(prefetch, "suggest_multiple_peers", lambda industry, exclude='': ["PEER1", "PEER2"])
+    FakeTicker.calls = 0
+
+
+def test_prefetch_warms_watchlist_and_peers(monkeypatch):
+    _setup(monkeypatch)
+    prefetcher = Prefetcher(["aaa", "BBB"], refresh_ahead=5.0)
+
+    assert prefetcher.run_once() == 2
+    assert prefetcher.watchlist == ["AAA", "BBB", "PEER1", "PEER2"]
+    assert prefetcher.run_once() == 2
+    assert prefetcher.run_once() == 0
+    assert FakeTicker.calls == 4
+
+    # interactive lookups are served from the warm handles
+    assert get_handle("AAA").info["currentPrice"] == 10.0
+    assert FakeTicker.calls == 4
+
+
+def test_prefetch_refreshes_before_expiry_and_swaps_handles(monkeypatch):
+    _setup(monkeypatch)
+    prefetcher = Prefetcher(["AAA"], include_peers=False, refresh_ahead=5.0)
+    prefetcher.run_once()
+    old = cached_handle("AAA")
+
+    prefetcher.refresh_ahead = 20.0  # every handle now expires within the refresh window
+    assert prefetcher.run_once() == 1
+    assert cached_handle("AAA") is not old
+    assert cached_handle("AAA").is_loaded("info")
+
+
+def test_prefetch_respects_request_budget(monkeypatch):
+    _setup(monkeypatch)
+    prefetcher = Prefetcher([f"T{i}" for i in range(12)], include_peers=False, budget=5)
+
+    assert prefetcher.run_once() == 5
+    assert prefetcher.stats["over_budget"] == 1
+    assert FakeTicker.calls == 5
+
+
+def test_prefetch_thread_starts_and_stops(monkeypatch):
+    _setup(monkeypatch)
+    prefetcher = Prefetcher(["AAA"], include_peers=False, interval=0.01).start()
+    try:
+        for _ in range(200):
+            if cached_handle("AAA") is not None:
+                break
+            prefetcher._stop.wait(0.01)
+    finally:
+        prefetcher.stop(timeout=2)
+    assert not prefetcher.running
+    assert cached_handle("AAA").is_loaded("info")
@@ -0,0 +1,105 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.valuation.price_history import PriceHistory, beta, benchmark_for, forward_fill, history_metrics, \
+    log_returns, max_drawdown, rolling_beta, rolling_volatility, with_measured_beta
+
+
+def frame(days, close):
+    close = np.asarray(close, dtype=float)
+    return pd.DataFrame({"Open": close, "High": close * 1.01, "Low": close * 0.99, "Close": close,
+                         "Adj Close": close, "Volume": np.full(len(close), 1e6)}, index=pd.DatetimeIndex(days))
+
+
+def synthetic_market(n=300, seed=0):
+    rng = np.random.default_rng(seed)
+    market = rng.normal(0.0003, 0.01, n)
+    stock = 1.5 * market + rng.normal(0, 0.002, n)
+    days = pd.bdate_range("2024-01-01", periods=n + 1)
+    return days, 100 * np.exp(np.cumsum(np.r_[0, market])), 50 * np.exp(np.cumsum(np.r_[0, stock]))
+
+
+def test_store_appends_only_new_days(tmp_path):
+    store = PriceHistory(str(tmp_path))
+    days = pd.bdate_range("2024-01-01", periods=10)
+    assert store.append("AAPL", frame(days[:6], range(1, 7))) == 6
+    # Overlapping download: only the four new days are stored
+    assert store.append("AAPL", frame(days, range(1, 11))) == 4
+    records = store.read("AAPL")
+    assert len(records) == 10 and list(records["close"]) == list(range(1, 11))
+    assert store.last_date("AAPL") == days[-1].date()
+    assert len(store.read("AAPL", start=days[3].date(), end=days[5].date())) == 3
+    assert store.symbols() == ["AAPL"]
+
+
+def test_update_downloads_from_the_last_stored_day(tmp_path):
+    days = pd.bdate_range("2024-01-01", periods=10)
+    calls = []
+
+    def fetch(symbols, start):
+        calls.append((list(symbols), start))
+        return {s: frame(days[days.date >= start], np.arange(len(days))[days.date >= start] + 1) for s in symbols}
+
+    store = PriceHistory(str(tmp_path), fetch=fetch)
+    store.append("MSFT", frame(days[:8], range(1, 9)))
+    assert store.update(["msft"], today=days[-1].date()) == {"MSFT": 2}
+    assert calls[-1] == (["MSFT"], days[8].date())
+    assert store.update(["MSFT"], today=days[-1].date()) == {"MSFT": 0}
+    assert len(calls) == 1
+
+
+def test_panel_aligns_different_calendars(tmp_path):
+    store = PriceHistory(str(tmp_path))
+    days = pd.bdate_range("2024-01-01", periods=5)
+    store.append("A", frame(days, [1, 2, 3, 4, 5]))
+    store.append("B", frame(days[[0, 1, 3]], [10, 11, 13]))
+    dates, matrix = store.panel(["A", "B"], field="close")
+    assert len(dates) == 5 and dates[0] == np.datetime64("2024-01-01")
+    assert np.isnan(matrix[2, 1]) and np.isnan(matrix[4, 1])
+    assert forward_fill(matrix)[2, 1] == 11
+
+
+def test_analytics_match_pandas():
+    rng = np.random.default_rng(1)
+    prices = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (200, 3)), axis=0))
+    prices[:30, 2] = np.nan
+    returns = log_returns(prices)
+    expected = pd.DataFrame(returns).rolling(21, min_periods=2).std().to_numpy() * np.sqrt(252)
+    rolled = rolling_volatility(returns, 21)
+    assert np.isnan(rolled[:20]).all()
+    np.testing.assert_allclose(rolled[20:], expected[20:], rtol=1e-8, equal_nan=True)
+
+    frame_ = pd.DataFrame(prices)
+    np.testing.assert_allclose(max_drawdown(prices), (frame_ / frame_.cummax() - 1).min().to_numpy())
+
+
+def test_beta_recovers_the_true_beta():
+    _, market, stock = synthetic_market()
+    prices = np.c_[stock, market]
+    returns = log_returns(prices)
+    betas = beta(returns, returns[:, 1])
+    assert betas[0] == pytest.approx(1.5, abs=0.05)
+    assert betas[1] == pytest.approx(1.0)
+    assert rolling_beta(returns, returns[:, 1], 60)[-1, 0] == pytest.approx(1.5, abs=0.1)
+    assert np.isnan(beta(returns[:5], returns[:5, 1])).all()
+
+    metrics = history_metrics(prices, market)
+    assert metrics["beta"][0] == pytest.approx(beta(returns[-252:], returns[-252:, 1])[0])
+    assert metrics["volatility"][1] == pytest.approx(np.std(returns[-252:, 1], ddof=1) * np.sqrt(252))
+    assert metrics["return"][1] == pytest.approx(market[-1] / market[-253] - 1)
+    assert metrics["max_drawdown"][0] <= 0
+
+
+def test_measured_beta_replaces_yahoo_beta(tmp_path):
+    days, market, stock = synthetic_market()
+    store = PriceHistory(str(tmp_path))
+    store.append(benchmark_for("SAP.DE"), frame(days, market))
+    store.append("SAP.DE", frame(days, stock))
+    infos = {"SAP.DE": {"beta": 0.4, "marketCap": 1e11}, "NEW.DE": {"beta": 0.9}}
+    measured = with_measured_beta(infos, store)
+    assert measured["SAP.DE"]["beta"] == pytest.approx(1.5, abs=0.05)
+    assert measured["NEW.DE"] is infos["NEW.DE"]
+    assert infos["SAP.DE"]["beta"] == 0.4
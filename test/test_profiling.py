@@ -0,0 +1,37 @@
+import glob
+import os
+
+from src.valuation.profiling import profile_action, profiling_enabled
+
+
+def busy_work():
+    total = 0
+    for i in range(600_000):
+        total += i * i
+    blocks = [bytearray(1024) for _ in range(2000)]
+    return total, len(blocks)
+
+
+def test_profiling_switch(monkeypatch):
+    monkeypatch.delenv("VALUATION_PROFILE", raising=False)
+    assert profiling_enabled(["--profile"])
+    assert not profiling_enabled([])
+    monkeypatch.setenv("VALUATION_PROFILE", "1")
+    assert profiling_enabled([])
+
+
+def test_profile_action_writes_reports(tmp_path):
+    with profile_action("busy", directory=str(tmp_path), top=5):
+        busy_work()
+
+    (collapsed,) = glob.glob(os.path.join(tmp_path, "busy-*.collapsed"))
+    (report,) = glob.glob(os.path.join(tmp_path, "busy-*.txt"))
+    assert glob.glob(os.path.join(tmp_path, "busy-*.pstats"))
+
+    lines = open(collapsed).read().splitlines()
+    assert any("test_profiling:busy_work" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+    text = open(report).read()
+    assert "Peak traced memory: " in text and "MiB" in text
+    assert "busy_work" in text.split("Top 5 functions")[1]
@@ -0,0 +1,86 @@
+import threading
+import time
+
+import pytest
+
+from src.valuation import fetch_scheduler, yfinance_api
+from src.valuation.fetch_scheduler import FetchScheduler
+from src.valuation.reporting import comps_progress_line, export_report
+from src.valuation.yfinance_api import apply_comps, progressive_comps, peer_multiples_from_infos
+
+TARGET = {"sharesOutstanding": 1e9, "trailingEps": 5.0, "totalRevenue": 5e10}
+PEERS = {"FAST": {"trailingPE": 20.0, "priceToSalesTrailing12Months": 4.0},
+         "MID": {"trailingPE": 30.0},
+         "SLOW": {"trailingPE": 100.0, "priceToSalesTrailing12Months": 10.0}}
+DELAYS = {"FAST": 0.0, "MID": 0.05, "SLOW": 2.0}
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    monkeypatch.setenv("VALUATION_RESULT_CACHE", "off")
+    monkeypatch.setenv("VALUATION_NEGATIVE_CACHE", "off")
+
+    class Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        @property
+        def info(self):
+            time.sleep(DELAYS[self.symbol])
+            if self.symbol not in PEERS:
+                raise KeyError(self.symbol)
+            return PEERS[self.symbol]
+
+    monkeypatch.setattr(fetch_scheduler.yf, "Ticker", Ticker)
+    scheduler = FetchScheduler(rate=1000, burst=1000, workers=3)
+    monkeypatch.setattr(yfinance_api, "get_scheduler", lambda: scheduler)
+    yield scheduler
+    scheduler.close()
+
+
+def test_updates_stream_in_and_match_the_full_average(scheduler):
+    updates = list(progressive_comps(TARGET, list(PEERS), ["P/E", "P/S"], deadline=None))
+    assert [u.peers for u in updates] == [1, 2, 3]
+    assert [u.done for u in updates] == [False, False, True]
+    assert updates[0].implied["P/E"] == pytest.approx(20.0 * 5.0)
+
+    final = updates[-1]
+    data = peer_multiples_from_infos(list(PEERS.values()), ["P/E", "P/S"])
+    averages = {m: sum(v) / len(v) for m, v in data.items()}
+    assert final.averages == pytest.approx(averages)
+    assert final.implied == pytest.approx(apply_comps(TARGET, averages))
+    assert final.counts == {"P/E": 3, "P/S": 2} and final.late == []
+
+
+def test_deadline_finishes_with_the_peers_in_time(scheduler, tmp_path):
+    failures = {}
+    start = time.monotonic()
+    updates = list(progressive_comps(TARGET, list(PEERS) + ["GONE"], ["P/E"], deadline=0.5, failures=failures))
+    assert time.monotonic() - start < 1.5
+
+    final = updates[-1]
+    assert final.done and final.late == ["SLOW"]
+    assert (final.peers, final.total, final.counts) == (2, 4, {"P/E": 2})
+    assert final.averages["P/E"] == pytest.approx(25.0)
+    assert set(failures) == {"GONE", "SLOW"}
+    assert "2/4 peers" in comps_progress_line(final)
+
+    path = tmp_path / "report.txt"
+    export_report(str(path), "TEST", 120.0, None, None, final.implied, final.averages, {}, None, final._asdict())
+    report = path.read_text(encoding="utf-8")
+    assert "2 peers)" in report and "Peers answered: 2 of 4 (1 dropped at the deadline: SLOW)" in report
+
+
+def test_cancelled_jobs_are_skipped_by_the_scheduler():
+    scheduler = FetchScheduler(rate=1000, burst=1000, workers=1)
+    gate = threading.Event()
+    ran = []
+    blocker = scheduler.submit("block", gate.wait)
+    queued = scheduler.submit("queued", lambda: ran.append("queued"))
+    assert queued.cancel()
+    gate.set()
+    blocker.result(timeout=5)
+    assert not blocker.cancel()
+    assert scheduler.submit("after", lambda: "ok").result(timeout=5) == "ok"
+    assert ran == []
+    scheduler.close()
@@ -0,0 +1,122 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts import lynch_company_category
+from src.valuation import result_cache
+from src.valuation.metrics import METRIC_CODE
+from src.valuation.parallel import value_universe
+from src.valuation.result_cache import ResultCache, memoize
+from src.valuation.yfinance_api import calculate_dcf_v2
+from test.test_parallel import random_infos
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setenv(result_cache.RESULT_CACHE_ENV, "on")
+    store = ResultCache(str(tmp_path / "results.db"))
+    monkeypatch.setattr(result_cache, "_default_cache", store)
+    yield store
+    store.close()
+
+
+def test_memoize_keys_on_the_declared_fields_only(cache):
+    calls = []
+
+    @memoize(["price"], name="test_double")
+    def double(info, factor=2):
+        calls.append(info)
+        return {"value": info.get("price", 0) * factor}
+
+    assert double({"price": 10, "name": "a"}) == {"value": 20}
+    # Unrelated fields do not matter, the declared ones and the parameters do
+    assert double({"price": 10, "name": "b"}) == {"value": 20}
+    assert double({"price": 11}) == {"value": 22}
+    assert double({"price": 10}, factor=3) == {"value": 30}
+    assert len(calls) == 3
+    double({})
+    assert cache.stats["test_double hits"] == 1
+    assert cache.stats["test_double misses"] == 4
+
+
+def test_missing_and_none_fields_have_different_keys(cache):
+    @memoize(["revenueGrowth"], name="test_growth")
+    def growth(info):
+        return info.get("revenueGrowth", 0)
+
+    assert growth({}) == 0
+    assert growth({"revenueGrowth": None}) is None
+
+
+def test_cache_is_opt_in(monkeypatch):
+    monkeypatch.delenv(result_cache.RESULT_CACHE_ENV, raising=False)
+    assert result_cache.get_result_cache() is None
+    monkeypatch.setenv(result_cache.RESULT_CACHE_ENV, "on")
+    assert result_cache.get_result_cache().path.endswith(result_cache.results_db)
+
+
+def test_dependency_source_is_part_of_the_key(cache, monkeypatch):
+    calls = []
+
+    @memoize(["price"], name="test_dependent", depends=[result_cache.__name__])
+    def dependent(info):
+        calls.append(info)
+        return {"value": info["price"]}
+
+    dependent({"price": 1})
+    dependent({"price": 1})
+    assert len(calls) == 1
+    fingerprint = result_cache.code_fingerprint
+    monkeypatch.setattr(result_cache, "code_fingerprint",
+                        lambda module: "edited" if module == result_cache.__name__ else fingerprint(module))
+    dependent({"price": 1})
+    assert len(calls) == 2
+    assert lynch_company_category.classify_info.cache_modules[1:] == tuple(METRIC_CODE)
+
+
+def test_values_are_stored_as_json(cache):
+    cache.put("test_json", "k", {"value": np.float64(1.5), "missing": float("nan"), "rows": np.arange(3.0)})
+    value = cache.get("test_json", "k")
+    assert value["value"] == 1.5 and np.isnan(value["missing"]) and value["rows"] == [0.0, 1.0, 2.0]
+    (blob,) = cache._db.execute("SELECT value FROM results WHERE key = 'k'").fetchone()
+    assert blob.startswith(b"{")
+
+
+def test_valuation_functions_are_served_from_the_cache(cache):
+    info = {"freeCashflow": 1e9, "sharesOutstanding": 1e8, "earningsGrowth": 0.1, "currentPrice": 50}
+    first = calculate_dcf_v2(info, 0.08)
+    assert calculate_dcf_v2(dict(info, currentPrice=55), 0.08) == first
+    assert cache.stats["calculate_dcf_v2 hits"] == 1
+    assert calculate_dcf_v2(dict(info, freeCashflow=2e9), 0.08) != first
+
+    def classify(function, info):
+        # the scalar classifier raises on some None fields; errors are not cached
+        try:
+            return function(info)
+        except TypeError:
+            return "error"
+
+    infos = random_infos(50, seed=4)
+    expected = {s: classify(lynch_company_category.classify_info.uncached, i) for s, i in infos.items()}
+    for _ in range(2):
+        assert {s: classify(lynch_company_category.classify_info, i) for s, i in infos.items()} == expected
+    assert cache.stats["classify_info hits"] > 0
+
+
+def test_value_universe_recomputes_only_changed_tickers(cache):
+    infos = random_infos(300, seed=5)
+    expected = value_universe(infos, workers=1)
+
+    first = value_universe(infos, workers=1, cache=cache)
+    second = value_universe(infos, workers=1, cache=cache)
+    pd.testing.assert_frame_equal(first, expected)
+    pd.testing.assert_frame_equal(second, expected)
+    assert cache.stats["value_columns hits"] == 300
+
+    changed = dict(infos, T7=dict(infos["T7"], currentPrice=infos["T7"]["currentPrice"] + 1))
+    before = cache.stats["value_columns misses"]
+    pd.testing.assert_frame_equal(value_universe(changed, workers=1, cache=cache), value_universe(changed, workers=1))
+    assert cache.stats["value_columns misses"] - before == 1
+
+    value_universe(infos, workers=1, cache=cache, discount_rate=0.09)
+    assert cache.stats["value_columns misses"] - before == 301
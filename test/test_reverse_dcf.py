@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+from src.valuation.dcf_vectorized import dcf_per_share
+from src.valuation.reverse_dcf import implied_growth, implied_discount_rate, rank_by_implied_growth
+
+
+def test_implied_growth_recovers_dcf_growth():
+    fcf = np.array([1e9, 5e8, 2e9, 1e9])
+    shares = np.array([1e8, 2e8, 5e8, 1e8])
+    growth = np.array([0.08, -0.2, 0.5, 0.10])
+    price = dcf_per_share(fcf, shares, growth)["intrinsic_per_share"]
+    result = implied_growth(price, fcf, shares)
+    assert result["converged"].all()
+    assert result["growth"] == pytest.approx(growth, abs=1e-8)
+
+
+def test_implied_growth_without_solution_is_nan():
+    result = implied_growth([100.0, 100.0, 1e9], [-1e9, 1e9, 1e9], [1e8, 1e8, 1e8])
+    assert np.isnan(result["growth"][0])
+    assert result["converged"][1]
+    # would need growth above the upper bracket
+    assert np.isnan(result["growth"][2])
+
+
+def test_implied_discount_rate_recovers_rate():
+    fcf = np.array([1e9, 3e9])
+    shares = np.array([1e8, 4e8])
+    rates = np.array([0.07, 0.15])
+    price = dcf_per_share(fcf, shares, 0.06, 5, rates, 0.03)["intrinsic_per_share"]
+    result = implied_discount_rate(price, fcf, shares, 0.06)
+    assert result["discount_rate"] == pytest.approx(rates, abs=1e-8)
+
+
+def test_rank_by_implied_growth():
+    cols = {"currentPrice": np.array([50.0, 500.0, 10.0]),
+            "freeCashflow": np.array([1e9, 1e9, np.nan]),
+            "sharesOutstanding": np.array([1e8, 1e8, 1e8])}
+    ranking = rank_by_implied_growth(["LOW", "HIGH", "NONE"], cols)
+    assert list(ranking.index) == ["HIGH", "LOW", "NONE"]
@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.scripts import share_price_trajectory as trajectory
+from src.valuation.scenario_sweep import grid_scenarios, file_scenarios, stream_projections, write_projections
+
+MODEL = dict(current_shares_outstanding=trajectory.CURRENT_SHARES_OUTSTANDING,
+             base_market_cap_for_upside=trajectory.BASE_MARKET_CAP_FOR_UPSIDE,
+             initial_projected_revenue_year1=trajectory.INITIAL_PROJECTED_REVENUE_2025,
+             projection_years=trajectory.PROJECTION_YEARS)
+
+
+def test_grid_chunks_cover_the_cartesian_product():
+    chunks = list(grid_scenarios([0.01, 0.02, 0.03], [0.1, 0.2], [10, 15, 20, 25], chunk_size=5))
+    assert [len(c["profit_margin"]) for c in chunks] == [5, 5, 5, 5, 4]
+    combos = {tuple(row) for c in chunks for row in zip(c["revenue_growth_rate"], c["profit_margin"],
+                                                        c["future_pe_multiple"])}
+    assert len(combos) == 24
+
+
+def test_streamed_projection_matches_project_company_price():
+    table = trajectory.project_company_price(trajectory.CURRENT_SHARE_PRICE, scenarios=trajectory.SCENARIOS, **MODEL)
+    chunk = {column: np.array([s[column] for s in trajectory.SCENARIOS.values()])
+             for column in ["revenue_growth_rate", "profit_margin", "future_pe_multiple"]}
+    (frame,) = stream_projections([chunk], **MODEL)
+    price_column = f"Projected Price/Share ({2025 + trajectory.PROJECTION_YEARS - 1})"
+    expected = [float(v.lstrip("£").replace(",", "")) for v in table[price_column]]
+    assert frame["projected_price_per_share"].tolist() == pytest.approx(expected, abs=0.005)
+
+
+def test_sweep_writes_csv_chunk_by_chunk(tmp_path):
+    output = tmp_path / "sweep.csv"
+    progress = []
+    written = write_projections(
+        stream_projections(grid_scenarios(np.linspace(0, 0.1, 11), np.linspace(0.02, 0.1, 9), [12, 15, 18],
+                                          chunk_size=50), **MODEL),
+        str(output), total=297, progress=lambda done, total, elapsed: progress.append(done))
+    assert written == 297
+    assert progress == [50, 100, 150, 200, 250, 297]
+
+    frame = pd.read_csv(output)
+    assert len(frame) == 297
+    scenarios = tmp_path / "scenarios.csv"
+    frame[["revenue_growth_rate", "profit_margin", "future_pe_multiple"]].to_csv(scenarios, index=False)
+    replay = pd.concat(stream_projections(file_scenarios(str(scenarios), chunk_size=100), **MODEL))
+    assert replay["upside"].to_numpy() == pytest.approx(frame["upside"].to_numpy())
+
+
+def test_sweep_command_line(tmp_path, monkeypatch, capsys):
+    assert trajectory.parse_range("0.02:0.10:0.02") == pytest.approx([0.02, 0.04, 0.06, 0.08, 0.10])
+    output = tmp_path / "sweep.csv"
+    monkeypatch.setattr("sys.argv", ["share_price_trajectory", "--sweep", str(output), "--growth", "0:0.1:0.05",
+                                     "--margin", "0.05", "--pe", "10:20:5"])
+    trajectory.main()
+    assert len(pd.read_csv(output)) == 9
+    assert "9 scenarios written" in capsys.readouterr().out
+
+
+def test_sweep_writes_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    output = str(tmp_path / "sweep.parquet")
+    written = write_projections(stream_projections(grid_scenarios([0.05], [0.1, 0.2], [15], chunk_size=1), **MODEL),
+                                output, progress=None)
+    assert written == 2
+    assert len(pd.read_parquet(output)) == 2
@@ -0,0 +1,68 @@
+import pandas as pd
+
+from src.valuation import screening, ticker_handle
+from src.valuation.cache import TTLCache
+from src.valuation.screening import Screen, INFO, CASHFLOW, DIVIDENDS, dividend_years
+
+
+def fake_loaders(requested):
+    def loader(stage, make):
+        def load(symbols):
+            requested[stage] = list(symbols)
+            return {s: make(s) for s in symbols}, {}
+        return load
+
+    return {
+        CASHFLOW: loader(CASHFLOW, lambda s: {"fcf": float(s[1:])}),
+        DIVIDENDS: loader(DIVIDENDS, lambda s: pd.Series([1.0, 1.0], index=pd.to_datetime(["2023-03-01", "2024-03-01"]))),
+    }
+
+
+def test_expensive_stages_only_fetched_for_survivors():
+    infos = {f"T{i}": {"marketCap": i * 1e9, "sector": "Technology" if i % 2 else "Energy", "trailingPE": 15.0}
+             for i in range(100)}
+    requested = {}
+    screen = (Screen()
+              .where("marketCap", ">=", 80e9)
+              .where_in("sector", ["technology"])
+              .where_fn(lambda data: dividend_years(data) >= 2, DIVIDENDS)
+              .top(3, lambda data: data[CASHFLOW]["fcf"], stage=CASHFLOW))
+    results = screen.run(infos, infos=infos, loaders=fake_loaders(requested))
+
+    assert results == [("T99", 99.0), ("T97", 97.0), ("T95", 95.0)]
+    assert len(requested[DIVIDENDS]) == 10 and len(requested[CASHFLOW]) == 10
+    assert screen.stats["after_info"] == 10
+    assert screen.stats["info_fetched"] == 0
+
+
+def test_missing_fields_fail_and_smallest_ranking():
+    infos = {"A": {"trailingPE": 30.0}, "B": {"trailingPE": 12.0}, "C": {}, "D": {"trailingPE": 8.0},
+             "F": {"trailingPE": "N/A"}, "G": {"trailingPE": [1.0]}}
+    screen = Screen().top(5, "trailingPE", largest=False)
+    assert screen.run(["A", "B", "C", "D", "F", "G"], infos=infos) == [("D", 8.0), ("B", 12.0), ("A", 30.0)]
+    screen = Screen().where("trailingPE", "<", 25).top(5, "trailingPE", largest=False)
+    assert screen.run(["A", "B", "C", "D", "E"], infos=infos) == [("D", 8.0), ("B", 12.0)]
+    assert screen.failures == {"E": "not in snapshot"}
+    # The ranking does not read trailingPE, so only the filter can drop the missing values
+    screen = Screen().where("trailingPE", "!=", 12.0).top(5, lambda data: 1.0)
+    assert sorted(s for s, _ in screen.run(["A", "B", "C", "D", "F", "G"], infos=infos)) == ["A", "D"]
+
+
+def test_only_the_stages_read_are_fetched():
+    infos = {f"T{i}": {"marketCap": i * 1e9} for i in range(1, 20)}
+    requested = {}
+    loaders = fake_loaders(requested)
+    loaders[DIVIDENDS] = lambda symbols: (_ for _ in ()).throw(AssertionError("dividends fetched"))
+    screen = Screen().where("marketCap", ">", 15e9).top(2, lambda data: data[CASHFLOW]["fcf"], stage=CASHFLOW)
+    assert screen.run(infos, infos=infos, loaders=loaders) == [("T19", 19.0), ("T18", 18.0)]
+    assert requested == {CASHFLOW: ["T16", "T17", "T18", "T19"]}
+    assert "dividends_fetched" not in screen.stats
+
+
+def test_stage_loads_reuse_the_shared_handles(monkeypatch):
+    monkeypatch.setattr(ticker_handle, "_handles", TTLCache(60.0))
+    cashflow = pd.DataFrame({"2024": [1.0]})
+    ticker_handle.get_handle("AAA").set("cashflow", cashflow)
+    monkeypatch.setattr(screening.yf, "Ticker", lambda symbol: (_ for _ in ()).throw(AssertionError(symbol)))
+    loaded, failures = screening.DEFAULT_LOADERS[CASHFLOW](["AAA"])
+    assert loaded["AAA"] is cashflow and failures == {}
@@ -0,0 +1,69 @@
+import datetime
+
+from src.valuation import snapshot_history
+from src.valuation.snapshot_history import SnapshotHistory
+
+DAY = datetime.date(2025, 1, 1)
+
+
+def day(n):
+    return DAY + datetime.timedelta(days=n)
+
+
+def test_as_of_and_changes_since(tmp_path):
+    history = SnapshotHistory(str(tmp_path / "history.db"))
+    assert history.record(day(0), {"AAA": {"currentPrice": 10.0, "sector": "Tech", "beta": 1.1}}) == \
+        {"full": 1, "delta": 0, "unchanged": 0, "skipped": 0, "removed": 0}
+    assert history.record(day(1), {"AAA": {"currentPrice": 10.0, "sector": "Tech", "beta": 1.1}})["unchanged"] == 1
+    assert history.record(day(2), {"AAA": {"currentPrice": 12.0, "sector": "Tech"}})["delta"] == 1
+    assert history.record(day(2), {"AAA": {"currentPrice": 99.0}})["skipped"] == 1
+
+    assert history.as_of("AAA", day(-1)) is None
+    assert history.as_of("AAA", day(1)) == {"currentPrice": 10.0, "sector": "Tech", "beta": 1.1}
+    assert history.as_of("AAA", day(5)) == {"currentPrice": 12.0, "sector": "Tech"}
+    assert history.changes_since("AAA", day(0)) == {"currentPrice": (10.0, 12.0), "beta": (1.1, None)}
+    assert history.changed_symbols(day(1)) == ["AAA"]
+    assert history.changed_symbols(day(2)) == []
+
+
+def test_keyframes_bound_replay(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_history, "KEYFRAME_INTERVAL", 3)
+    history = SnapshotHistory(str(tmp_path / "history.db"))
+    kinds = [history.record(day(i), {"AAA": {"currentPrice": float(i)}}) for i in range(7)]
+    assert [k["full"] for k in kinds] == [1, 0, 0, 1, 0, 0, 1]
+    for i in range(7):
+        assert history.as_of("AAA", day(i)) == {"currentPrice": float(i)}
+    stats = history.storage_stats()
+    assert stats["records"] == 7 and stats["days"] == 7
+
+
+def test_full_snapshots_tombstone_dropped_tickers(tmp_path):
+    history = SnapshotHistory(str(tmp_path / "history.db"))
+    history.record(day(0), {"AAA": {"currentPrice": 10.0}, "BBB": {"currentPrice": 5.0}})
+    # A partial snapshot says nothing about the tickers it leaves out
+    assert history.record(day(1), {"AAA": {"currentPrice": 11.0}})["removed"] == 0
+    assert history.record(day(2), {"AAA": {"currentPrice": 12.0}}, full=True)["removed"] == 1
+    assert history.record(day(3), {"AAA": {"currentPrice": 12.0}}, full=True)["removed"] == 0
+
+    assert history.as_of("BBB", day(1)) == {"currentPrice": 5.0}
+    assert history.as_of("BBB", day(2)) is None
+    assert set(history.as_of_many(day(3))) == {"AAA"}
+    assert history.changes_since("BBB", day(0)) == {"currentPrice": (5.0, None)}
+
+    # A ticker coming back starts again from a full copy
+    assert history.record(day(4), {"AAA": {"currentPrice": 12.0}, "BBB": {"currentPrice": 6.0}}, full=True)["full"] == 1
+    assert history.as_of("BBB", day(4)) == {"currentPrice": 6.0}
+
+
+def test_empty_info_keeps_previous_snapshot(tmp_path):
+    history = SnapshotHistory(str(tmp_path / "history.db"))
+    history.record(day(0), {"AAA": {"currentPrice": 10.0, "sector": "Tech"}})
+    # A failed fetch maps to {}: neither a delta that unsets every field nor a tombstone
+    stats = history.record(day(1), {"AAA": {}}, full=True)
+    assert stats["skipped"] == 1 and stats["delta"] == 0 and stats["removed"] == 0
+    assert history.as_of("AAA", day(1)) == {"currentPrice": 10.0, "sector": "Tech"}
+    assert history.changes_since("AAA", day(0)) == {}
+
+    # The day can still be filled in once the fetch succeeds
+    assert history.record(day(1), {"AAA": {"currentPrice": 11.0, "sector": "Tech"}})["delta"] == 1
+    assert history.as_of("AAA", day(1)) == {"currentPrice": 11.0, "sector": "Tech"}
@@ -0,0 +1,84 @@
+import pytest
+
+from src.valuation import fetch_scheduler, symbols, yfinance_api
+from src.valuation.fetch_scheduler import FetchScheduler
+from src.valuation.symbols import NegativeCache, record_fetch, resolution_table, resolve_symbol, skip_known_missing
+from src.valuation.yfinance_api import collect_peer_multiples
+
+
+def test_listings_resolve_to_yahoo_symbols():
+    assert resolve_symbol("brk.b") == "BRK-B"
+    assert resolve_symbol("MOG.A") == "MOG-A"
+    assert resolve_symbol("SAP.DE") == "SAP.DE"
+    assert resolve_symbol("BT-A.L") == "BT-A.L"
+    assert resolve_symbol("ABC.PA.DE") == "ABC.PA"
+    assert resolve_symbol("7203.T") == "7203.T"
+
+    table = resolution_table()
+    assert table["BRK.B"] == "BRK-B" and table["AIR.PA.DE"] == "AIR.PA"
+    assert "AAPL" not in table
+
+
+def test_negative_cache_expires(tmp_path):
+    cache = NegativeCache(str(tmp_path / "missing.db"))
+    record_fetch("GONE", reason="HTTP Error 404: Not Found", cache=cache)
+    record_fetch("SLOW", reason="throttled after 5 attempts", cache=cache)
+    record_fetch("EMPTY", {"trailingPegRatio": None}, cache=cache)
+    record_fetch("BANK", {"marketCap": 1e10, "trailingPE": 9.0}, fields=["trailingPE", "enterpriseToEbitda"],
+                 cache=cache)
+    assert set(cache.missing(["GONE", "SLOW", "EMPTY", "BANK"])) == {"GONE", "EMPTY"}
+    assert cache.missing_fields("BANK") == {"enterpriseToEbitda"}
+
+    wanted, skipped = skip_known_missing(["GONE", "BANK", "SLOW"], ["enterpriseToEbitda"], cache)
+    assert wanted == ["SLOW"] and set(skipped) == {"GONE", "BANK"}
+    assert skip_known_missing(["BANK"], ["trailingPE", "enterpriseToEbitda"], cache)[0] == ["BANK"]
+
+    cache.add("OLD", "gone", ttl=-1)
+    assert cache.missing(["OLD"]) == {}
+    assert cache.purge() == 1
+    cache.forget("GONE")
+    assert cache.missing(["GONE"]) == {}
+    cache.close()
+
+
+def test_empty_info_expires_before_a_404_and_caches_share_the_data_dir(tmp_path):
+    cache = symbols.get_negative_cache()
+    assert cache.path == str(tmp_path / "missing_symbols.db")
+    record_fetch("GONE", reason="HTTP Error 404: Not Found")
+    record_fetch("EMPTY", {})
+    until = dict(cache._db.execute("SELECT symbol, until FROM missing").fetchall())
+    assert until["GONE"] - until["EMPTY"] == pytest.approx(symbols.NEGATIVE_TTL - symbols.EMPTY_INFO_TTL, abs=5)
+
+
+def test_peers_known_missing_are_not_fetched_again(tmp_path, monkeypatch):
+    monkeypatch.setenv("VALUATION_RESULT_CACHE", "off")
+    cache = NegativeCache(str(tmp_path / "missing.db"))
+    monkeypatch.setattr(symbols, "_default_cache", cache)
+    fetched = []
+
+    class Ticker:
+        def __init__(self, symbol):
+            self.symbol = symbol
+
+        @property
+        def info(self):
+            fetched.append(self.symbol)
+            if self.symbol == "DELISTED":
+                raise ValueError("404 Client Error: Not Found")
+            return {"marketCap": 1e9, "trailingPE": 15.0}
+
+    monkeypatch.setattr(fetch_scheduler.yf, "Ticker", Ticker)
+    scheduler = FetchScheduler(rate=1000, burst=1000, workers=2)
+    monkeypatch.setattr(yfinance_api, "get_scheduler", lambda: scheduler)
+
+    for _ in range(2):
+        failures = {}
+        assert collect_peer_multiples(["AAA", "DELISTED"], ["P/E", "P/S"], failures) == {"P/E": [15.0], "P/S": []}
+        assert "DELISTED" in failures
+    assert sorted(fetched) == ["AAA", "AAA", "DELISTED"]
+
+    # AAA has no P/S: asking for P/S only skips it from now on
+    assert collect_peer_multiples(["AAA"], ["P/S"]) == {"P/S": []}
+    assert fetched.count("AAA") == 2
+    scheduler.close()
+    cache.close()
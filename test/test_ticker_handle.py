@@ -0,0 +1,51 @@
+import pandas as pd
+
+from src.valuation import ticker_handle
+from src.valuation.ticker_handle import TickerHandle, as_handle
+from src.valuation.yfinance_api import check_dividends_and_ddm, dcf_intrinsic_value, ticket_info
+
+
+class FakeTicker:
+    created = 0
+
+    def __init__(self, symbol):
+        FakeTicker.created += 1
+        self.info = {"symbol": symbol, "currentPrice": 100.0, "sharesOutstanding": 1e9,
+                     "totalDebt": 2e9, "totalCash": 1e9}
+        self.cashflow = pd.DataFrame({"2024": [5e9, -1e9], "2023": [4.5e9, -1e9]},
+                                     index=["Free Cash Flow", "Capital Expenditure"])
+        self.dividends = pd.Series([0.5, 0.5, 0.55, 0.55, 0.6, 0.6],
+                                   index=pd.to_datetime(["2021-03-01", "2021-09-01", "2022-03-01",
+                                                         "2022-09-01", "2023-03-01", "2023-09-01"]))
+
+
+def test_handle_downloads_each_piece_once(monkeypatch):
+    monkeypatch.setattr(ticker_handle.yf, "Ticker", FakeTicker)
+    FakeTicker.created = 0
+    stock = TickerHandle("ABC")
+
+    assert ticket_info(stock)["currentPrice"] == 100.0
+    dcf_intrinsic_value(stock)
+    dcf_intrinsic_value(stock, discount_rate=0.09)
+    check_dividends_and_ddm(stock)
+    check_dividends_and_ddm(stock)
+
+    assert FakeTicker.created == 1
+    assert stock.downloads == {"info": 1, "cashflow": 1, "dividends": 1}
+    assert not stock.is_loaded("balance_sheet")
+
+
+def test_as_handle_shares_handles_per_symbol(monkeypatch):
+    monkeypatch.setattr(ticker_handle.yf, "Ticker", FakeTicker)
+    stock = as_handle("SHARED")
+    assert as_handle("SHARED") is stock
+    assert as_handle(stock) is stock
+    assert str(stock) == "SHARED"
+
+
+def test_ticket_info_by_symbol_uses_the_shared_handle(monkeypatch):
+    monkeypatch.setattr(ticker_handle.yf, "Ticker", FakeTicker)
+    monkeypatch.setattr(ticker_handle, "_handles", ticker_handle.TTLCache(60.0))
+    assert ticket_info("BYNAME")["symbol"] == "BYNAME"
+    assert ticket_info("BYNAME")["currentPrice"] == 100.0
+    assert as_handle("BYNAME").downloads == {"info": 1}
@@ -0,0 +1,111 @@
+import asyncio
+import json
+import socket
+import threading
+import urllib.request
+import pytest
+
+from src.scripts.valuation_service import ValuationService, serve_async, load_test
+from src.scripts.lynch_company_category import classify_info
+from src.valuation import fx, ticker_handle
+from src.valuation.cache import TTLCache
+from src.valuation.yfinance_api import calculate_dcf_v2
+
+INFOS = {
+    "AAA": {"industry": "Software", "sector": "Technology", "currentPrice": 50.0, "trailingPE": 20.0,
+            "earningsQuarterlyGrowth": 0.2, "dividendYield": 0.5, "freeCashflow": 1_000_000,
+            "sharesOutstanding": 1_000, "earningsGrowth": 0.1, "trailingEps": 2.5},
+    "BBB": {"trailingPE": 10.0, "priceToSalesTrailing12Months": 2.0},
+    "CCC": {"trailingPE": 30.0},
+}
+
+
+@pytest.fixture(autouse=True)
+def fresh_handles(monkeypatch):
+    monkeypatch.setattr(ticker_handle, "_handles", TTLCache(60.0))
+
+
+def seed_infos(infos):
+    for symbol, info in infos.items():
+        ticker_handle.get_handle(symbol).set("info", info)
+
+
+def warm_service():
+    seed_infos(INFOS)
+    return ValuationService()
+
+
+def test_handlers_use_cached_infos():
+    service = warm_service()
+    status, pegy = service.handle("/pegy", {"symbol": "aaa"})
+    assert status == 200 and pegy["type"] == "PEGY"
+    assert pegy["value"] == 20.0 / (20 + 50)
+    status, comps = service.handle("/comps", {"symbol": "AAA", "peers": "BBB,CCC", "multiples": "P/E"})
+    assert status == 200
+    assert comps["avg_multiples"] == {"P/E": 20.0}
+    assert comps["implied_prices"] == {"P/E": 50.0}
+    assert service.handle("/dcf", {"symbol": "CCC"})[0] == 422
+    assert service.handle("/score", {})[0] == 400
+    assert service.handle("/unknown", {})[0] == 404
+
+
+def test_http_round_trip():
+    service = warm_service()
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    ready = threading.Event()
+    thread = threading.Thread(target=lambda: asyncio.run(serve_async(service, "127.0.0.1", port, ready)),
+                              daemon=True)
+    thread.start()
+    assert ready.wait(5)
+
+    with urllib.request.urlopen(f"http://127.0.0.1:{port}/score?symbol=AAA") as response:
+        payload = json.loads(response.read())
+    assert payload["symbol"] == "AAA" and payload["count"] == 3
+
+    stats = load_test(f"http://127.0.0.1:{port}/lynch?symbol=AAA", requests=50, concurrency=5)
+    assert stats["requests"] == 50 and stats["errors"] == 0
+
+
+def test_peer_loads_do_not_need_a_request_worker():
+    service = ValuationService(max_workers=1)
+    seed_infos(INFOS)
+    # A request occupying the only request worker still gets its peers
+    future = service.executor.submit(service.infos, ["BBB", "CCC"])
+    infos, failures = future.result(timeout=5)
+    assert len(infos) == 2 and failures == {}
+
+
+def test_result_cache_drops_key_locks_after_loading():
+    service = ValuationService()
+    for i in range(100):
+        assert service.result_cache.get_or_load(f"S{i}", lambda: {"trailingPE": 1.0}) == {"trailingPE": 1.0}
+    assert len(service.result_cache) == 100
+    assert not service.result_cache._key_locks
+
+
+def test_empty_infos_are_not_kept():
+    service = warm_service()
+    seed_infos({"DDD": {}})
+    assert service.handle("/score", {"symbol": "DDD"})[1]["count"] == 0
+    # A throttled or failed lookup is asked again on the next request instead of serving "no data"
+    assert ticker_handle.cached_handle("DDD") is None
+    assert ticker_handle.cached_handle("AAA") is not None
+    assert service.handle("/health", {})[1]["cached_handles"] == len(INFOS)
+
+
+def test_dcf_in_trading_currency_and_lynch_matches_the_menu(tmp_path, monkeypatch):
+    monkeypatch.setattr(fx, "_default_rates", fx.FxRates(str(tmp_path / "fx.db"), fetch=lambda c, d: {"GBP": 1.25}))
+    pence = {"currency": "GBp", "financialCurrency": "USD", "currentPrice": 500.0, "freeCashflow": 1_250_000,
+             "sharesOutstanding": 1_000, "earningsGrowth": 0.1}
+    seed_infos({"PNC.L": pence})
+    service = warm_service()
+    status, dcf = service.handle("/dcf", {"symbol": "PNC.L"})
+    assert status == 200 and dcf["currency"] == "GBP"
+    expected = calculate_dcf_v2(dict(pence, freeCashflow=1_000_000), 0.0)
+    assert dcf["intrinsic_per_share"] == pytest.approx(expected["intrinsic_per_share"])
+
+    status, lynch = service.handle("/lynch", {"symbol": "AAA"})
+    assert status == 200 and lynch["category"] == classify_info(INFOS["AAA"])
+    assert "technology" in lynch["category"]